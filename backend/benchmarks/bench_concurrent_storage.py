@@ -0,0 +1,120 @@
+"""
+Concurrent saves, maturity updates and loads against the "default" and
+"concurrent" storage profiles (DB_STORAGE_PROFILE), each on a fresh
+SQLite file. Reports throughput, p95 latency and failed operations
+(e.g. `database is locked`).
+
+    python benchmarks/bench_concurrent_storage.py [seconds]
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+WRITERS = 8
+READERS = 8
+TREE_BRANCHES = 30
+
+
+def worker(duration: float):
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    sys.path.insert(0, os.path.dirname(__file__))
+
+    from bench_save_game_state import make_tree
+    from db_writer import writer
+    from game_state import save_full_state, stream_game_state
+    from models import GameSession, ReadSessionLocal, create_tables
+    from utils import apply_growth
+
+    create_tables()
+    session_ids = [writer.submit(lambda db: save_full_state(db, make_tree(TREE_BRANCHES))).result() for _ in range(20)]
+
+    results = {"save": [], "grow": [], "load": []}
+    errors = {"save": 0, "grow": 0, "load": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def record(kind, started, failed=False):
+        with lock:
+            if failed:
+                errors[kind] += 1
+            else:
+                results[kind].append(time.perf_counter() - started)
+
+    def grow(db, session_id):
+        garden = db.query(GameSession).filter(GameSession.id == session_id).first()
+        garden.maturity = apply_growth(garden.maturity or 0, 1)
+
+    def write_loop():
+        while time.perf_counter() < deadline:
+            kind = random.choice(("save", "grow"))
+            started = time.perf_counter()
+            try:
+                if kind == "save":
+                    tree = make_tree(TREE_BRANCHES)
+                    session_ids.append(writer.submit(lambda db: save_full_state(db, tree)).result())
+                else:
+                    session_id = random.choice(session_ids)
+                    writer.submit(lambda db: grow(db, session_id)).result()
+                record(kind, started)
+            except Exception:
+                record(kind, started, failed=True)
+
+    def read_loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            db = ReadSessionLocal()
+            try:
+                game_session = db.query(GameSession).filter(GameSession.id == random.choice(session_ids)).first()
+                for _chunk in stream_game_state(db, game_session):
+                    pass
+                record("load", started)
+            except Exception:
+                record("load", started, failed=True)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=write_loop) for _ in range(WRITERS)]
+    threads += [threading.Thread(target=read_loop) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.stop()
+
+    for kind, latencies in results.items():
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+        print(f"{kind} {len(latencies) / duration:.1f} {p95:.1f} {errors[kind]}")
+    stats = writer.stats()
+    print(f"batch {stats['avg_batch_size'] or 1}")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"{WRITERS} writer + {READERS} reader threads, {duration:.0f}s per profile\n")
+    print(f"{'profile':>11} {'op':>5} {'ops/sec':>9} {'p95 ms':>9} {'failed':>7}")
+    for profile in ("default", "concurrent"):
+        env = dict(os.environ, DB_STORAGE_PROFILE=profile,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}")
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", str(duration)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        for line in output.splitlines():
+            kind, *values = line.split()
+            if kind == "batch":
+                print(f"{profile:>11} {'':>5} avg group commit: {values[0]} writes")
+            else:
+                ops, p95, failed = values
+                print(f"{profile:>11} {kind:>5} {float(ops):>9.1f} {float(p95):>9.1f} {int(failed):>7}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        worker(float(sys.argv[2]))
+    else:
+        main()
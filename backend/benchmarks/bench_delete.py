@@ -0,0 +1,131 @@
+"""
+Deleting game sessions: the ORM cascade against set-based deletes, and
+write latency while the retention job purges a backlog.
+
+1. One large tree deleted with db.delete(game_session) (the cascades load
+   every child row and delete them one by one), then the same tree with
+   retention.delete_sessions().
+2. A backlog of abandoned sessions purged by retention.purge() while a
+   steady stream of small writes goes through the writer; reports how
+   long those writes waited.
+
+    python benchmarks/bench_delete.py [branches_per_tree] [abandoned_sessions]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+BRANCHES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+ABANDONED = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_delete.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import update  # noqa: E402
+
+from db_writer import writer as db_writer  # noqa: E402
+from game_state import save_full_state  # noqa: E402
+from models import GameSession, SessionLocal, create_tables  # noqa: E402
+from retention import RetentionWorker, delete_sessions  # noqa: E402
+
+
+def tree(branches: int, query: str = "bench") -> SimpleNamespace:
+    return SimpleNamespace(
+        original_search_query=query,
+        camera_offset={"x": 0, "y": 0},
+        search_results=[{"title": f"result {i}"} for i in range(5)],
+        branches=[
+            {"clientId": f"b{i}", "parentBranchId": f"b{(i - 1) // 3}" if i else None,
+             "searchResult": {"title": f"insight {i}", "snippet": "..."}}
+            for i in range(branches)
+        ],
+        leaves=[{"x": i, "y": i} for i in range(branches * 2)],
+        fruits=[{"x": i, "y": i} for i in range(branches // 10)],
+        flowers=[{"x": i, "y": i} for i in range(branches // 10)],
+        flashcards=[{"front": f"q{i}", "back": "a"} for i in range(branches * 3)],
+    )
+
+
+def save(state) -> int:
+    db = SessionLocal()
+    try:
+        session_id = save_full_state(db, state)
+        db.commit()
+        return session_id
+    finally:
+        db.close()
+
+
+def timed(fn) -> float:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        fn(db)
+        db.commit()
+        return time.perf_counter() - started
+    finally:
+        db.close()
+
+
+async def purge_under_load(worker: RetentionWorker) -> tuple:
+    waits = []
+    done = asyncio.Event()
+
+    async def small_writes():
+        while not done.is_set():
+            started = time.perf_counter()
+            await db_writer.run(lambda db: db.execute(
+                update(GameSession).where(GameSession.id == -1).values(maturity=0)
+            ))
+            waits.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    writer_task = asyncio.create_task(small_writes())
+    started = time.perf_counter()
+    deleted = await worker.purge(pause=0.05)
+    seconds = time.perf_counter() - started
+    done.set()
+    await writer_task
+    return deleted, seconds, waits
+
+
+def main():
+    create_tables()
+    rows = BRANCHES * 7 + BRANCHES // 5 + 5
+    print(f"one tree: {BRANCHES} branches, ~{rows} rows\n")
+    print(f"{'path':>28} {'seconds':>8}")
+
+    session_id = save(tree(BRANCHES))
+    seconds = timed(lambda db: db.delete(db.get(GameSession, session_id)))
+    print(f"{'db.delete() cascade':>28} {seconds:>8.3f}")
+
+    session_id = save(tree(BRANCHES))
+    seconds = timed(lambda db: delete_sessions(db, [session_id]))
+    print(f"{'delete_sessions()':>28} {seconds:>8.3f}")
+
+    ids = [save(tree(20, f"abandoned {i}")) for i in range(ABANDONED)]
+    old = datetime.now(timezone.utc) - timedelta(days=365)
+    db = SessionLocal()
+    db.execute(update(GameSession).where(GameSession.id.in_(ids)).values(updated_at=old))
+    db.commit()
+    db.close()
+
+    worker = RetentionWorker(db_writer, batch_size=50)
+    deleted, seconds, waits = asyncio.run(purge_under_load(worker))
+    waits.sort()
+    stats = worker.stats()
+    print(f"\nretention: {deleted} abandoned sessions in {stats['batches']} batches, {seconds:.2f}s, "
+          f"longest batch {stats['longest_batch_ms']}ms")
+    if waits:
+        p50 = waits[len(waits) // 2] * 1000
+        p99 = waits[int(len(waits) * 0.99)] * 1000
+        print(f"concurrent writes: {len(waits)}, p50 {p50:.1f}ms, p99 {p99:.1f}ms, max {waits[-1] * 1000:.1f}ms")
+    db_writer.stop()
+
+
+if __name__ == "__main__":
+    main()
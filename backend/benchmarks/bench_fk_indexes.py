@@ -0,0 +1,66 @@
+"""
+Load and cascade-delete time for one small session as the rest of the
+database grows. With the foreign-key indexes from migration 0003 both
+should stay flat instead of growing with the total row count.
+
+    python benchmarks/bench_fk_indexes.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_save_game_state import make_tree  # noqa: E402  (also points DATABASE_URL at a temp file)
+from models import GameSession, SessionLocal, create_tables  # noqa: E402
+from game_state import save_full_state, stream_game_state  # noqa: E402
+
+SMALL_TREE = 50
+SAMPLES = 20
+
+
+def save(branches: int) -> int:
+    db = SessionLocal()
+    try:
+        session_id = save_full_state(db, make_tree(branches))
+        db.commit()
+        return session_id
+    finally:
+        db.close()
+
+
+def time_load_and_delete() -> tuple:
+    load_total = delete_total = 0.0
+    for _ in range(SAMPLES):
+        session_id = save(SMALL_TREE)
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            game_session = db.query(GameSession).filter(GameSession.id == session_id).first()
+            for _chunk in stream_game_state(db, game_session):
+                pass
+            load_total += time.perf_counter() - started
+
+            started = time.perf_counter()
+            db.delete(game_session)
+            db.commit()
+            delete_total += time.perf_counter() - started
+        finally:
+            db.close()
+    return load_total / SAMPLES * 1000, delete_total / SAMPLES * 1000
+
+
+def main():
+    create_tables()
+    print(f"{'other branches':>15} {'load ms':>9} {'delete ms':>10}")
+    other = 0
+    for target in (0, 20_000, 100_000):
+        while other < target:
+            save(10_000)
+            other += 10_000
+        load_ms, delete_ms = time_load_and_delete()
+        print(f"{other:>15,} {load_ms:>9.2f} {delete_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Connection-pool waits while flashcard generation is in flight.
+
+Fires concurrent /api/create-flashcards requests (the model is faked with
+a fixed delay) alongside a stream of /api/garden reads, once through the
+old shape that keeps its session open across the LLM call and once through
+the three-phase endpoint. Uses a 4-connection pool so contention shows.
+
+    python benchmarks/bench_flashcard_pool.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_pool.db')}"
+os.environ.setdefault("DB_POOL_SIZE", "4")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ["SEED_PACK_WARM_ON_STARTUP"] = "false"
+os.environ["RETENTION_ENABLED"] = "false"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+import main  # noqa: E402
+from llm import gateway  # noqa: E402
+from models import AsyncSessionLocal, Branch, Flashcard, POOL_METRICS  # noqa: E402
+
+LLM_DELAY = 0.5
+FLASHCARD_REQUESTS = 16
+CARDS = '[{"front": "Q", "back": "A", "difficulty": "easy"}, {"front": "Q2", "back": "A2", "difficulty": "hard"}]'
+
+
+class FakeCompletions:
+    async def create(self, **kwargs):
+        await asyncio.sleep(LLM_DELAY)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=CARDS))])
+
+
+class FakeClient:
+    chat = SimpleNamespace(completions=FakeCompletions())
+
+    async def close(self):
+        pass
+
+
+@main.app.post("/bench/create-flashcards-held")
+async def create_flashcards_held(request: main.CreateFlashcardsRequest):
+    """The pre-three-phase shape: one session from the branch read to the final commit."""
+    async with AsyncSessionLocal() as db:
+        branch = await db.scalar(
+            select(Branch).options(selectinload(Branch.search_result)).where(Branch.id == request.branch_id)
+        )
+        source = {"title": branch.search_result.title, "llm_content": branch.search_result.llm_content}
+        raw_text = await gateway.complete(main.build_flashcard_prompt(source, request.count))
+        for card in main.json.loads(raw_text):
+            db.add(Flashcard(game_session_id=branch.game_session_id, branch_id=branch.id,
+                             front=card["front"], back=card["back"], difficulty=card["difficulty"]))
+        await db.commit()
+    return {"success": True}
+
+
+async def run(client, path: str, branch_ids: list, garden_id: int) -> dict:
+    for metrics in POOL_METRICS.values():
+        metrics.reset()
+    read_latencies = []
+    done = asyncio.Event()
+
+    async def reader():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get(f"/api/garden/{garden_id}")
+            read_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    readers = [asyncio.create_task(reader()) for _ in range(4)]
+    started = time.perf_counter()
+    # Distinct counts so the LLM gateway doesn't coalesce identical prompts
+    await asyncio.gather(*(
+        client.post(path, json={"branch_id": branch_ids[i], "count": i + 1})
+        for i in range(FLASHCARD_REQUESTS)
+    ))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*readers)
+
+    read_latencies.sort()
+    pool = POOL_METRICS["async"].stats()
+    return {
+        "seconds": elapsed,
+        "read_p95_ms": read_latencies[int(len(read_latencies) * 0.95)] * 1000,
+        "reads": len(read_latencies),
+        "pool_max_ms": pool["wait_ms"]["max"],
+        "pool_p95_ms": pool["wait_ms"]["p95"],
+        "slow_waits": pool["waits_over_10ms"],
+    }
+
+
+async def amain():
+    gateway._client = FakeClient()
+    transport = httpx.ASGITransport(app=main.app)
+    # Start-up hooks run the migrations
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        tree = {
+            "original_search_query": "bench",
+            "search_results": [],
+            "branches": [
+                {"clientId": f"b{i}", "start": {"x": 0, "y": 0}, "end": {"x": 1, "y": 1}, "length": 1,
+                 "maxLength": 2, "angle": 0, "thickness": 1,
+                 "searchResult": {"title": f"Topic {i}", "snippet": "s", "llm_content": "c"}}
+                for i in range(FLASHCARD_REQUESTS)
+            ],
+            "leaves": [], "fruits": [], "flowers": [],
+        }
+        session_id = (await client.post("/api/save-game-state", json=tree)).json()["session_id"]
+        state = (await client.post("/api/load-game-state", json={"session_id": session_id})).json()
+        branch_ids = [branch["id"] for branch in state["game_state"]["branches"]]
+
+        print(f"{FLASHCARD_REQUESTS} flashcard requests, {LLM_DELAY}s fake LLM, "
+              f"pool of {os.environ['DB_POOL_SIZE']} (+{os.environ['DB_MAX_OVERFLOW']})\n")
+        print(f"{'endpoint':>12} {'seconds':>8} {'reads':>6} {'read p95 ms':>12} "
+              f"{'pool p95 ms':>12} {'pool max ms':>12} {'waits>10ms':>11}")
+        for name, path in (("held", "/bench/create-flashcards-held"), ("three-phase", "/api/create-flashcards")):
+            r = await run(client, path, branch_ids, session_id)
+            print(f"{name:>12} {r['seconds']:>8.2f} {r['reads']:>6} {r['read_p95_ms']:>12.1f} "
+                  f"{r['pool_p95_ms']:>12.2f} {r['pool_max_ms']:>12.1f} {r['slow_waits']:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(amain())
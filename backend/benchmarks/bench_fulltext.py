@@ -0,0 +1,102 @@
+"""
+/api/garden-search latency over a large synthetic corpus.
+
+Fills search_results and flashcards (the FTS5 triggers index them as they
+go), then times fulltext.search() for rare, common and prefix queries for a
+typical player (ids in the MATCH) and one with POWER_GARDENS gardens
+(filtered through the source tables), next to the LIKE scan it replaces.
+The first few words of the vocabulary are in nearly every row, which is
+the worst case for ranking.
+
+    python benchmarks/bench_fulltext.py [insights] [flashcards]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+INSIGHTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+FLASHCARDS = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+GARDENS = 2_000
+USERS = 50
+POWER_GARDENS = 400  # user 0; the rest are spread over the other users
+RUNS = 20
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_fulltext.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text  # noqa: E402
+
+import fulltext  # noqa: E402
+from models import SessionLocal, create_tables  # noqa: E402
+
+WORDS = (
+    "blockchain consensus validator rollup sequencer bridge liquidity staking governance token "
+    "wallet signature merkle proof oracle ledger gas fee layer shard zk optimistic fraud dao vote "
+    "treasury yield lending collateral stablecoin custody key node mempool block finality fork"
+).split()
+rng = random.Random(7)
+
+
+def sentence(length: int) -> str:
+    # Zipf-ish: a few words are everywhere, most are rare
+    return " ".join(WORDS[min(int(rng.paretovariate(1.2)) - 1, len(WORDS) - 1)] for _ in range(length)) + \
+        f" topic{rng.randrange(50_000)}"
+
+
+def fill():
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "INSERT INTO game_sessions (original_search_query, user_id, version) VALUES (:q, :u, 1)"
+        ), [{"q": f"garden {i}", "u": 0 if i < POWER_GARDENS else 1 + i % (USERS - 1)} for i in range(GARDENS)])
+        db.execute(text(
+            "INSERT INTO search_results (game_session_id, title, snippet, llm_content, url, search_query) "
+            "VALUES (:g, :t, :s, :c, '', '')"
+        ), [{"g": rng.randrange(1, GARDENS + 1), "t": sentence(5), "s": sentence(15), "c": sentence(60)}
+            for _ in range(INSIGHTS)])
+        db.execute(text(
+            "INSERT INTO flashcards (game_session_id, front, back) VALUES (:g, :f, :b)"
+        ), [{"g": rng.randrange(1, GARDENS + 1), "f": sentence(8) + "?", "b": sentence(12)}
+            for _ in range(FLASHCARDS)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def timed(fn) -> tuple:
+    db = SessionLocal()
+    try:
+        times = []
+        for _ in range(RUNS):
+            started = time.perf_counter()
+            rows = fn(db)
+            times.append((time.perf_counter() - started) * 1000)
+        return statistics.median(times), len(rows)
+    finally:
+        db.close()
+
+
+def main():
+    create_tables()
+    started = time.perf_counter()
+    fill()
+    print(f"indexed {INSIGHTS} insights + {FLASHCARDS} flashcards in {time.perf_counter() - started:.1f}s\n")
+    print(f"{'query':>28} {'gardens':>7} {'FTS ms':>8} {'LIKE ms':>8} {'rows':>5}")
+
+    like = text(
+        "SELECT id FROM search_results WHERE title LIKE :p OR snippet LIKE :p OR llm_content LIKE :p "
+        "UNION ALL SELECT id FROM flashcards WHERE front LIKE :p OR back LIKE :p LIMIT 21"
+    )
+    for query in ("topic4242", "custody finality", "blockchain", "sequ", "rollup sequencer bridge"):
+        match = fulltext.match_query(query)
+        like_ms = timed(lambda db: db.execute(like, {"p": f"%{query.split()[0]}%"}).all())[0]
+        for user_id, gardens in ((3, (GARDENS - POWER_GARDENS) // (USERS - 1)), (0, POWER_GARDENS)):
+            fts_ms, rows = timed(lambda db: fulltext.search(db, match, list(fulltext.KINDS), user_id, 21))
+            print(f"{query:>28} {gardens:>7} {fts_ms:>8.1f} {like_ms:>8.1f} {rows:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Google ID-token verification during a login burst, against the local
+certificate stub with a fixed fetch latency: the old per-call
+`id_token.verify_oauth2_token(token, google_requests.Request(), ...)`
+versus GoogleTokenVerifier (cached certs, pooled session, memoized tokens).
+
+    python benchmarks/bench_google_verify.py [logins] [fetch_latency_seconds]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+USERS = 50  # retries and extra tabs resend a user's token (RS256 signing is deterministic)
+THREADS = 8
+PORT = 18546
+CLIENT_ID = "bench-client.apps.googleusercontent.com"
+
+os.environ["GOOGLE_CERTS_URL"] = f"http://127.0.0.1:{PORT}/oauth2/v1/certs"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import google_certs_stub  # noqa: E402
+from google.auth.transport import requests as google_requests  # noqa: E402
+from google.oauth2 import id_token  # noqa: E402
+from google_tokens import GoogleTokenVerifier  # noqa: E402
+
+
+def burst(verify, tokens) -> tuple:
+    latencies = []
+
+    def one(token):
+        started = time.perf_counter()
+        claims = verify(token)
+        latencies.append(time.perf_counter() - started)
+        return claims["sub"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(one, tokens))
+    latencies.sort()
+    return time.perf_counter() - started, latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    server = google_certs_stub.serve(PORT, LATENCY)
+    tokens = [server.authority.issue_token(CLIENT_ID, sub=f"user-{i % USERS}") for i in range(LOGINS)]
+    print(f"{LOGINS} logins from {USERS} users, {THREADS} threads, "
+          f"{LATENCY * 1000:.0f}ms per certificate fetch\n")
+    print(f"{'verifier':>16} {'seconds':>8} {'logins/sec':>11} {'p95 ms':>8} {'cert fetches':>13}")
+
+    def old_verify(token):
+        return id_token.verify_token(
+            token, google_requests.Request(), audience=CLIENT_ID, certs_url=os.environ["GOOGLE_CERTS_URL"]
+        )
+
+    verifier = GoogleTokenVerifier(CLIENT_ID)
+    for name, verify in (("per-call fetch", old_verify), ("cached", verifier.verify)):
+        server.authority.fetches = 0
+        seconds, p95 = burst(verify, tokens)
+        print(f"{name:>16} {seconds:>8.2f} {LOGINS / seconds:>11.1f} {p95 * 1000:>8.1f} "
+              f"{server.authority.fetches:>13}")
+
+    print(f"\n{verifier.stats()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
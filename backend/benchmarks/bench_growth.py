@@ -0,0 +1,153 @@
+"""
+Concurrent maturity growth: lost increments and the 100% transition.
+
+1. The old read-modify-write (load the garden, apply_growth() in Python,
+   commit) from several threads at once.
+2. The same events through growth.record() from concurrent requests.
+3. apply_growth_batch() from several threads with their own sessions,
+   standing in for several worker processes sharing the database.
+4. Gardens pushed well past 100 concurrently: the on_mature hook must run
+   exactly once per garden.
+
+Exits non-zero if increments are lost in 2-3 or the hook count is off.
+
+    python benchmarks/bench_growth.py [gardens] [events_per_garden]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GARDENS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+EVENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 60  # +1 each, so totals stay under the cap
+THREADS = 8
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_growth.db')}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from growth import MAX_MATURITY, apply_growth_batch, growth  # noqa: E402
+from models import GameSession, SessionLocal, create_tables  # noqa: E402
+from utils import apply_growth  # noqa: E402
+
+matured_calls = []
+matured_lock = threading.Lock()
+
+
+@growth.on_mature
+def count_maturity(db, garden, wallet_address=None):
+    with matured_lock:
+        matured_calls.append(garden.id)
+    return garden.id
+
+
+def new_gardens(count: int) -> list:
+    db = SessionLocal()
+    try:
+        gardens = [GameSession(original_search_query="bench", maturity=0) for _ in range(count)]
+        db.add_all(gardens)
+        db.commit()
+        return [garden.id for garden in gardens]
+    finally:
+        db.close()
+
+
+def maturities(ids: list) -> list:
+    db = SessionLocal()
+    try:
+        return [maturity for (maturity,) in db.query(GameSession.maturity).filter(GameSession.id.in_(ids))]
+    finally:
+        db.close()
+
+
+def in_threads(fn, events: list) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(fn, events))
+    return time.perf_counter() - started
+
+
+def read_modify_write(garden_id: int):
+    for _ in range(20):
+        db = SessionLocal()
+        try:
+            garden = db.query(GameSession).filter(GameSession.id == garden_id).first()
+            time.sleep(0.0005)  # the request's other work between the read and the write
+            garden.maturity = apply_growth(garden.maturity, 1)
+            db.commit()
+            return
+        except OperationalError:
+            db.rollback()  # database is locked; retry like a client would
+        finally:
+            db.close()
+
+
+def direct_batch(garden_id: int, increment: int = 1):
+    for _ in range(20):
+        db = SessionLocal()
+        try:
+            apply_growth_batch(db, {garden_id: increment}, hooks=growth.hooks)
+            db.commit()
+            return
+        except OperationalError:
+            db.rollback()
+        finally:
+            db.close()
+
+
+async def through_pipeline(events: list, increment: int = 1):
+    async def arrive(i: int, garden_id: int):
+        await asyncio.sleep((i % 100) * 0.0005)  # requests finish spread over ~50ms
+        await growth.record(garden_id, increment)
+
+    await asyncio.gather(*(arrive(i, garden_id) for i, garden_id in enumerate(events)))
+
+
+def report(name: str, ids: list, seconds: float, expected: int) -> bool:
+    values = maturities(ids)
+    lost = sum(expected - value for value in values)
+    print(f"{name:>22} {seconds:>8.2f} {sum(values):>8} {lost:>6}")
+    return lost == 0
+
+
+def main():
+    create_tables()
+    events_total = GARDENS * EVENTS
+    print(f"{GARDENS} gardens x {EVENTS} growth events of +1 (expected {events_total}), {THREADS} threads\n")
+    print(f"{'path':>22} {'seconds':>8} {'applied':>8} {'lost':>6}")
+
+    ids = new_gardens(GARDENS)
+    seconds = in_threads(read_modify_write, [garden_id for garden_id in ids for _ in range(EVENTS)])
+    report("read-modify-write", ids, seconds, EVENTS)
+
+    ids = new_gardens(GARDENS)
+    started = time.perf_counter()
+    asyncio.run(through_pipeline([garden_id for _ in range(EVENTS) for garden_id in ids]))
+    ok = report("growth.record()", ids, time.perf_counter() - started, EVENTS)
+    stats = growth.stats()
+    print(f"{'':>22} {stats['writes']} writes for {stats['events']} events")
+
+    ids = new_gardens(GARDENS)
+    seconds = in_threads(direct_batch, [garden_id for garden_id in ids for _ in range(EVENTS)])
+    ok = report("apply_growth_batch()", ids, seconds, EVENTS) and ok
+
+    ids = new_gardens(GARDENS)
+    asyncio.run(through_pipeline([garden_id for _ in range(40) for garden_id in ids], increment=5))
+    in_threads(lambda garden_id: direct_batch(garden_id, 30), ids * 4)
+    hooked = sorted(garden_id for garden_id in matured_calls if garden_id in ids)
+    capped = all(value == MAX_MATURITY for value in maturities(ids))
+    once = hooked == sorted(ids)
+    print(f"\nmaturity transition: {len(hooked)} on_mature calls for {len(ids)} gardens, "
+          f"all capped at {MAX_MATURITY}: {capped}")
+    ok = ok and once and capped
+
+    print("\nPASS" if ok else "\nFAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
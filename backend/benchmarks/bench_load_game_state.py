@@ -0,0 +1,69 @@
+"""
+Loads a 5k-branch session through the streaming serializer and asserts
+the statement count stays constant (no per-branch lazy loads).
+
+    python benchmarks/bench_load_game_state.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_save_game_state import make_tree  # noqa: E402  (also points DATABASE_URL at a temp file)
+from sqlalchemy import event  # noqa: E402
+from models import GameSession, SessionLocal, create_tables, engine  # noqa: E402
+from game_state import save_full_state, stream_game_state  # noqa: E402
+
+BRANCHES = 5_000
+# 1 for the session row + one per child table
+EXPECTED_STATEMENTS = 7
+
+
+def main():
+    create_tables()
+    db = SessionLocal()
+    try:
+        session_id = save_full_state(db, make_tree(BRANCHES))
+        db.commit()
+    finally:
+        db.close()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def load() -> int:
+        db = SessionLocal()
+        try:
+            game_session = db.query(GameSession).filter(GameSession.id == session_id).first()
+            return sum(len(chunk) for chunk in stream_game_state(db, game_session))
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    size = load()
+    elapsed = time.perf_counter() - started
+    load_statements = len(statements)
+
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    db = SessionLocal()
+    try:
+        game_session = db.query(GameSession).filter(GameSession.id == session_id).first()
+        state = json.loads("".join(stream_game_state(db, game_session)))["game_state"]
+    finally:
+        db.close()
+    assert len(state["branches"]) == BRANCHES, len(state["branches"])
+    assert load_statements == EXPECTED_STATEMENTS, f"{load_statements} statements:\n" + "\n".join(statements)
+
+    print(f"branches={BRANCHES} statements={load_statements} bytes={size} "
+          f"seconds={elapsed:.3f} peak_mb={peak / 1e6:.1f}")
+
+
+if __name__ == "__main__":
+    main()
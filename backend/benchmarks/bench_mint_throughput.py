@@ -0,0 +1,84 @@
+"""
+Mint throughput against the local JSON-RPC stub with a fixed round-trip
+latency: the old one-mint-at-a-time shape (fresh eth_getTransactionCount,
+then send, per mint) versus locally allocated nonces broadcast in
+batches, and per-hash receipt lookups versus one batched lookup.
+
+    python benchmarks/bench_mint_throughput.py [mints] [latency_seconds]
+"""
+import os
+import sys
+import time
+
+MINTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+PORT = 18545
+
+os.environ["SEPOLIA_RPC_URL"] = f"http://127.0.0.1:{PORT}"
+os.environ["MINT_CHAIN_ID"] = "31337"
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("NFT_CONTRACT_ADDRESS", "0x" + "0" * 39 + "1")
+os.environ.setdefault("NFT_OWNER_PRIVATE_KEY", "0x" + "1" * 64)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import rpc_stub  # noqa: E402
+import minting  # noqa: E402
+from minting import MINT_BATCH_SIZE, rpc_batch, send_mint_batch  # noqa: E402
+from services import services  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+
+def send_one_at_a_time(wallet_address: str) -> str:
+    """The pre-allocator path: every mint asks the node for its nonce first."""
+    w3, nft_contract, owner_account = services.get("chain")
+    nonce = w3.eth.get_transaction_count(owner_account.address, "pending")
+    tx = nft_contract.functions.mint(Web3.to_checksum_address(wallet_address)).build_transaction({
+        "from": owner_account.address,
+        "nonce": nonce,
+        "gas": 250_000,
+        "gasPrice": w3.to_wei("10", "gwei"),
+        "chainId": minting.MINT_CHAIN_ID
+    })
+    return Web3.to_hex(w3.eth.send_raw_transaction(owner_account.sign_transaction(tx).raw_transaction))
+
+
+def report(name: str, seconds: float, round_trips: int):
+    print(f"{name:>22} {seconds:>8.2f} {MINTS / seconds:>10.1f} {round_trips:>12}")
+
+
+def main():
+    server = rpc_stub.serve(PORT, 31337, LATENCY, confirm_seconds=0)
+    wallets = ["0x" + f"{i:040x}" for i in range(1, MINTS + 1)]
+    print(f"{MINTS} mints, {LATENCY * 1000:.0f}ms per RPC round trip, batches of {MINT_BATCH_SIZE}\n")
+    print(f"{'path':>22} {'seconds':>8} {'per sec':>10} {'round trips':>12}")
+
+    server.state.http_requests = 0
+    started = time.perf_counter()
+    hashes = [send_one_at_a_time(wallet) for wallet in wallets]
+    report("send one at a time", time.perf_counter() - started, server.state.http_requests)
+
+    server.state.http_requests = 0
+    started = time.perf_counter()
+    for i in range(0, MINTS, MINT_BATCH_SIZE):
+        results = send_mint_batch(wallets[i:i + MINT_BATCH_SIZE])
+        assert not any(isinstance(result, Exception) for result in results), results
+        hashes += results
+    report("allocator + batch send", time.perf_counter() - started, server.state.http_requests)
+
+    server.state.http_requests = 0
+    started = time.perf_counter()
+    for tx_hash in hashes[:MINTS]:
+        services.get("chain").w3.eth.get_transaction_receipt(tx_hash)
+    report("receipt per hash", time.perf_counter() - started, server.state.http_requests)
+
+    server.state.http_requests = 0
+    started = time.perf_counter()
+    receipts = rpc_batch([("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes[MINTS:]])
+    assert all(receipt and receipt["status"] == "0x1" for receipt in receipts)
+    report("batched receipts", time.perf_counter() - started, server.state.http_requests)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Retrieval index for /api/web-search on a synthetic corpus: full build
+time, incremental refresh, query latency, and how many insights a stream
+of growing trees gets from the index instead of the model.
+
+    python benchmarks/bench_retrieval.py [documents] [queries]
+"""
+import os
+import random
+import sys
+import time
+
+DOCUMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+PER_REQUEST = 4
+REQUESTS_PER_TREE = 25
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from retrieval import InsightIndex  # noqa: E402
+
+TOPICS = ["defi", "lending", "staking", "nft", "dao", "governance", "bridges", "rollups", "oracles", "wallets",
+          "stablecoins", "liquidity", "mev", "custody", "airdrops", "tokenomics", "zk", "validators", "gas", "amm"]
+ASPECTS = ["risks", "history", "mechanics", "incentives", "security", "regulation", "design", "adoption",
+           "economics", "tooling", "audits", "metrics", "failures", "scaling", "privacy", "interoperability"]
+FILLER = ("protocol users value network chain token contract market fees yield collateral pool vote "
+          "proof layer bridge price risk attack audit data").split()
+
+
+def synthetic_rows(count: int, start_id: int = 1, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        topic, aspect = rng.choice(TOPICS), rng.choice(ASPECTS)
+        rows.append({
+            "id": start_id + i,
+            "title": f"{topic.title()} {aspect.title()} {rng.choice(FILLER).title()} #{start_id + i}",
+            "snippet": " ".join([topic, aspect] + rng.sample(FILLER, 12)),
+            "llm_content": None,
+            "search_query": f"{topic} {rng.choice(ASPECTS)}",
+        })
+    return rows
+
+
+def main():
+    rows = synthetic_rows(DOCUMENTS)
+    index = InsightIndex(min_score=0.6, max_age_days=0)
+
+    started = time.perf_counter()
+    index.add(rows)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    index.add(synthetic_rows(500, start_id=DOCUMENTS + 1, seed=8))
+    incremental = time.perf_counter() - started
+
+    # Each tree keeps growing around one topic; what it already has is excluded
+    rng = random.Random(11)
+    latencies = []
+    served = 0
+    taken = []
+    for i in range(QUERIES):
+        if i % REQUESTS_PER_TREE == 0:
+            topic, taken = rng.choice(TOPICS), []
+        query = f"{topic} {rng.choice(ASPECTS)}"
+        started = time.perf_counter()
+        hits = index.search(query, taken, PER_REQUEST)
+        latencies.append(time.perf_counter() - started)
+        served += len(hits)
+    latencies.sort()
+
+    wanted = QUERIES * PER_REQUEST
+    print(f"{DOCUMENTS} insights, {index.stats()['terms']} terms")
+    print(f"full build         {build:8.2f} s")
+    print(f"incremental +500   {incremental * 1000:8.1f} ms")
+    print(f"query p50          {latencies[len(latencies) // 2] * 1000:8.2f} ms")
+    print(f"query p95          {latencies[int(len(latencies) * 0.95)] * 1000:8.2f} ms")
+    print(f"served from index  {served}/{wanted} insights ({served / wanted:.0%}); "
+          f"the model is asked for the remaining {wanted - served}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Rows/sec of the bulk save path (game_state.save_full_state) for trees of
+100, 1k and 10k branches, against a throwaway SQLite file.
+
+    python benchmarks/bench_save_game_state.py
+"""
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_save.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from models import SessionLocal, create_tables  # noqa: E402
+from game_state import save_full_state  # noqa: E402
+
+
+def make_tree(branch_count: int) -> SimpleNamespace:
+    branches, leaves, flashcards = [], [], []
+    for i in range(branch_count):
+        branches.append({
+            "clientId": f"b{i}",
+            "parentBranchId": f"b{(i - 1) // 2}" if i else None,
+            "start": {"x": i, "y": i}, "end": {"x": i + 1, "y": i + 2},
+            "length": 40, "maxLength": 60, "angle": 0.3, "thickness": 3,
+            "generation": i.bit_length(), "nodeType": "branch",
+            "searchResult": {"title": f"Insight {i}", "snippet": "s" * 120, "llm_content": "c" * 400} if i % 2 else None,
+        })
+        leaves.append({"x": i, "y": i, "size": 1.0})
+        if i % 5 == 0:
+            flashcards.append({"front": f"Q{i}", "back": f"A{i}", "difficulty": "easy"})
+
+    return SimpleNamespace(
+        original_search_query="benchmark",
+        search_results=[{"title": f"Area {i}", "snippet": "s"} for i in range(5)],
+        branches=branches,
+        leaves=leaves,
+        fruits=[{"x": 0, "y": 0}] * (branch_count // 20),
+        flowers=[{"x": 0, "y": 0}] * (branch_count // 20),
+        flashcards=flashcards,
+        camera_offset={"x": 0, "y": 0},
+    )
+
+
+def row_count(tree) -> int:
+    own_results = sum(1 for b in tree.branches if b.get("searchResult"))
+    return 1 + len(tree.search_results) + own_results + len(tree.branches) + len(tree.leaves) \
+        + len(tree.fruits) + len(tree.flowers) + len(tree.flashcards)
+
+
+def main():
+    create_tables()
+    print(f"{'branches':>9} {'rows':>8} {'seconds':>9} {'rows/sec':>10}")
+    for size in (100, 1_000, 10_000):
+        tree = make_tree(size)
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            save_full_state(db, tree)
+            db.commit()
+            elapsed = time.perf_counter() - started
+        finally:
+            db.close()
+        rows = row_count(tree)
+        print(f"{size:>9} {rows:>8} {elapsed:>9.3f} {rows / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+A seed garden's first minutes with and without its pre-generated pack.
+
+Plays the requests the frontend makes on a Web3Seed garden: the areas
+search, growing children on every area, then flashcards and a quiz for
+each area. The model is faked with a fixed delay. The session runs once
+before the pack exists and once after warm_seed_packs() has built it.
+
+    python benchmarks/bench_seed_packs.py [llm_delay_seconds]
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+LLM_DELAY = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+SEED = "DAOs"
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_seed_packs.db')}"
+os.environ["SEED_PACK_WARM_ON_STARTUP"] = "false"
+os.environ["RETENTION_ENABLED"] = "false"
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("SEED_PACK_CONCURRENCY", "8")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from llm import gateway  # noqa: E402
+from seed_packs import research_query  # noqa: E402
+
+rng = random.Random(3)
+counter = itertools.count()
+llm_calls = 0
+
+
+def fake_answer(prompt: str) -> str:
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(8)).title()
+
+    if "knowledge areas" in prompt:
+        return json.dumps({"areas": [{"name": f"{word()} Governance", "description": word(), "search_query": word()}
+                                     for _ in range(5)]})
+    if "NEW and DISTINCT insights" in prompt:
+        return json.dumps({"results": [{"title": f"{word()} {word()}", "snippet": word()} for _ in range(5)]})
+    if "multiple-choice" in prompt:
+        return json.dumps([{"question": f"{word()} {next(counter)}?", "correctAnswer": "a", "options": list("abcd")}
+                           for _ in range(5)])
+    return json.dumps([{"front": f"{word()} {next(counter)}?", "back": word(), "difficulty": "easy"} for _ in range(5)])
+
+
+class FakeCompletions:
+    async def create(self, **kwargs):
+        global llm_calls
+        llm_calls += 1
+        await asyncio.sleep(LLM_DELAY)
+        content = fake_answer(kwargs["messages"][-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeClient:
+    chat = SimpleNamespace(completions=FakeCompletions())
+
+    async def close(self):
+        pass
+
+
+def garden_session(client: TestClient, tree_id: str) -> float:
+    started = time.perf_counter()
+    areas = client.post("/api/search", json={"query": SEED}).json()["results"]
+    for area in areas:
+        client.post("/api/web-search", json={
+            "query": research_query(area["title"], SEED), "count": 3, "tree_id": tree_id
+        })
+        cards = client.post("/api/create-flashcards", json={"search_result": area, "count": 5}).json()["flashcards"]
+        client.post("/api/generate-quiz", json={"flashcards": cards})
+    return time.perf_counter() - started
+
+
+def main_bench():
+    global llm_calls
+    gateway._client = FakeClient()
+    with TestClient(main.app) as client:
+        print(f"{LLM_DELAY * 1000:.0f}ms per model call; one garden session = 1 search, "
+              f"then children, flashcards and a quiz for each of 5 areas\n")
+        print(f"{'':>14} {'seconds':>8} {'LLM calls':>10}")
+
+        llm_calls = 0
+        seconds = garden_session(client, "cold")
+        print(f"{'no pack':>14} {seconds:>8.2f} {llm_calls:>10}")
+
+        llm_calls = 0
+        started = time.perf_counter()
+        client.portal.call(main.warm_seed_packs, [SEED])
+        build = time.perf_counter() - started
+        print(f"{'build pack':>14} {build:>8.2f} {llm_calls:>10}")
+
+        llm_calls = 0
+        seconds = garden_session(client, "warm")
+        print(f"{'from pack':>14} {seconds:>8.2f} {llm_calls:>10}")
+        print(f"\n{main.seed_packs.stats()}")
+
+
+if __name__ == "__main__":
+    main_bench()
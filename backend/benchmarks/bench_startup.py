@@ -0,0 +1,89 @@
+"""
+Worker start-up cost: time to import main.py, to run the start-up hooks
+(migrations, mint worker), and the latency of the first requests a fresh
+worker serves. Each run is a new interpreter on a fresh SQLite file, the
+way a reload or an extra uvicorn worker starts.
+
+    python benchmarks/bench_startup.py [runs] [--max-import-seconds 1.5]
+
+Exits 1 when the median import time is over --max-import-seconds, so it
+can guard against a heavy import creeping back into main.py.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+FIRST_REQUESTS = (
+    ("GET", "/api/services", None),
+    ("POST", "/api/save-game-state", {
+        "original_search_query": "bench", "search_results": [], "branches": [],
+        "leaves": [], "fruits": [], "flowers": [],
+    }),
+    ("GET", "/api/game-sessions", None),
+)
+
+
+def worker():
+    import time
+
+    started = time.perf_counter()
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    import main
+    imported = time.perf_counter() - started
+
+    from fastapi.testclient import TestClient
+
+    started = time.perf_counter()
+    with TestClient(main.app) as client:
+        startup = time.perf_counter() - started
+        requests = {}
+        for method, path, body in FIRST_REQUESTS:
+            started = time.perf_counter()
+            response = client.request(method, path, json=body)
+            response.raise_for_status()
+            requests[f"{method} {path}"] = time.perf_counter() - started
+    print(json.dumps({"import": imported, "startup": startup, "requests": requests}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("runs", nargs="?", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        env = dict(
+            os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'startup.db')}",
+            SEED_PACK_WARM_ON_STARTUP="false", RETENTION_ENABLED="false",
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker"], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    def median_ms(values):
+        return statistics.median(values) * 1000
+
+    print(f"median of {args.runs} fresh workers\n")
+    print(f"{'phase':>32} {'ms':>9}")
+    import_ms = median_ms([r["import"] for r in results])
+    print(f"{'import main':>32} {import_ms:>9.1f}")
+    print(f"{'startup hooks':>32} {median_ms([r['startup'] for r in results]):>9.1f}")
+    for name in results[0]["requests"]:
+        print(f"{'first ' + name:>32} {median_ms([r['requests'][name] for r in results]):>9.1f}")
+
+    if args.max_import_seconds is not None and import_ms > args.max_import_seconds * 1000:
+        print(f"\n❌ import took {import_ms:.0f}ms, budget is {args.max_import_seconds * 1000:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker()
+    else:
+        main()
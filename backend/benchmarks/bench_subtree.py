@@ -0,0 +1,115 @@
+"""
+Pruning a subtree on the server against re-saving the whole tree.
+
+Saves a garden with a SUBTREE-branch subtree hanging off its root (leaves
+and flashcards attached to every branch), then removes that subtree two
+ways: the client cutting it locally and posting the rest of the tree to
+/api/save-game-state, and one /api/branches/{id}/prune request. Reports
+time and request size, plus /api/branches/{id}/subtree and a move.
+
+    python benchmarks/bench_subtree.py [branches] [subtree_branches]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BRANCHES = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+SUBTREE = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_subtree.db')}"
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ["SEED_PACK_WARM_ON_STARTUP"] = "false"
+os.environ["RETENTION_ENABLED"] = "false"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import bindparam, select, update  # noqa: E402
+
+import main  # noqa: E402
+from game_state import save_full_state  # noqa: E402
+from models import Branch, Flashcard, Leaf, SessionLocal  # noqa: E402
+
+
+def garden() -> SimpleNamespace:
+    # Ternary trees: b0.. is the garden, s0.. the subtree hanging off b0
+    branches = [
+        {"clientId": f"b{i}", "parentBranchId": f"b{(i - 1) // 3}" if i else None,
+         "start": {"x": i, "y": 0}, "end": {"x": i, "y": 40},
+         "searchResult": {"title": f"insight {i}", "snippet": "x" * 120, "llm_content": "y" * 400}}
+        for i in range(BRANCHES - SUBTREE)
+    ]
+    branches += [
+        {"clientId": f"s{i}", "parentBranchId": f"s{(i - 1) // 3}" if i else "b0",
+         "start": {"x": -i, "y": 0}, "end": {"x": -i, "y": 40},
+         "searchResult": {"title": f"sub insight {i}", "snippet": "x" * 120, "llm_content": "y" * 400}}
+        for i in range(SUBTREE)
+    ]
+    return SimpleNamespace(
+        original_search_query="bench", camera_offset={"x": 0, "y": 0}, search_results=[], branches=branches,
+        leaves=[{"x": i, "y": i} for i in range(BRANCHES * 2)], fruits=[], flowers=[],
+        flashcards=[{"front": f"q{i}", "back": "a", "node_position": {"x": i, "y": i}} for i in range(BRANCHES)],
+    )
+
+
+def save_garden() -> tuple:
+    """Session id and the id of the subtree's root, with two leaves and a flashcard per branch."""
+    db = SessionLocal()
+    try:
+        session_id = save_full_state(db, garden())
+        branch_ids = db.scalars(select(Branch.id).where(Branch.game_session_id == session_id).order_by(Branch.id)).all()
+        for model, per_branch in ((Leaf, 2), (Flashcard, 1)):
+            ids = db.scalars(select(model.id).where(model.game_session_id == session_id).order_by(model.id)).all()
+            db.execute(
+                update(model.__table__).where(model.__table__.c.id == bindparam("row_id")).values(branch_id=bindparam("b")),
+                [{"row_id": row_id, "b": branch_ids[i // per_branch]} for i, row_id in enumerate(ids)],
+            )
+        db.commit()
+        return session_id, branch_ids[BRANCHES - SUBTREE]
+    finally:
+        db.close()
+
+
+def timed(fn) -> tuple:
+    started = time.perf_counter()
+    response = fn()
+    return time.perf_counter() - started, response
+
+
+def main_bench():
+    with TestClient(main.app) as client:
+        print(f"garden of {BRANCHES} branches, {BRANCHES * 2} leaves, {BRANCHES} flashcards; "
+              f"subtree of {SUBTREE} branches\n")
+        print(f"{'request':>28} {'ms':>8} {'sent KB':>9}")
+
+        session_id, root = save_garden()
+        seconds, response = timed(lambda: client.get(f"/api/branches/{root}/subtree"))
+        print(f"{'fetch subtree':>28} {seconds * 1000:>8.1f} {0:>9.1f}   {len(response.content) / 1024:.0f} KB back")
+
+        body = json.dumps({"dx": 25, "dy": -10})
+        seconds, response = timed(lambda: client.post(f"/api/branches/{root}/move", content=body))
+        assert response.json()["success"], response.text
+        print(f"{'move subtree':>28} {seconds * 1000:>8.1f} {len(body) / 1024:>9.1f}")
+
+        # What the client does today: cut locally, then save everything that is left
+        state = client.post("/api/load-game-state", json={"session_id": session_id}).json()["game_state"]
+        pruned = {branch["id"] for branch in client.get(f"/api/branches/{root}/subtree").json()["branches"]}
+        state["branches"] = [branch for branch in state["branches"] if branch["id"] not in pruned]
+        state["leaves"] = [leaf for leaf in state["leaves"] if leaf["branchId"] not in pruned]
+        state["flashcards"] = [card for card in state["flashcards"] if card["branch_id"] not in pruned]
+        body = json.dumps(state)
+        seconds, response = timed(lambda: client.post("/api/save-game-state", content=body))
+        assert response.json()["success"], response.text
+        print(f"{'cut locally + full re-save':>28} {seconds * 1000:>8.1f} {len(body) / 1024:>9.1f}")
+
+        body = json.dumps({})
+        seconds, response = timed(lambda: client.post(f"/api/branches/{root}/prune", content=body))
+        deleted = response.json()["deleted"]
+        print(f"{'prune subtree':>28} {seconds * 1000:>8.1f} {len(body) / 1024:>9.1f}   "
+              + ", ".join(f"{len(ids)} {key}" for key, ids in deleted.items()))
+
+
+if __name__ == "__main__":
+    main_bench()
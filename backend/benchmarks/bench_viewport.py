@@ -0,0 +1,103 @@
+"""
+Full tree load against viewport loading on a large garden.
+
+Saves several big gardens spread over the same world area, then compares
+/api/load-game-state (whole tree) with /api/load-game-state/viewport for
+a screen-sized window and for a pan to the next window (time and payload).
+
+    python benchmarks/bench_viewport.py [branches_per_garden] [gardens]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+BRANCHES = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+GARDENS = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+WORLD = 20_000  # gardens span WORLD x WORLD world units
+SCREEN = (1920, 1080)
+MARGIN = 200
+RUNS = 5
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_viewport.db')}"
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ["SEED_PACK_WARM_ON_STARTUP"] = "false"
+os.environ["RETENTION_ENABLED"] = "false"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from game_state import save_full_state  # noqa: E402
+from models import SessionLocal  # noqa: E402
+
+rng = random.Random(11)
+
+
+def garden(branches: int) -> SimpleNamespace:
+    def point():
+        return {"x": rng.uniform(0, WORLD), "y": rng.uniform(0, WORLD)}
+
+    rows = []
+    for i in range(branches):
+        start = point()
+        rows.append({
+            "clientId": f"b{i}", "parentBranchId": f"b{rng.randrange(i)}" if i else None,
+            "start": start, "end": {"x": start["x"] + rng.uniform(-60, 60), "y": start["y"] - rng.uniform(20, 80)},
+            "searchResult": {"title": f"insight {i}", "snippet": "x" * 120, "llm_content": "y" * 400},
+        })
+    return SimpleNamespace(
+        original_search_query="bench", camera_offset={"x": 0, "y": 0}, search_results=[], branches=rows,
+        leaves=[point() for _ in range(branches * 2)], fruits=[point() for _ in range(branches // 10)],
+        flowers=[point() for _ in range(branches // 10)], flashcards=[],
+    )
+
+
+def timed(fn) -> tuple:
+    best, size = None, 0
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        response = fn()
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+        size = len(response.content)
+    return best, size
+
+
+def rect(x: float, y: float) -> dict:
+    return {"min_x": x - MARGIN, "min_y": y - MARGIN, "max_x": x + SCREEN[0] + MARGIN, "max_y": y + SCREEN[1] + MARGIN}
+
+
+def main_bench():
+    db = SessionLocal()
+    with TestClient(main.app) as client:
+        ids = []
+        for _ in range(GARDENS):
+            ids.append(save_full_state(db, garden(BRANCHES)))
+            db.commit()
+        db.close()
+        session_id = ids[0]
+        elements = BRANCHES * 3 + BRANCHES // 5
+        print(f"{GARDENS} gardens of {elements} elements over {WORLD}x{WORLD}; screen {SCREEN[0]}x{SCREEN[1]}\n")
+        print(f"{'request':>22} {'ms':>8} {'KB':>9}")
+
+        seconds, size = timed(lambda: client.post("/api/load-game-state", json={"session_id": session_id}))
+        print(f"{'full tree':>22} {seconds * 1000:>8.1f} {size / 1024:>9.1f}")
+
+        first = rect(WORLD / 2, WORLD / 2)
+        seconds, size = timed(lambda: client.post(
+            "/api/load-game-state/viewport", json={"session_id": session_id, "viewport": first}
+        ))
+        print(f"{'viewport':>22} {seconds * 1000:>8.1f} {size / 1024:>9.1f}")
+
+        panned = rect(WORLD / 2 + SCREEN[0] / 2, WORLD / 2)
+        seconds, size = timed(lambda: client.post(
+            "/api/load-game-state/viewport", json={"session_id": session_id, "viewport": panned, "loaded": [first]}
+        ))
+        print(f"{'pan half a screen':>22} {seconds * 1000:>8.1f} {size / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main_bench()
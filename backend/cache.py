@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+from sqlalchemy import bindparam, func, update
+
+from db_writer import writer as db_writer
+from models import CachedResponse, ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, trim punctuation and collapse whitespace so "DeFi  basics?" == "defi basics"."""
+    query = re.sub(r"\s+", " ", (query or "").strip().lower())
+    return query.strip(" .,!?;:\"'")
+
+
+class ResponseCache:
+    """
+    Two-tier cache for generated LLM payloads.
+
+    Tier 1 is an in-process LRU, tier 2 is the `response_cache` table so
+    entries survive restarts. Keys combine the namespace, the prompt
+    template version and the normalized query, so bumping the template
+    version naturally orphans stale entries.
+
+    Lookups only read. Writes go through the shared db_writer without
+    holding up the request, and disk hits are counted in memory and
+    written every `hit_flush_every` hits as one batched UPDATE. Expired
+    and overflow rows are pruned every `prune_every` sets.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        template_version: str,
+        ttl_seconds: Optional[int] = None,
+        max_memory_entries: Optional[int] = None,
+        max_disk_entries: Optional[int] = None,
+        hit_flush_every: Optional[int] = None,
+        prune_every: Optional[int] = None,
+    ):
+        self.namespace = namespace
+        self.template_version = template_version
+        self.ttl_seconds = ttl_seconds or int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+        self.max_memory_entries = max_memory_entries or int(os.getenv("RESPONSE_CACHE_MEMORY_ENTRIES", "256"))
+        self.max_disk_entries = max_disk_entries or int(os.getenv("RESPONSE_CACHE_DISK_ENTRIES", "5000"))
+        self.hit_flush_every = hit_flush_every or int(os.getenv("RESPONSE_CACHE_HIT_FLUSH_EVERY", "50"))
+        # The table may run up to prune_every - 1 rows over max_disk_entries between prunes
+        self.prune_every = prune_every or int(os.getenv("RESPONSE_CACHE_PRUNE_EVERY", "100"))
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_hits: dict = {}  # key -> disk hits not written yet
+        self._pending_total = 0
+        self._sets_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key_for(self, query: str) -> str:
+        raw = f"{self.namespace}:{self.template_version}:{normalize_query(query)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, query: str) -> Optional[dict]:
+        key = self.key_for(query)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        payload = self._disk_get(key, now)
+        if payload is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        return payload
+
+    def set(self, query: str, payload: dict):
+        key = self.key_for(query)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, expires_at, payload)
+
+        def write(db):
+            db.merge(CachedResponse(
+                key=key,
+                namespace=self.namespace,
+                query=normalize_query(query),
+                payload=json.dumps(payload),
+                expires_at=expires_at,
+                hits=0
+            ))
+
+        self._write(write)
+
+        with self._lock:
+            self._sets_since_prune += 1
+            due = self._sets_since_prune >= self.prune_every
+            if due:
+                self._sets_since_prune = 0
+        if due:
+            self._write(self._prune)
+
+    def invalidate(self, query: Optional[str] = None) -> int:
+        """Drop one query (any template version) or, with no query, the whole namespace."""
+        def write(db):
+            rows = db.query(CachedResponse).filter(CachedResponse.namespace == self.namespace)
+            if query is not None:
+                rows = rows.filter(CachedResponse.query == normalize_query(query))
+            return rows.delete(synchronize_session=False)
+
+        removed = db_writer.submit(write).result()
+
+        with self._lock:
+            if query is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(self.key_for(query), None)
+        return removed
+
+    def flush_hits(self) -> Optional[Future]:
+        """Write the disk hits counted since the last flush, one UPDATE for all keys."""
+        with self._lock:
+            pending, self._pending_hits, self._pending_total = self._pending_hits, {}, 0
+        if not pending:
+            return None
+
+        table = CachedResponse.__table__
+        statement = (
+            update(table)
+            .where(table.c.key == bindparam("b_key"))
+            .values(hits=func.coalesce(table.c.hits, 0) + bindparam("b_hits"))
+        )
+        return self._write(lambda db: db.execute(
+            statement, [{"b_key": key, "b_hits": hits} for key, hits in pending.items()]
+        ))
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        db = ReadSessionLocal()
+        try:
+            disk_entries = db.query(CachedResponse).filter(CachedResponse.namespace == self.namespace).count()
+        finally:
+            db.close()
+
+        return {
+            "namespace": self.namespace,
+            "template_version": self.template_version,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+        }
+
+    def _remember(self, key: str, expires_at: float, payload: dict):
+        with self._lock:
+            self._memory[key] = (expires_at, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[dict]:
+        db = ReadSessionLocal()
+        try:
+            row = db.query(CachedResponse).filter(CachedResponse.key == key).first()
+            # Expired rows are left for _prune to delete
+            if not row or row.expires_at <= now:
+                return None
+            payload = json.loads(row.payload)
+            self._remember(key, row.expires_at, payload)
+        except Exception:
+            return None
+        finally:
+            db.close()
+
+        self._count_hit(key)
+        return payload
+
+    def _count_hit(self, key: str):
+        with self._lock:
+            self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+            self._pending_total += 1
+            due = self._pending_total >= self.hit_flush_every
+        if due:
+            self.flush_hits()
+
+    def _write(self, fn) -> Future:
+        """Queue a best-effort write; the in-memory tier already has the data."""
+        future = db_writer.submit(fn)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def _log_failure(self, future: Future):
+        if future.exception() is not None:
+            logger.warning("Response cache write (%s) failed: %s", self.namespace, future.exception())
+
+    def _prune(self, db):
+        """Drop expired rows, then the oldest rows beyond max_disk_entries."""
+        rows = db.query(CachedResponse).filter(CachedResponse.namespace == self.namespace)
+        rows.filter(CachedResponse.expires_at <= time.time()).delete(synchronize_session=False)
+
+        overflow = rows.count() - self.max_disk_entries
+        if overflow > 0:
+            oldest = [
+                key for (key,) in rows.with_entities(CachedResponse.key)
+                .order_by(CachedResponse.expires_at.asc())
+                .limit(overflow)
+            ]
+            rows.filter(CachedResponse.key.in_(oldest)).delete(synchronize_session=False)
@@ -0,0 +1,84 @@
+"""
+List every column main.py filters on that no index can serve.
+
+    cd backend && python check_indexes.py [files...]
+
+Looks at the `Model.column` references inside each `.filter(...)` /
+`.where(...)` call and checks the model metadata for an index (or primary
+/ unique key) led by one of them. A call with no such column is reported,
+since it can only be answered by scanning the whole table. Exits with
+status 1 when something is missing, so it can gate CI.
+"""
+import ast
+import os
+import sys
+
+from sqlalchemy import ForeignKeyConstraint
+
+from models import Base
+
+FILTER_METHODS = {"filter", "where"}
+
+
+def mapped_tables() -> dict:
+    return {mapper.class_.__name__: mapper.local_table for mapper in Base.registry.mappers}
+
+
+def indexed_columns(table) -> set:
+    """Columns that are the leading column of some index on `table`."""
+    leading = set()
+    for index in table.indexes:
+        leading.add(index.columns.values()[0].name)
+    for constraint in table.constraints:
+        columns = getattr(constraint, "columns", None)
+        if columns is not None and len(columns) and not isinstance(constraint, ForeignKeyConstraint):
+            leading.add(columns.values()[0].name)
+    return leading
+
+
+def filter_calls(path: str, models: set):
+    """Yield (line, [(model, column), ...]) for each filter()/where() call in `path`."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in FILTER_METHODS):
+            continue
+        columns = [
+            (inner.value.id, inner.attr)
+            for arg in node.args
+            for inner in ast.walk(arg)
+            if isinstance(inner, ast.Attribute) and isinstance(inner.value, ast.Name)
+            and inner.value.id in models
+        ]
+        if columns:
+            yield node.lineno, columns
+
+
+def check(paths) -> list:
+    tables = mapped_tables()
+    missing = []
+    seen = set()
+    for path in paths:
+        for line, columns in filter_calls(path, set(tables)):
+            columns = [(model, column) for model, column in columns if column in tables[model].columns]
+            # One indexed column is enough to narrow the scan; the rest are checked per row
+            if any(column in indexed_columns(tables[model]) for model, column in columns):
+                continue
+            for model, column in columns:
+                if (model, column) not in seen:
+                    seen.add((model, column))
+                    missing.append((path, line, f"{tables[model].name}.{column}"))
+    return missing
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(here, "main.py")]
+    missing = check(paths)
+    for path, line, column in missing:
+        print(f"{os.path.relpath(path)}:{line}: {column} has no index")
+    if missing:
+        sys.exit(1)
+    print(f"✅ every filtered column in {', '.join(os.path.basename(p) for p in paths)} is indexed")
@@ -0,0 +1,123 @@
+"""
+Check that a garden saved from its own binary snapshot is a faithful copy.
+
+    cd backend && python check_snapshot_roundtrip.py
+
+Saves a small garden against a throwaway SQLite file, encodes and decodes
+it with snapshot.py, and saves the result as a new session the way
+/api/save-game-state/snapshot does. The copy must have the same number of
+rows in every table. Its branches, leaves and flashcards may only point
+at branches of the copy, never at the original session. Exits with status
+1 when something differs, so it can gate CI.
+"""
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "check_snapshot.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import func, select  # noqa: E402
+
+import snapshot  # noqa: E402
+from game_state import load_game_state_dict, save_full_state, state_from_snapshot  # noqa: E402
+from models import (  # noqa: E402
+    Branch, Flashcard, Flower, Fruit, GameSession, Leaf, SearchResult, SessionLocal, create_tables
+)
+
+TABLES = (SearchResult, Branch, Leaf, Fruit, Flower, Flashcard)
+
+
+def make_garden() -> SimpleNamespace:
+    branches, leaves, flashcards = [], [], []
+    for i in range(12):
+        branches.append({
+            "clientId": f"branch_{i}",
+            "parentBranchId": f"branch_{(i - 1) // 2}" if i else None,
+            "start": {"x": i, "y": i}, "end": {"x": i + 1, "y": i + 2},
+            "length": 40, "maxLength": 60, "angle": 0.3, "thickness": 3,
+            "generation": i.bit_length(), "nodeType": "branch",
+            "searchResult": {"title": f"Insight {i}", "snippet": "s", "llm_content": "c"} if i >= 3 else None,
+        })
+        leaves.append({"x": i, "y": i, "size": 1.0})
+        if i % 3 == 0:
+            flashcards.append({"front": f"Q{i}", "back": f"A{i}", "difficulty": "easy"})
+    return SimpleNamespace(
+        original_search_query="round trip",
+        search_results=[{"title": f"Area {i}", "snippet": "s"} for i in range(3)],
+        branches=branches, leaves=leaves, fruits=[{"x": 0, "y": 0}], flowers=[{"x": 1, "y": 1}],
+        flashcards=flashcards, camera_offset={"x": 0, "y": 0},
+    )
+
+
+def counts(db, session_id: int) -> dict:
+    return {
+        model.__tablename__: db.scalar(
+            select(func.count()).select_from(model).where(model.game_session_id == session_id)
+        )
+        for model in TABLES
+    }
+
+
+def attach_children(db, session_id: int):
+    """Give the saved leaves and flashcards a branch each, like the game does."""
+    branch_ids = db.scalars(select(Branch.id).where(Branch.game_session_id == session_id)).all()
+    for model in (Leaf, Flashcard):
+        rows = db.scalars(select(model).where(model.game_session_id == session_id)).all()
+        for row, branch_id in zip(rows, branch_ids):
+            row.branch_id = branch_id
+
+
+def foreign_refs(db, session_id: int) -> list:
+    """Branch refs of session_id's rows that point at branches of some other session."""
+    own = select(Branch.id).where(Branch.game_session_id == session_id)
+    problems = []
+    for model, column in ((Branch, Branch.parent_branch_id), (Leaf, Leaf.branch_id), (Flashcard, Flashcard.branch_id)):
+        stray = db.scalar(
+            select(func.count()).select_from(model)
+            .where(model.game_session_id == session_id, column.is_not(None), column.not_in(own))
+        )
+        if stray:
+            problems.append(f"{stray} {model.__tablename__} point outside session {session_id}")
+    return problems
+
+
+def main() -> int:
+    create_tables()
+    db = SessionLocal()
+    try:
+        original_id = save_full_state(db, make_garden())
+        attach_children(db, original_id)
+        db.commit()
+
+        original = db.get(GameSession, original_id)
+        blob = snapshot.encode(load_game_state_dict(db, original))
+        copy_id = save_full_state(db, state_from_snapshot(snapshot.decode(blob)))
+        db.commit()
+
+        problems = []
+        before, after = counts(db, original_id), counts(db, copy_id)
+        for table, expected in before.items():
+            if after[table] != expected:
+                problems.append(f"{table}: {expected} rows saved, {after[table]} after the round trip")
+        problems += foreign_refs(db, copy_id)
+        linked = db.scalar(
+            select(func.count()).select_from(Leaf)
+            .where(Leaf.game_session_id == copy_id, Leaf.branch_id.is_not(None))
+        )
+        if linked != before[Leaf.__tablename__]:
+            problems.append(f"{linked} of {before[Leaf.__tablename__]} leaves kept their branch")
+    finally:
+        db.close()
+
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+    print("Snapshot round trip keeps every row and branch link.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
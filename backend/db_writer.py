@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from models import AsyncSessionLocal, CONCURRENT_STORAGE, WriteSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Funnels database writes from every request through one writer thread.
+
+    Each job is a function `fn(db) -> result` run inside its own SAVEPOINT,
+    so a failing job is rolled back alone. Whatever queued up while the
+    previous batch was committing goes out together as one group commit,
+    which keeps SQLite to a single writer and no `database is locked`.
+
+    Disabled (the default storage profile), jobs commit individually, like
+    the endpoints used to: run() on an async session, submit() inline.
+    """
+
+    def __init__(self, enabled: bool = CONCURRENT_STORAGE, max_batch: int = 64):
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.batches = 0
+        self._batch_sizes = deque(maxlen=500)
+        self._commit_seconds = deque(maxlen=500)
+
+    def submit(self, fn: Callable[[Session], object]) -> Future:
+        if not self.enabled:
+            return self._run_inline(fn)
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    async def run(self, fn: Callable[[Session], object]):
+        """Queue `fn` and wait for its batch to commit without blocking the event loop."""
+        if not self.enabled:
+            return await self._run_async(fn)
+        return await asyncio.wrap_future(self.submit(fn))
+
+    async def _run_async(self, fn):
+        async with AsyncSessionLocal() as db:
+            try:
+                result = await db.run_sync(fn)
+                await db.commit()
+                return result
+            except Exception:
+                await db.rollback()
+                self.failed_jobs += 1
+                raise
+            finally:
+                self.jobs += 1
+
+    def _run_inline(self, fn) -> Future:
+        future = Future()
+        db = WriteSessionLocal()
+        try:
+            result = fn(db)
+            db.commit()
+            future.set_result(result)
+        except Exception as e:
+            db.rollback()
+            self.failed_jobs += 1
+            future.set_exception(e)
+        finally:
+            db.close()
+            self.jobs += 1
+        return future
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            batch = [job]
+            while len(batch) < self.max_batch:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    self._queue.put(_STOP)
+                    break
+                batch.append(job)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: list):
+        outcomes = []
+        db = WriteSessionLocal()
+        try:
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                savepoint = db.begin_nested()
+                try:
+                    result = fn(db)
+                    db.flush()
+                    savepoint.commit()
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    savepoint.rollback()
+                    outcomes.append((future, None, e))
+
+            started = time.perf_counter()
+            db.commit()
+            self._commit_seconds.append(time.perf_counter() - started)
+        except Exception as e:
+            # The group commit itself failed: nothing in this batch was written
+            logger.error("Write batch of %d failed: %s", len(batch), e)
+            db.rollback()
+            outcomes = [(future, None, e) for future, _, _ in outcomes]
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.jobs += len(outcomes)
+        self._batch_sizes.append(len(outcomes))
+        for future, result, error in outcomes:
+            if error is not None:
+                self.failed_jobs += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        sizes = list(self._batch_sizes)
+        commits = list(self._commit_seconds)
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self._queue.qsize(),
+            "jobs": self.jobs,
+            "failed_jobs": self.failed_jobs,
+            "batches": self.batches,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else None,
+            "avg_commit_ms": round(sum(commits) / len(commits) * 1000, 2) if commits else None,
+        }
+
+    def stop(self, timeout: float = 10):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+writer = WriteQueue()
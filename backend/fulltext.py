@@ -0,0 +1,155 @@
+"""
+Full-text search over one player's saved insights and flashcards, backed
+by the FTS5 tables from migrations 0008/0010 (SQLite only; triggers keep
+them in sync).
+
+User text is turned into a safe MATCH expression: every word must appear,
+the last one as a prefix so partial input already finds something.
+A search runs in two steps so it stays fast on large tables:
+  1. rank inside FTS5 (bm25, titles and card fronts weighted up). The
+     player's garden ids go into the MATCH itself against the indexed
+     game_session_id column, so other players' rows are never visited;
+     past FULLTEXT_SCOPE_SESSIONS gardens that OR list costs more than it
+     saves and the matches are filtered through the source table instead.
+     A word that is in most rows would otherwise score every one of them,
+     so only the newest FULLTEXT_RANK_WINDOW matches per kind are ranked;
+  2. highlight and snippet only the rows of the requested page.
+Highlighted words come back wrapped in <mark>; everything else is HTML
+escaped.
+"""
+import html
+import os
+import re
+from typing import List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from models import DATABASE_URL, GameSession
+
+FTS_AVAILABLE = DATABASE_URL.startswith("sqlite")
+FULLTEXT_RANK_WINDOW = int(os.getenv("FULLTEXT_RANK_WINDOW", "2000"))
+FULLTEXT_SCOPE_SESSIONS = int(os.getenv("FULLTEXT_SCOPE_SESSIONS", "64"))
+
+MAX_TERMS = 12
+SNIPPET_TOKENS = 24
+# A quoted all-digit term, the only kind that can hit a game_session_id token
+NUMBER = re.compile(r'"\d+"')
+# Markers FTS5 puts around hits; swapped for <mark> after escaping
+OPEN, CLOSE = "\x02", "\x03"
+
+# kind -> (FTS table, source table, text columns, snippet column, extra source column)
+KINDS = {
+    "insight": ("search_results_fts", "search_results", "title snippet llm_content", -1, "NULL"),
+    "flashcard": ("flashcards_fts", "flashcards", "front back", 1, "s.branch_id"),
+}
+
+
+def match_query(query: str) -> Optional[str]:
+    """'Rollup sequenc' -> '"rollup" "sequenc"*'; None when there is nothing to search for."""
+    words = re.findall(r"\w+", query.lower())[:MAX_TERMS]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def marked(value: Optional[str]) -> str:
+    escaped = html.escape(value or "")
+    return escaped.replace(OPEN, "<mark>").replace(CLOSE, "</mark>")
+
+
+def _text_match(kind: str, match: str) -> str:
+    """The user's terms, kept off the game_session_id column."""
+    # The column filter makes FTS5 check positions on every row, so it is
+    # only added when a number could otherwise match a garden id
+    if NUMBER.search(match):
+        return f"{{{KINDS[kind][2]}}} : ({match})"
+    return match
+
+
+def _ranked(kind: str, match: str, session_ids: List[int]) -> tuple:
+    """SQL ranking one kind's matches in the given gardens, and its MATCH expression."""
+    fts, source, _, _, _ = KINDS[kind]
+    match = _text_match(kind, match)
+    if len(session_ids) <= FULLTEXT_SCOPE_SESSIONS:
+        sessions = " OR ".join(str(int(i)) for i in session_ids)
+        scope = f"WHERE {fts} MATCH :{kind}"
+        match = f"game_session_id : ({sessions}) AND {match}"
+    else:
+        scope = (
+            f"JOIN {source} s ON s.id = f.rowid WHERE {fts} MATCH :{kind} "
+            f"AND s.game_session_id IN (SELECT id FROM game_sessions WHERE user_id = :user_id)"
+        )
+    sql = (
+        f"SELECT '{kind}' AS kind, id, score FROM ("
+        f"SELECT f.rowid AS id, f.rank AS score FROM {fts} f {scope} ORDER BY f.rowid DESC LIMIT :window)"
+    )
+    return sql, match
+
+
+def _page(kind: str, ids: List[int]) -> tuple:
+    fts, source, _, snippet_column, extra = KINDS[kind]
+    id_list = ", ".join(str(int(i)) for i in ids)
+    # FTS5 gets only the rowid range: given the IN list (or a join) it re-runs
+    # the match, prefix expansion included, once per id. `+rowid` keeps the
+    # list out of its hands and just filters what the range returns.
+    marks = (
+        f"SELECT rowid AS id, highlight({fts}, 0, :open, :close) AS title, "
+        f"snippet({fts}, {snippet_column}, :open, :close, '…', {SNIPPET_TOKENS}) AS excerpt "
+        f"FROM {fts} WHERE {fts} MATCH :match AND rowid BETWEEN {min(ids)} AND {max(ids)} "
+        f"AND +rowid IN ({id_list})"
+    )
+    owners = (
+        f"SELECT s.id AS id, s.game_session_id AS session_id, {extra} AS branch_id, "
+        f"g.original_search_query AS garden "
+        f"FROM {source} s JOIN game_sessions g ON g.id = s.game_session_id WHERE s.id IN ({id_list})"
+    )
+    return marks, owners
+
+
+def search(db: Session, match: str, kinds: List[str], user_id: int, limit: int, offset: int = 0) -> list:
+    """Ranked, highlighted results for one page of user_id's gardens (as dicts), best first."""
+    session_ids = db.scalars(select(GameSession.id).where(GameSession.user_id == user_id)).all()
+    if not session_ids:
+        return []
+
+    params = {"user_id": user_id, "window": FULLTEXT_RANK_WINDOW, "limit": limit, "offset": offset}
+    parts = []
+    for kind in kinds:
+        sql, params[kind] = _ranked(kind, match, session_ids)
+        parts.append(sql)
+    union = " UNION ALL ".join(parts)
+    # Lowest bm25 is best; kind and id break ties so pages don't overlap
+    ranked = db.execute(
+        text(f"SELECT kind, id, score FROM ({union}) ORDER BY score, kind, id LIMIT :limit OFFSET :offset"), params
+    ).all()
+
+    marks, owners = {}, {}
+    for kind in kinds:
+        ids = [row.id for row in ranked if row.kind == kind]
+        if ids:
+            marks_sql, owners_sql = _page(kind, ids)
+            rows = db.execute(
+                text(marks_sql), {"match": _text_match(kind, match), "open": OPEN, "close": CLOSE}
+            ).all()
+            marks.update(((kind, row.id), row) for row in rows)
+            owners.update(((kind, row.id), row) for row in db.execute(text(owners_sql)).all())
+
+    results = []
+    for kind, row_id, score in ranked:
+        mark, owner = marks.get((kind, row_id)), owners.get((kind, row_id))
+        if mark is None or owner is None:
+            continue
+        results.append({
+            "kind": kind,
+            "id": row_id,
+            "session_id": owner.session_id,
+            "branch_id": owner.branch_id,
+            "garden": owner.garden,
+            "title": marked(mark.title),
+            "excerpt": marked(mark.excerpt),
+            "score": round(-score, 3),  # bm25 is negative; higher is better here
+        })
+    return results
@@ -0,0 +1,537 @@
+"""
+Mapping between the frontend's game-state JSON and the database rows:
+bulk full saves, incremental (delta) saves keyed by the frontend's stable
+client ids, and the streaming load serializer.
+"""
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Iterator
+
+from sqlalchemy import bindparam, delete, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import GameSession, SearchResult, Branch, Leaf, Flashcard, Fruit, Flower
+
+# (column, path in the frontend dict, default)
+SEARCH_RESULT_FIELDS = [
+    ("title", ("title",), ""),
+    ("url", ("url",), ""),
+    ("snippet", ("snippet",), ""),
+    ("llm_content", ("llm_content",), ""),
+    ("search_query", ("search_query",), ""),
+]
+
+BRANCH_FIELDS = [
+    ("start_x", ("start", "x"), 0),
+    ("start_y", ("start", "y"), 0),
+    ("end_x", ("end", "x"), 0),
+    ("end_y", ("end", "y"), 0),
+    ("length", ("length",), 0),
+    ("max_length", ("maxLength",), 0),
+    ("angle", ("angle",), 0),
+    ("thickness", ("thickness",), 1),
+    ("generation", ("generation",), 0),
+    ("is_growing", ("isGrowing",), False),
+    ("growth_speed", ("growthSpeed",), 1.0),
+    ("node_type", ("nodeType",), "branch"),
+]
+
+LEAF_FIELDS = [
+    ("x", ("x",), 0),
+    ("y", ("y",), 0),
+    ("size", ("size",), 1.0),
+]
+
+FRUIT_FIELDS = LEAF_FIELDS + [("type", ("type",), "apple")]
+
+FLOWER_FIELDS = LEAF_FIELDS + [("type", ("type",), "🌸")]
+
+FLASHCARD_FIELDS = [
+    ("front", ("front",), ""),
+    ("back", ("back",), ""),
+    ("difficulty", ("difficulty",), "medium"),
+    ("category", ("category",), ""),
+    ("node_position_x", ("node_position", "x"), None),
+    ("node_position_y", ("node_position", "y"), None),
+]
+
+# kind -> (model, fields, key holding the client id of the owning branch)
+KINDS = {
+    "search_result": (SearchResult, SEARCH_RESULT_FIELDS, None),
+    "branch": (Branch, BRANCH_FIELDS, "parentClientId"),
+    "leaf": (Leaf, LEAF_FIELDS, "branchClientId"),
+    "fruit": (Fruit, FRUIT_FIELDS, None),
+    "flower": (Flower, FLOWER_FIELDS, None),
+    "flashcard": (Flashcard, FLASHCARD_FIELDS, "branchClientId"),
+}
+
+_MISSING = object()
+
+
+def columns_from(fields: list, data: dict, partial: bool = False) -> dict:
+    """
+    Translate a frontend dict into column values. With partial=True only
+    the keys present in `data` are returned (for updates).
+    """
+    columns = {}
+    for column, path, default in fields:
+        value = data
+        for key in path:
+            value = value.get(key, _MISSING) if isinstance(value, dict) else _MISSING
+            if value is _MISSING:
+                break
+        if value is _MISSING:
+            if partial:
+                continue
+            value = default
+        columns[column] = value
+    return columns
+
+
+class VersionConflict(Exception):
+    def __init__(self, current_version: int):
+        super().__init__(f"Game session is at version {current_version}")
+        self.current_version = current_version
+
+
+def apply_delta(db: Session, session_id: int, operations: list, base_version=None, camera_offset=None) -> int:
+    """
+    Apply add/update/delete operations to a saved session in the caller's
+    transaction and return the session's new version. Rows are matched by
+    (game_session_id, client_id); references to other rows use client ids
+    ("parentClientId" on branches, "branchClientId" on leaves/flashcards).
+    Deleting a branch also deletes its leaves and flashcards, and its search
+    result unless another branch uses it; its child branches become roots.
+    Raises LookupError for an unknown session, ValueError for a
+    reference to a branch client id the session doesn't have, and
+    VersionConflict when `base_version` is stale.
+    """
+    game_session = db.query(GameSession).filter(GameSession.id == session_id).first()
+    if not game_session:
+        raise LookupError("Game session not found")
+
+    current_version = game_session.version or 1
+    if base_version is not None and base_version != current_version:
+        raise VersionConflict(current_version)
+
+    # Preload every row the operations touch: one query per kind
+    wanted = {}
+    for op in operations:
+        wanted.setdefault(op.kind, set()).add(op.client_id)
+        for ref in ("parentClientId", "branchClientId"):
+            if op.data.get(ref) is not None:
+                wanted.setdefault("branch", set()).add(str(op.data[ref]))
+
+    rows = {}
+    for kind, client_ids in wanted.items():
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind: {kind}")
+        model = KINDS[kind][0]
+        rows[kind] = {
+            row.client_id: row
+            for row in db.query(model).filter(
+                model.game_session_id == session_id,
+                model.client_id.in_(client_ids)
+            )
+        }
+
+    now = datetime.now(timezone.utc)
+    pending_refs = []  # (row, column, referenced branch client id)
+    dropped_results = set()  # search results of deleted branches
+    deleted_branches = set()
+
+    for op in operations:
+        model, fields, ref_key = KINDS[op.kind]
+        existing = rows[op.kind].get(op.client_id)
+
+        if op.op == "delete":
+            if existing is not None:
+                if op.kind == "branch":
+                    deleted_branches.add(existing.id)
+                    if existing.search_result_id is not None:
+                        dropped_results.add(existing.search_result_id)
+                db.delete(existing)
+                del rows[op.kind][op.client_id]
+            continue
+
+        if op.op == "add" and existing is None:
+            row = model(game_session_id=session_id, client_id=op.client_id, created_at=now,
+                        **columns_from(fields, op.data))
+            db.add(row)
+            rows[op.kind][op.client_id] = row
+        elif op.op in ("add", "update") and existing is not None:
+            row = existing
+            for column, value in columns_from(fields, op.data, partial=True).items():
+                setattr(row, column, value)
+        elif op.op == "update":
+            raise LookupError(f"{op.kind} {op.client_id} not found")
+        else:
+            raise ValueError(f"Unknown op: {op.op}")
+
+        if ref_key and ref_key in op.data:
+            column = "parent_branch_id" if op.kind == "branch" else "branch_id"
+            pending_refs.append((row, column, op.data[ref_key]))
+
+        # Branches carry their own search result inline, as in full saves
+        if op.kind == "branch" and op.data.get("searchResult"):
+            values = columns_from(SEARCH_RESULT_FIELDS, op.data["searchResult"], partial=True)
+            if row.search_result is not None:
+                for column, value in values.items():
+                    setattr(row.search_result, column, value)
+            else:
+                row.search_result = SearchResult(
+                    game_session_id=session_id, created_at=now,
+                    **columns_from(SEARCH_RESULT_FIELDS, op.data["searchResult"])
+                )
+
+    if deleted_branches:
+        # Unlink children in one UPDATE, as delete_sessions() does, before the
+        # deletes are flushed (no autoflush, or the ORM would do it row by row)
+        with db.no_autoflush:
+            db.execute(
+                update(Branch)
+                .where(Branch.parent_branch_id.in_(deleted_branches))
+                .values(parent_branch_id=None)
+                .execution_options(synchronize_session=False)
+            )
+
+    # One flush gives every new branch an id, then client-id references resolve
+    db.flush()
+    branches = rows.get("branch", {})
+    for row, column, ref in pending_refs:
+        target = branches.get(str(ref)) if ref is not None else None
+        if ref is not None and target is None:
+            raise ValueError(f"Unknown branch client id: {ref}")
+        setattr(row, column, target.id if target is not None else None)
+
+    if dropped_results:
+        db.execute(
+            delete(SearchResult).where(
+                SearchResult.id.in_(dropped_results),
+                ~exists().where(Branch.search_result_id == SearchResult.id),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    values = {}
+    if camera_offset:
+        values[GameSession.camera_offset_x] = camera_offset.get("x", game_session.camera_offset_x)
+        values[GameSession.camera_offset_y] = camera_offset.get("y", game_session.camera_offset_y)
+    return bump_version(db, session_id, current_version, now, values)
+
+
+def bump_version(db: Session, session_id: int, current_version: int, now: datetime, values: dict = None) -> int:
+    """
+    Compare-and-swap the session to current_version + 1 (plus any other
+    `values`), so two concurrent edits can't both win. Returns the new version.
+    """
+    values = {**(values or {}), GameSession.version: current_version + 1, GameSession.updated_at: now}
+    swapped = db.query(GameSession).filter(
+        GameSession.id == session_id,
+        func.coalesce(GameSession.version, 1) == current_version
+    ).update(values, synchronize_session=False)
+    if not swapped:
+        raise VersionConflict(current_version)
+    return current_version + 1
+
+
+def _rows_for(fields: list, items: list, session_id: int, now: datetime, **extra) -> list:
+    return [
+        dict(columns_from(fields, item), game_session_id=session_id, client_id=item.get("clientId"),
+             created_at=now, **extra)
+        for item in items
+    ]
+
+
+def save_full_state(db: Session, state) -> int:
+    """
+    Insert a complete game state as a new session using bulk core inserts:
+    one statement per table (executemany / insert..returning) instead of
+    an ORM add() and flush per row. Core tables are used on purpose: ORM
+    bulk inserts split batches whenever NULL-ness differs between rows.
+    Leaves and flashcards may name their branch by "branchClientId" instead
+    of a row id, the way parentBranchId can. Returns the new session id.
+    """
+    now = datetime.now(timezone.utc)
+    camera = state.camera_offset or {}
+    sessions = GameSession.__table__
+    session_id = db.execute(
+        insert(sessions).returning(sessions.c.id),
+        {
+            "original_search_query": state.original_search_query,
+            "camera_offset_x": camera.get("x", 0.0),
+            "camera_offset_y": camera.get("y", 0.0),
+            "version": 1,
+            "user_id": getattr(state, "user_id", None),
+            "tree_id": getattr(state, "tree_id", None),
+            "created_at": now,
+            "updated_at": now,
+        }
+    ).scalar_one()
+
+    # Search results: the top-level list first, then one per branch that carries its own
+    own_results = [b["searchResult"] for b in state.branches if b.get("searchResult")]
+    result_rows = _rows_for(SEARCH_RESULT_FIELDS, list(state.search_results) + own_results, session_id, now)
+    result_ids = _insert_returning_ids(db, SearchResult, result_rows)
+    top_level_ids = result_ids[:len(state.search_results)]
+    own_ids = iter(result_ids[len(state.search_results):])
+
+    # Parent links that point at another branch of this payload (by clientId)
+    # can only be resolved once every branch has its id
+    payload_ids = {str(b["clientId"]) for b in state.branches if b.get("clientId") is not None}
+    parent_refs = []
+
+    branch_rows = []
+    for i, branch_data in enumerate(state.branches):
+        if branch_data.get("searchResult"):
+            search_result_id = next(own_ids)
+        elif i < len(top_level_ids) and getattr(state, "link_results_by_index", True):
+            # Fallback to index-based matching for initial branches
+            search_result_id = top_level_ids[i]
+        else:
+            search_result_id = None
+
+        parent = branch_data.get("parentBranchId")
+        if parent is not None and str(parent) in payload_ids:
+            parent_refs.append((i, str(parent)))
+            parent = None
+
+        row = columns_from(BRANCH_FIELDS, branch_data)
+        row.update(
+            game_session_id=session_id,
+            client_id=branch_data.get("clientId"),
+            search_result_id=search_result_id,
+            parent_branch_id=parent,
+            created_at=now,
+        )
+        branch_rows.append(row)
+    branch_ids = _insert_returning_ids(db, Branch, branch_rows)
+    new_ids = {
+        str(branch_data["clientId"]): branch_id
+        for branch_data, branch_id in zip(state.branches, branch_ids)
+        if branch_data.get("clientId") is not None
+    }
+
+    if parent_refs:
+        branches = Branch.__table__
+        db.execute(
+            update(branches)
+            .where(branches.c.id == bindparam("b_id"))
+            .values(parent_branch_id=bindparam("b_parent")),
+            [{"b_id": branch_ids[i], "b_parent": new_ids[parent]} for i, parent in parent_refs]
+        )
+
+    def owner(item: dict, id_key: str):
+        if item.get("branchClientId") is not None:
+            return new_ids.get(str(item["branchClientId"]))
+        return item.get(id_key)
+
+    leaf_rows = [
+        dict(row, branch_id=owner(item, "branchId"))
+        for row, item in zip(_rows_for(LEAF_FIELDS, state.leaves, session_id, now), state.leaves)
+    ]
+    flashcard_rows = [
+        dict(row, branch_id=owner(item, "branch_id"))
+        for row, item in zip(_rows_for(FLASHCARD_FIELDS, state.flashcards, session_id, now), state.flashcards)
+    ]
+    for model, rows in (
+        (Leaf, leaf_rows),
+        (Fruit, _rows_for(FRUIT_FIELDS, state.fruits, session_id, now)),
+        (Flower, _rows_for(FLOWER_FIELDS, state.flowers, session_id, now)),
+        (Flashcard, flashcard_rows),
+    ):
+        if rows:
+            db.execute(insert(model.__table__), rows)
+
+    return session_id
+
+
+def _insert_returning_ids(db: Session, model, rows: list) -> list:
+    if not rows:
+        return []
+    table = model.__table__
+    result = db.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.scalars())
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _search_result_json(row) -> dict:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "url": row.url,
+        "snippet": row.snippet,
+        "llm_content": row.llm_content,
+        "search_query": row.search_query
+    }
+
+
+def _branch_json(row) -> dict:
+    return {
+        "id": row.id,
+        "start": {"x": row.start_x, "y": row.start_y},
+        "end": {"x": row.end_x, "y": row.end_y},
+        "length": row.length,
+        "maxLength": row.max_length,
+        "angle": row.angle,
+        "thickness": row.thickness,
+        "generation": row.generation,
+        "isGrowing": row.is_growing,
+        "growthSpeed": row.growth_speed,
+        "nodeType": row.node_type,
+        "parentBranchId": row.parent_branch_id,
+        "searchResult": {
+            "id": row.sr_id,
+            "title": row.sr_title,
+            "url": row.sr_url,
+            "snippet": row.sr_snippet,
+            "llm_content": row.sr_llm_content
+        } if row.sr_id is not None else None
+    }
+
+
+def _leaf_json(row) -> dict:
+    return {"id": row.id, "x": row.x, "y": row.y, "size": row.size, "branchId": row.branch_id}
+
+
+def _decoration_json(row) -> dict:
+    return {"id": row.id, "x": row.x, "y": row.y, "type": row.type, "size": row.size}
+
+
+def _flashcard_json(row) -> dict:
+    return {
+        "id": row.id,
+        "branch_id": row.branch_id,
+        "front": row.front,
+        "back": row.back,
+        "difficulty": row.difficulty,
+        "category": row.category,
+        "node_position": {
+            "x": row.node_position_x,
+            "y": row.node_position_y
+        } if row.node_position_x is not None and row.node_position_y is not None else None,
+        "created_at": _iso(row.created_at),
+        "last_reviewed": _iso(row.last_reviewed),
+        "review_count": row.review_count
+    }
+
+
+def game_state_queries(session_id: int) -> list:
+    """(key, select, serializer) for every child table: one query each, branches joined to their search result."""
+    results = SearchResult.__table__
+    branches = Branch.__table__
+
+    def for_session(table):
+        return select(table).where(table.c.game_session_id == session_id).order_by(table.c.id)
+
+    branch_query = (
+        select(
+            branches,
+            results.c.id.label("sr_id"),
+            results.c.title.label("sr_title"),
+            results.c.url.label("sr_url"),
+            results.c.snippet.label("sr_snippet"),
+            results.c.llm_content.label("sr_llm_content"),
+        )
+        .select_from(branches.outerjoin(results, branches.c.search_result_id == results.c.id))
+        .where(branches.c.game_session_id == session_id)
+        .order_by(branches.c.id)
+    )
+
+    return [
+        ("search_results", for_session(results), _search_result_json),
+        ("branches", branch_query, _branch_json),
+        ("leaves", for_session(Leaf.__table__), _leaf_json),
+        ("flashcards", for_session(Flashcard.__table__), _flashcard_json),
+        ("fruits", for_session(Fruit.__table__), _decoration_json),
+        ("flowers", for_session(Flower.__table__), _decoration_json),
+    ]
+
+
+def stream_game_state(db: Session, game_session: GameSession, batch_size: int = 500) -> Iterator[str]:
+    """
+    Yield the load-game-state response as JSON text, row by row, so the
+    whole tree never has to sit in memory as nested dicts.
+    """
+    yield '{"success": true, "game_state": {'
+    yield f'"original_search_query": {json.dumps(game_session.original_search_query)}, '
+    yield f'"version": {game_session.version or 1}, '
+    yield f'"tree_id": {json.dumps(game_session.tree_id)}'
+
+    for key, query, to_json in game_state_queries(game_session.id):
+        yield f', "{key}": ['
+        first = True
+        for rows in db.execute(query.execution_options(yield_per=batch_size)).partitions():
+            chunk = ", ".join(json.dumps(to_json(row)) for row in rows)
+            yield chunk if first else ", " + chunk
+            first = False
+        yield "]"
+
+    yield ', "camera_offset": ' + json.dumps({"x": game_session.camera_offset_x, "y": game_session.camera_offset_y})
+    yield f', "created_at": {json.dumps(_iso(game_session.created_at))}'
+    yield f', "updated_at": {json.dumps(_iso(game_session.updated_at))}'
+    yield "}}"
+
+
+def load_game_state_dict(db: Session, game_session: GameSession) -> dict:
+    """Same content as stream_game_state(), built in memory (used for snapshots)."""
+    state = {
+        "original_search_query": game_session.original_search_query,
+        "version": game_session.version or 1,
+        "tree_id": game_session.tree_id,
+    }
+    for key, query, to_json in game_state_queries(game_session.id):
+        state[key] = [to_json(row) for row in db.execute(query)]
+    state["camera_offset"] = {"x": game_session.camera_offset_x, "y": game_session.camera_offset_y}
+    state["created_at"] = _iso(game_session.created_at)
+    state["updated_at"] = _iso(game_session.updated_at)
+    return state
+
+
+def state_from_snapshot(game_state: dict) -> SimpleNamespace:
+    """
+    Turn a decoded snapshot into input for save_full_state(). Branch ids
+    become client ids, so parent links and the branch refs of leaves and
+    flashcards are re-pointed at the newly inserted rows. The top-level
+    search results already include every branch's own result; only the
+    ones no branch carries are kept from that list.
+    """
+    ids = {branch.get("id") for branch in game_state["branches"]} - {None}
+    branches = []
+    for branch in game_state["branches"]:
+        branch = dict(branch)
+        if branch.get("id") is not None:
+            branch["clientId"] = str(branch["id"])
+        if branch.get("parentBranchId") in ids:
+            branch["parentBranchId"] = str(branch["parentBranchId"])
+        branches.append(branch)
+
+    def owned(items: list, id_key: str) -> list:
+        result = []
+        for item in items:
+            item = dict(item)
+            if item.get(id_key) in ids:
+                item["branchClientId"] = str(item[id_key])
+            item[id_key] = None  # never a row id of the old session
+            result.append(item)
+        return result
+
+    embedded = {(branch.get("searchResult") or {}).get("id") for branch in branches} - {None}
+    return SimpleNamespace(
+        original_search_query=game_state.get("original_search_query") or "",
+        search_results=[r for r in game_state["search_results"] if r.get("id") not in embedded],
+        link_results_by_index=False,
+        branches=branches,
+        leaves=owned(game_state["leaves"], "branchId"),
+        fruits=game_state["fruits"],
+        flowers=game_state["flowers"],
+        flashcards=owned(game_state["flashcards"], "branch_id"),
+        camera_offset=game_state.get("camera_offset") or {"x": 0.0, "y": 0.0},
+    )
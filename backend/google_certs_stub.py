@@ -0,0 +1,118 @@
+"""
+Local stand-in for Google's OAuth2 signing-certificate endpoint.
+
+Serves `{key id: x509 PEM}` like https://www.googleapis.com/oauth2/v1/certs,
+with a Cache-Control max-age, and signs ID tokens with the matching key so
+the whole /api/auth/google/verify flow runs offline
+(GET /token?aud=<GOOGLE_CLIENT_ID> returns one).
+
+    python google_certs_stub.py --port 8546 --latency 0.1 --max-age 3600
+    GOOGLE_CERTS_URL=http://127.0.0.1:8546/oauth2/v1/certs uvicorn main:app
+"""
+import argparse
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+KEY_ID = "stub-key-1"
+
+
+class CertAuthority:
+    def __init__(self, key_id: str = KEY_ID):
+        self.key_id = key_id
+        self.fetches = 0
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "stub.googleapis.com")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=30))
+            .sign(key, hashes.SHA256())
+        )
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+        key_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        self._signer = crypt.RSASigner.from_string(key_pem, key_id)
+
+    def issue_token(self, audience: str, sub: str = "stub-user", lifetime: int = 3600, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": audience,
+            "sub": sub,
+            "email": f"{sub}@example.com",
+            "email_verified": True,
+            "iat": now,
+            "exp": now + lifetime,
+            **claims,
+        }
+        return jwt.encode(self._signer, payload).decode()
+
+
+def make_handler(authority: CertAuthority, latency: float, max_age: int):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/token":
+                query = parse_qs(url.query)
+                data = authority.issue_token(query["aud"][0], sub=query.get("sub", ["stub-user"])[0]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            authority.fetches += 1
+            if latency:
+                time.sleep(latency)
+            data = json.dumps({authority.key_id: authority.cert_pem}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", f"public, max-age={max_age}, must-revalidate, no-transform")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8546, latency: float = 0.0, max_age: int = 3600) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; `server.authority.issue_token(...)` signs tokens."""
+    authority = CertAuthority()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(authority, latency, max_age))
+    server.authority = authority
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8546)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every certificate fetch")
+    parser.add_argument("--max-age", type=int, default=3600, help="Cache-Control max-age on the certificates")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.latency, args.max_age)
+    print(f"Google certs stub on http://127.0.0.1:{args.port}/oauth2/v1/certs")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,135 @@
+"""
+Google ID-token verification without a network round trip per login.
+
+google.oauth2.id_token.verify_oauth2_token() downloads Google's signing
+certificates on every call. GoogleTokenVerifier keeps them for as long
+as the response's Cache-Control/Expires headers allow, fetches them over
+one pooled session, and remembers tokens it has already verified until
+their `exp`. GOOGLE_CERTS_URL points it at a stand-in
+(`python google_certs_stub.py`) for local testing.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+import requests
+from google.auth import jwt
+from requests.adapters import HTTPAdapter
+
+from services import ServiceUnavailable
+
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+# Used when the certificate response carries no cache headers
+GOOGLE_CERTS_DEFAULT_TTL = float(os.getenv("GOOGLE_CERTS_DEFAULT_TTL", "300"))
+GOOGLE_TOKEN_CACHE_SIZE = int(os.getenv("GOOGLE_TOKEN_CACHE_SIZE", "1024"))
+# An unknown key id forces a refetch (key rotation), but at most this often
+GOOGLE_CERTS_MIN_REFRESH_SECONDS = 60
+
+
+def cache_ttl(headers) -> float:
+    """Seconds a response may be reused, from Cache-Control max-age (minus Age) or Expires."""
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return max(0.0, int(match.group(1)) - float(headers.get("Age", 0) or 0))
+    if headers.get("Expires"):
+        try:
+            return max(0.0, parsedate_to_datetime(headers["Expires"]).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return GOOGLE_CERTS_DEFAULT_TTL
+
+
+class GoogleTokenVerifier:
+    def __init__(self, client_id: str, certs_url: str = GOOGLE_CERTS_URL, cache_size: int = GOOGLE_TOKEN_CACHE_SIZE):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.cache_size = cache_size
+
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+
+        self._certs: dict = {}
+        self._certs_expire_at = 0.0
+        self._certs_fetched_at = 0.0
+        self._certs_lock = threading.Lock()
+        self._tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_lock = threading.Lock()
+
+        self.token_hits = 0
+        self.token_misses = 0
+        self.cert_fetches = 0
+
+    def verify(self, token: str) -> dict:
+        """Claims of a valid Google ID token for this client. Raises ValueError otherwise."""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+        with self._tokens_lock:
+            cached = self._tokens.get(key)
+            if cached is not None:
+                claims, expires_at = cached
+                if expires_at > now:
+                    self._tokens.move_to_end(key)
+                    self.token_hits += 1
+                    return claims
+                del self._tokens[key]
+            self.token_misses += 1
+
+        claims = self._decode(token)
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+
+        with self._tokens_lock:
+            self._tokens[key] = (claims, float(claims["exp"]))
+            while len(self._tokens) > self.cache_size:
+                self._tokens.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str) -> dict:
+        kid = jwt.decode_header(token).get("kid")
+        certs = self.certs()
+        if kid not in certs and time.monotonic() - self._certs_fetched_at > GOOGLE_CERTS_MIN_REFRESH_SECONDS:
+            # Google rotated its keys before our cached set expired
+            certs = self.certs(force=True)
+        return jwt.decode(token, certs=certs, audience=self.client_id)
+
+    def certs(self, force: bool = False) -> dict:
+        if not force and time.monotonic() < self._certs_expire_at:
+            return self._certs
+        with self._certs_lock:
+            # Another thread may have refreshed while we waited
+            if not force and time.monotonic() < self._certs_expire_at:
+                return self._certs
+            try:
+                response = self._session.get(self.certs_url, timeout=10)
+                response.raise_for_status()
+                certs = json.loads(response.text)
+            except (requests.RequestException, ValueError) as e:
+                if self._certs:
+                    # Keep verifying with the last good set rather than failing every login
+                    return self._certs
+                raise ServiceUnavailable(f"Could not fetch Google signing certificates: {e}") from e
+            self.cert_fetches += 1
+            self._certs = certs
+            self._certs_fetched_at = time.monotonic()
+            self._certs_expire_at = self._certs_fetched_at + cache_ttl(response.headers)
+            return certs
+
+    def stats(self) -> dict:
+        ttl = self._certs_expire_at - time.monotonic()
+        return {
+            "token_hits": self.token_hits,
+            "token_misses": self.token_misses,
+            "cached_tokens": len(self._tokens),
+            "cert_fetches": self.cert_fetches,
+            "certs_ttl_seconds": round(ttl, 1) if self._certs else None,
+        }
@@ -0,0 +1,156 @@
+"""
+Garden maturity growth, through one UPDATE.
+
+Growth events (quizzes, /api/apply-growth) go through
+GrowthPipeline.record(); generated flashcards call apply_growth_batch()
+in the same write that stores the cards. Each write is a single UPDATE
+that adds and caps the increments in SQL, so concurrent events can't
+overwrite each other. Events for the same garden that arrive while a
+write is in flight are summed and go out together in the next one. The
+write that takes a garden to 100 claims its `matured_at`, and only that
+write runs the on_mature hooks, in the same transaction. main.py hooks
+the credential mint in there.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+
+from db_writer import writer as db_writer
+from models import GameSession
+
+logger = logging.getLogger(__name__)
+
+MAX_MATURITY = 100
+
+# hook(db, garden, wallet_address) -> value reported back in GrowthOutcome.hook_results
+MatureHook = Callable[[Session, GameSession, Optional[str]], object]
+
+
+class GrowthOutcome(NamedTuple):
+    maturity: int
+    credential_earned: bool
+    matured: bool       # this write took the garden to 100
+    hook_results: dict  # hook name -> what it returned, when matured
+
+
+def apply_growth_batch(
+    db: Session,
+    increments: Dict[int, int],
+    wallets: Optional[Dict[int, str]] = None,
+    hooks: tuple = (),
+) -> Dict[int, GrowthOutcome]:
+    """
+    Add {garden id: increment} in the caller's transaction, keeping
+    maturity between 0 and MAX_MATURITY. Returns an outcome for every
+    garden that exists.
+    """
+    if not increments:
+        return {}
+    now = datetime.now(timezone.utc)
+    ids = list(increments)
+
+    grown = func.coalesce(GameSession.maturity, 0) + case(increments, value=GameSession.id, else_=0)
+    rows = db.execute(
+        update(GameSession)
+        .where(GameSession.id.in_(ids))
+        .values(maturity=case((grown > MAX_MATURITY, MAX_MATURITY), (grown < 0, 0), else_=grown), last_growth_at=now)
+        .returning(GameSession.id, GameSession.maturity, GameSession.credential_earned)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # Conditional on matured_at still being empty, so only one write ever sees a garden mature
+    matured = set(db.scalars(
+        update(GameSession)
+        .where(GameSession.id.in_(ids), GameSession.maturity >= MAX_MATURITY, GameSession.matured_at.is_(None))
+        .values(matured_at=now)
+        .returning(GameSession.id)
+        .execution_options(synchronize_session=False)
+    ).all())
+
+    outcomes = {}
+    for garden_id, maturity, earned in rows:
+        hook_results = {}
+        if garden_id in matured:
+            garden = db.get(GameSession, garden_id, populate_existing=True)
+            for hook in hooks:
+                hook_results[hook.__name__] = hook(db, garden, (wallets or {}).get(garden_id))
+            earned = garden.credential_earned
+        outcomes[garden_id] = GrowthOutcome(maturity, bool(earned), garden_id in matured, hook_results)
+    return outcomes
+
+
+class GrowthPipeline:
+    def __init__(self, writer):
+        self.writer = writer
+        self.hooks: tuple = ()
+        self._pending: Dict[int, list] = {}  # garden id -> [increment, wallet, futures]
+        self._drain_task: Optional[asyncio.Task] = None
+
+        self.events = 0
+        self.writes = 0
+        self.garden_updates = 0
+        self.matured = 0
+
+    def on_mature(self, hook: MatureHook) -> MatureHook:
+        """Run `hook` in the transaction where a garden reaches 100; usable as a decorator."""
+        self.hooks += (hook,)
+        return hook
+
+    async def record(self, garden_id: int, increment: int, wallet_address: Optional[str] = None) -> Optional[GrowthOutcome]:
+        """Grow one garden. Resolves once the write is committed; None if the garden doesn't exist."""
+        future = asyncio.get_running_loop().create_future()
+        entry = self._pending.setdefault(garden_id, [0, None, []])
+        entry[0] += increment
+        entry[1] = wallet_address or entry[1]
+        entry[2].append(future)
+        self.events += 1
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self):
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, {}
+                increments = {garden_id: entry[0] for garden_id, entry in batch.items()}
+                wallets = {garden_id: entry[1] for garden_id, entry in batch.items() if entry[1]}
+                try:
+                    outcomes = await self.writer.run(
+                        lambda db: apply_growth_batch(db, increments, wallets, self.hooks)
+                    )
+                except Exception as e:
+                    logger.error("Growth write for gardens %s failed: %s", list(batch), e)
+                    outcomes, error = {}, e
+                else:
+                    error = None
+                    self.writes += 1
+                    self.garden_updates += len(outcomes)
+                    self.matured += sum(outcome.matured for outcome in outcomes.values())
+
+                for garden_id, (_, _, futures) in batch.items():
+                    for future in futures:
+                        if future.done():
+                            continue
+                        if error is not None:
+                            future.set_exception(error)
+                        else:
+                            future.set_result(outcomes.get(garden_id))
+        finally:
+            self._drain_task = None
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "writes": self.writes,
+            "garden_updates": self.garden_updates,
+            "events_per_write": round(self.events / self.writes, 2) if self.writes else None,
+            "matured": self.matured,
+            "pending_gardens": len(self._pending),
+        }
+
+
+growth = GrowthPipeline(db_writer)
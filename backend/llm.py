@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+
+class LLMGateway:
+    """
+    Shared async entry point for every Groq chat completion.
+
+    One pooled httpx client per worker, and a semaphore that caps how many
+    completions can be in flight upstream at once (LLM_MAX_IN_FLIGHT).
+    Callers over the cap wait in the queue instead of blocking the event loop.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, timeout: Optional[float] = None):
+        self.max_in_flight = max_in_flight or int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+        self._client: Optional["AsyncGroq"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.queued = 0
+        self.total_calls = 0
+        self.failed_calls = 0
+        self.coalesced_calls = 0
+        self._pending: Dict[tuple, asyncio.Task] = {}
+        self._latencies = deque(maxlen=500)
+
+    @property
+    def client(self) -> "AsyncGroq":
+        if self._client is None:
+            # Imported here so starting a worker doesn't pay for the SDK until the first completion
+            from groq import AsyncGroq
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_in_flight,
+                    max_keepalive_connections=self.max_in_flight,
+                ),
+                timeout=self.timeout,
+            )
+            self._client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client)
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def complete(self, prompt: str, model: str = DEFAULT_MODEL, temperature: float = 0.4) -> str:
+        """
+        Run one chat completion and return the message text.
+
+        Identical concurrent requests (same model, temperature and prompt)
+        are single-flighted: the first caller goes upstream and the rest
+        await its result instead of paying for their own call.
+        """
+        key = (model, temperature, hashlib.sha256(prompt.encode()).hexdigest())
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced_calls += 1
+        else:
+            # The upstream call runs as its own task so one caller
+            # disconnecting doesn't cancel it for everyone else.
+            task = asyncio.ensure_future(self._complete(prompt, model, temperature))
+            self._pending[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: tuple, task: asyncio.Task):
+        self._pending.pop(key, None)
+        # Retrieve the exception so a failure nobody awaited isn't logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    async def _complete(self, prompt: str, model: str, temperature: float) -> str:
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.total_calls += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+            )
+            return response.choices[0].message.content or ""
+        except Exception:
+            self.failed_calls += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    async def stream(self, prompt: str, model: str = DEFAULT_MODEL, temperature: float = 0.4) -> AsyncIterator[str]:
+        """Like complete(), but yields text deltas as the model produces them."""
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.total_calls += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception:
+            self.failed_calls += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "total_calls": self.total_calls,
+            "failed_calls": self.failed_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "pending_prompts": len(self._pending),
+            "latency_ms": {
+                "samples": count,
+                "avg": round(sum(latencies) / count * 1000, 1) if count else None,
+                "p50": round(latencies[count // 2] * 1000, 1) if count else None,
+                "p95": round(latencies[min(count - 1, int(count * 0.95))] * 1000, 1) if count else None,
+            },
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+gateway = LLMGateway()
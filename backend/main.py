@@ -1,20 +1,16 @@
 USERS = {}
-from cryptography.fernet import Fernet
 import base64
 import hashlib
+import hmac
 from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-from eth_account import Account
-
 from sqlalchemy import Column, Integer, String, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import Session
-from models import NFTCredential, SessionLocal, User
+from models import NFTCredential, SessionLocal, User, STORAGE_PROFILE, POOL_METRICS
 
 
 
@@ -31,24 +27,23 @@ from sqlalchemy.orm import Session
 import logging
 import os
 import json
+import random
+import asyncio
 from datetime import datetime, timezone
-from typing import Optional
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 class GoogleTokenRequest(BaseModel):
     token: str
 #chirag code above
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from seeds import Web3Seed
-from utils import apply_growth
 from models import Credential
 
 
@@ -61,37 +56,37 @@ from datetime import datetime, timezone
 from typing import Optional
 
 
-from groq import Groq
 import os
 from dotenv import load_dotenv # Add this
 load_dotenv()                # And this
+from llm import gateway as llm
+from db_writer import writer as db_writer
+from cache import ResponseCache
+from retrieval import InsightIndex
+from seed_packs import PACK_TOPICS, build_seed_pack, seed_packs
+from uniqueness import TitleRegistry, normalize_title, pick_unique
+from streaming import ArrayItemParser, event_stream
+from game_state import (
+    apply_delta, load_game_state_dict, save_full_state, state_from_snapshot, stream_game_state, VersionConflict
+)
+import snapshot
+from contextlib import aclosing
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from fastapi.concurrency import run_in_threadpool
 
 
 
 
 
-from web3 import Web3
-
-w3 = Web3(Web3.HTTPProvider(os.getenv("SEPOLIA_RPC_URL")))
-
-NFT_ABI = [
-    {
-        "inputs": [{"internalType":"address","name":"to","type":"address"}],
-        "name":"mint",
-        "outputs":[{"internalType":"uint256","name":"","type":"uint256"}],
-        "stateMutability":"nonpayable",
-        "type":"function"
-    }
-]
-
-nft_contract = w3.eth.contract(
-    address=Web3.to_checksum_address(os.getenv("NFT_CONTRACT_ADDRESS")),
-    abi=NFT_ABI
-)
-
-OWNER_ACCOUNT = w3.eth.account.from_key(
-    os.getenv("NFT_OWNER_PRIVATE_KEY")
-)
+from minting import enqueue_mint, mint_request_json, mint_worker
+from growth import MAX_MATURITY, apply_growth_batch, growth
+from retention import RETENTION_ENABLED, delete_sessions, retention
+import fulltext
+import spatial
+import subtree
+from services import ServiceUnavailable, services
 
 
 
@@ -101,8 +96,6 @@ OWNER_ACCOUNT = w3.eth.account.from_key(
 
 
 
-# Now your existing code will work!
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 
 
@@ -119,48 +112,50 @@ def _db_unavailable_error() -> HTTPException:
     return HTTPException(status_code=503, detail="Saving and loading are temporarily disabled.")
 
 
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(request: Request):
+    """Admin endpoints that delete data or start heavy work need X-Admin-Token; without ADMIN_TOKEN set they are off."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 #Chirag 
 
-def get_fernet():
-    secret = os.getenv("WALLET_ENCRYPTION_SECRET")
-    key = hashlib.sha256(secret.encode()).digest()
+def _wallet_cipher():
+    from cryptography.fernet import Fernet
+
+    key = hashlib.sha256(os.getenv("WALLET_SECRET_KEY").encode()).digest()
     return Fernet(base64.urlsafe_b64encode(key))
 
 
-def encrypt_private_key(pk: str) -> str:
-    return get_fernet().encrypt(pk.encode()).decode()
+def _google_verifier():
+    # One verifier per worker: pooled session, cached signing certs, memoized tokens
+    from google_tokens import GoogleTokenVerifier
+    return GoogleTokenVerifier(os.getenv("GOOGLE_CLIENT_ID"))
 
 
-def decrypt_private_key(enc: str) -> str:
-    return get_fernet().decrypt(enc.encode()).decode()
+services.register("wallet_cipher", _wallet_cipher, required_env=("WALLET_SECRET_KEY",))
+services.register("google_auth", _google_verifier, required_env=("GOOGLE_CLIENT_ID",))
 
 
-def verify_google_id_token(token: str) -> dict:
-    try:
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            google_requests.Request(),
-            os.getenv("GOOGLE_CLIENT_ID")
-        )
+def encrypt_private_key(pk: str) -> str:
+    return get_fernet().encrypt(pk.encode()).decode()
 
-        return {
-            "google_sub": idinfo["sub"],
-            "email": idinfo.get("email"),
-            "email_verified": idinfo.get("email_verified", False),
-            "name": idinfo.get("name"),
-            "picture": idinfo.get("picture"),
-        }
 
-    except ValueError:
-        raise HTTPException(status_code=401, detail="Invalid Google token")
+def decrypt_private_key(enc: str) -> str:
+    return get_fernet().decrypt(enc.encode()).decode()
 
 
 def get_fernet():
-    secret = os.getenv("WALLET_SECRET_KEY")
-    key = hashlib.sha256(secret.encode()).digest()
-    return Fernet(base64.urlsafe_b64encode(key))
+    return services.get("wallet_cipher")
 
 def create_wallet():
+    from eth_account import Account
+
     acct = Account.create()
     return {
         "address": acct.address,
@@ -173,20 +168,21 @@ SessionLocal = None  # Will be set if database initializes successfully
 
 try:
     from models import (
-        create_tables, get_db, GameSession, SearchResult, Branch, 
-        Leaf, Flashcard, Fruit, Flower, SessionLocal as ModelSessionLocal
+        create_tables, get_db, get_read_db, GameSession, SearchResult, Branch, 
+        Leaf, Flashcard, Fruit, Flower, GameSnapshot, SessionLocal as ModelSessionLocal,
+        ReadSessionLocal, AsyncSessionLocal, AsyncReadSessionLocal, dispose_async_engines, MintRequest
     )
 
-    create_tables()
-    DB_AVAILABLE = True
     SessionLocal = ModelSessionLocal
-    logger.info("Database initialized successfully.")
 except Exception as exc:
     logger.error("Database initialization failed: %s", exc)
+    create_tables = None
 
     def get_db():  # type: ignore
         raise _db_unavailable_error()
 
+    get_read_db = get_db  # type: ignore
+
 
 
 # Add CORS middleware
@@ -202,6 +198,78 @@ app.add_middleware(
 frontend_path = os.path.join(os.path.dirname(__file__), "..", "frontend")
 app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable(request: Request, exc: ServiceUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.on_event("startup")
+async def init_database():
+    # Migrations run when the server starts, not on import, so importing main stays cheap
+    global DB_AVAILABLE
+    if create_tables is None:
+        return
+    try:
+        await run_in_threadpool(create_tables)
+        DB_AVAILABLE = True
+        logger.info("Database initialized successfully.")
+    except Exception as exc:
+        logger.error("Database initialization failed: %s", exc)
+
+@app.on_event("startup")
+async def start_mint_worker():
+    if DB_AVAILABLE:
+        mint_worker.start()
+
+@app.on_event("shutdown")
+async def stop_mint_worker():
+    await mint_worker.stop()
+
+@app.on_event("startup")
+async def start_retention():
+    if DB_AVAILABLE and RETENTION_ENABLED:
+        retention.start()
+
+@app.on_event("shutdown")
+async def stop_retention():
+    await retention.stop()
+
+@app.on_event("startup")
+async def start_seed_packs():
+    global seed_pack_task
+    if not DB_AVAILABLE:
+        return
+    try:
+        loaded = await run_in_threadpool(seed_packs.load)
+        logger.info("Loaded %d seed packs (%s)", loaded, seed_packs.version)
+    except Exception as exc:
+        logger.error("Loading seed packs failed: %s", exc)
+    if SEED_PACK_WARM_ON_STARTUP and os.getenv("GROQ_API_KEY"):
+        seed_pack_task = asyncio.create_task(refresh_seed_packs())
+
+@app.on_event("shutdown")
+async def stop_seed_packs():
+    if seed_pack_task is not None:
+        seed_pack_task.cancel()
+        try:
+            await seed_pack_task
+        except asyncio.CancelledError:
+            pass
+
+@app.on_event("shutdown")
+async def close_llm_gateway():
+    await llm.aclose()
+
+@app.on_event("shutdown")
+def stop_db_writer():
+    # Flush whatever is still queued (cache hit counts included) before the process exits
+    search_cache.flush_hits()
+    db_writer.stop()
+
+@app.on_event("shutdown")
+async def close_async_engines():
+    if DB_AVAILABLE:
+        await dispose_async_engines()
+
 @app.get("/")
 async def serve_game():
     return FileResponse(os.path.join(os.path.dirname(__file__), "..", "frontend", "index.html"))
@@ -212,7 +280,8 @@ class SearchRequest(BaseModel):
 class WebSearchRequest(BaseModel):
     query: str
     count: int = 5
-    negative_prompts: list = []  # List of existing search results to exclude
+    negative_prompts: list = []  # Titles to exclude that the server hasn't seen for this tree yet
+    tree_id: Optional[str] = None  # Server remembers titles already used by this tree
 
 class SaveGameStateRequest(BaseModel):
     original_search_query: str
@@ -223,9 +292,47 @@ class SaveGameStateRequest(BaseModel):
     flowers: list
     flashcards: list = []
     camera_offset: dict = {"x": 0.0, "y": 0.0}
+    user_id: Optional[int] = None  # owner, when the player is signed in
+    tree_id: Optional[str] = None  # same on every save of one tree; earlier saves can be purged (retention.py)
+
+class GameStateOperation(BaseModel):
+    op: str          # "add" | "update" | "delete"
+    kind: str        # "branch" | "leaf" | "fruit" | "flower" | "flashcard" | "search_result"
+    client_id: str   # stable frontend id of the element
+    data: dict = {}  # same shape as in save-game-state; updates may be partial
+
+class PatchGameStateRequest(BaseModel):
+    session_id: int
+    base_version: Optional[int] = None  # reject the patch if the session moved on
+    operations: List[GameStateOperation]
+    camera_offset: Optional[dict] = None
 
 class LoadGameStateRequest(BaseModel):
     session_id: int
+    format: str = "json"              # "json" or "snapshot" (compact binary, see snapshot.py)
+    quantize: Optional[float] = None  # snapshot only: store coordinates on this grid step
+
+class ViewportRect(BaseModel):
+    min_x: float
+    min_y: float
+    max_x: float
+    max_y: float
+
+class LoadViewportRequest(BaseModel):
+    session_id: int
+    viewport: ViewportRect                # world coordinates, usually the screen plus a margin
+    loaded: List[ViewportRect] = []       # rectangles the client already has in full
+    after: Optional[Dict[str, int]] = None  # next_after of the previous page
+    limit: int = 2000                     # per kind (branches, leaves, fruits, flowers)
+
+class PruneSubtreeRequest(BaseModel):
+    base_version: Optional[int] = None  # reject the prune if the session moved on
+
+class MoveSubtreeRequest(BaseModel):
+    dx: float = 0.0
+    dy: float = 0.0
+    parent_branch_id: Optional[int] = None  # only applied when sent; null detaches the root
+    base_version: Optional[int] = None
 
 class CreateFlashcardsRequest(BaseModel):
     branch_id: Optional[int] = None
@@ -241,15 +348,41 @@ class GenerateQuizRequest(BaseModel):
 
 class PlantSeedRequest(BaseModel):
     seed: Web3Seed
+    user_id: Optional[int] = None
 
-@app.post("/api/search")
-async def search(request: SearchRequest):
-    try:
-        prompt = f"""
+class InvalidateCacheRequest(BaseModel):
+    query: Optional[str] = None  # None clears the whole search cache
+
+class WarmSeedPacksRequest(BaseModel):
+    seeds: Optional[List[str]] = None  # entries of seed_packs.PACK_TOPICS; None means all of them
+    force: bool = False                     # rebuild even if the pack is fresh
+
+# Bump whenever the /api/search prompt changes so cached areas are regenerated
+SEARCH_PROMPT_VERSION = "areas-v1"
+search_cache = ResponseCache("search", SEARCH_PROMPT_VERSION)
+
+
+def area_to_result(i: int, query: str, area: dict) -> dict:
+    return {
+        "id": i,
+        "title": area["name"],
+        "url": f"https://example.com/{query.replace(' ', '-')}-{area['name'].lower().replace(' ', '-')}",
+        "date": "2024-01-01",
+        "snippet": area["description"],
+        "llm_content": f"{area['name']}\n\n{area['description']}"
+    }
+
+
+def build_search_results(query: str, structured_data: dict) -> list:
+    return [area_to_result(i, query, area) for i, area in enumerate(structured_data["areas"])]
+
+
+def build_search_prompt(query: str) -> str:
+    return f"""
         You are an educational AI.
 
         Generate EXACTLY 5 distinct knowledge areas for:
-        "{request.query}"
+        "{query}"
 
         Return ONLY valid JSON in the following format:
         {{
@@ -268,64 +401,77 @@ async def search(request: SearchRequest):
         - No explanations outside JSON
         """
 
-        response = groq_client.chat.completions.create(
-             model="llama-3.1-8b-instant",
-             messages=[
-        {
-            "role": "user",
-            "content": prompt
-        }
-    ],
-    temperature=0.5
-         )
 
-        raw_text = response.choices[0].message.content
+def fallback_search_areas(query: str) -> dict:
+    return {
+        "areas": [
+            {
+                "name": f"{query} – Concept {i+1}",
+                "description": f"An important concept related to {query}.",
+                "search_query": query
+            }
+            for i in range(5)
+        ]
+    }
+
+
+def is_valid_area(area) -> bool:
+    return isinstance(area, dict) and "name" in area and "description" in area
+
 
+async def generate_search_areas(query: str) -> Optional[dict]:
+    """One upstream call for the knowledge areas of `query`; None if the response isn't usable."""
+    raw_text = await llm.complete(build_search_prompt(query), temperature=0.5)
 
+    print("\n========== GEMINI RAW RESPONSE ==========")
+    print(raw_text)
+    print("========== END RESPONSE ==========\n")
 
-        print("\n========== GEMINI RAW RESPONSE ==========")
-        print(raw_text)
-        print("========== END RESPONSE ==========\n")
+    structured_data = None
 
+    # Try to extract JSON safely
+    try:
+        start = raw_text.find("{")
+        end = raw_text.rfind("}") + 1
+        if start != -1 and end != -1:
+            structured_data = json.loads(raw_text[start:end])
+    except Exception:
         structured_data = None
 
-        # Try to extract JSON safely
-        try:
-            start = raw_text.find("{")
-            end = raw_text.rfind("}") + 1
-            if start != -1 and end != -1:
-                structured_data = json.loads(raw_text[start:end])
-        except Exception:
-            structured_data = None
-
-        # 🚑 Fallback if Gemini response is invalid
-        if not structured_data or "areas" not in structured_data:
-            structured_data = {
-                "areas": [
-                    {
-                        "name": f"{request.query} – Concept {i+1}",
-                        "description": f"An important concept related to {request.query}.",
-                        "search_query": request.query
-                    }
-                    for i in range(5)
-                ]
+    if structured_data and "areas" in structured_data and all(
+        is_valid_area(area) for area in structured_data["areas"]
+    ):
+        return structured_data
+    return None
+
+
+@app.post("/api/search")
+async def search(request: SearchRequest):
+    try:
+        # 🌱 Seed topics are served from their pre-generated pack
+        pack_areas = seed_packs.areas(request.query)
+        cached = {"areas": pack_areas} if pack_areas else await run_in_threadpool(search_cache.get, request.query)
+        if cached:
+            return {
+                "query": request.query,
+                "results": build_search_results(request.query, cached),
+                "structured_data": cached,
+                "cached": True
             }
 
-        results = []
-        for i, area in enumerate(structured_data["areas"]):
-            results.append({
-                "id": i,
-                "title": area["name"],
-                "url": f"https://example.com/{request.query.replace(' ', '-')}-{area['name'].lower().replace(' ', '-')}",
-                "date": "2024-01-01",
-                "snippet": area["description"],
-                "llm_content": f"{area['name']}\n\n{area['description']}"
-            })
+        structured_data = await generate_search_areas(request.query)
+
+        # 🚑 Fallback if Gemini response is invalid (never cached)
+        if structured_data:
+            await run_in_threadpool(search_cache.set, request.query, structured_data)
+        else:
+            structured_data = fallback_search_areas(request.query)
 
         return {
             "query": request.query,
-            "results": results,
-            "structured_data": structured_data
+            "results": build_search_results(request.query, structured_data),
+            "structured_data": structured_data,
+            "cached": False
         }
 
     except Exception as e:
@@ -335,19 +481,82 @@ async def search(request: SearchRequest):
             "query": request.query
         }
 
-@app.post("/api/web-search")
-def web_search(request: WebSearchRequest):
+@app.post("/api/search/stream")
+async def search_stream(request: SearchRequest, format: str = "ndjson"):
+    """Streaming /api/search: one `result` event per knowledge area as soon as it is complete."""
+    async def events():
+        pack_areas = seed_packs.areas(request.query)
+        cached = {"areas": pack_areas} if pack_areas else await run_in_threadpool(search_cache.get, request.query)
+        if cached:
+            for result in build_search_results(request.query, cached):
+                yield {"type": "result", "result": result}
+            yield {"type": "done", "query": request.query, "count": len(cached["areas"]), "cached": True}
+            return
+
+        areas = []
+        failed = False
+        parser = ArrayItemParser("areas")
+        try:
+            async with aclosing(llm.stream(build_search_prompt(request.query), temperature=0.5)) as chunks:
+                async for chunk in chunks:
+                    for area in parser.feed(chunk):
+                        if not is_valid_area(area):
+                            continue
+                        areas.append(area)
+                        yield {"type": "result", "result": area_to_result(len(areas) - 1, request.query, area)}
+        except Exception as e:
+            failed = True
+            yield {"type": "error", "error": str(e)}
+
+        if areas and not failed:
+            await run_in_threadpool(search_cache.set, request.query, {"areas": areas})
+        elif not areas:
+            # 🚑 Same fallback as the non-streaming endpoint
+            areas = fallback_search_areas(request.query)["areas"]
+            for i, area in enumerate(areas):
+                yield {"type": "result", "result": area_to_result(i, request.query, area)}
+
+        yield {"type": "done", "query": request.query, "count": len(areas), "cached": False}
+
+    return event_stream(events(), format)
+
+
+WEB_SEARCH_MAX_ROUNDS = int(os.getenv("WEB_SEARCH_MAX_ROUNDS", "4"))
+title_registry = TitleRegistry()
+# Previously generated insights are served before asking the model for more
+RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+# Fewer index matches than this (capped at the requested count) aren't worth mixing in
+RETRIEVAL_MIN_HITS = int(os.getenv("RETRIEVAL_MIN_HITS", "1"))
+insight_index = InsightIndex(ReadSessionLocal if SessionLocal else None)
+
+
+async def retrieve_insights(query: str, count: int, taken: list) -> list:
+    """Indexed insights for `query` that aren't in `taken`; [] when there aren't enough."""
+    if count <= 0 or not (RETRIEVAL_ENABLED and DB_AVAILABLE):
+        return []
+    candidate_taken = list(taken)
     try:
-        negative_text = ""
-        if request.negative_prompts:
-            negative_text = (
-                "Avoid generating content related to these topics:\n"
-                + ", ".join(request.negative_prompts)
-            )
+        hits = await run_in_threadpool(insight_index.search, query, candidate_taken, count)
+    except Exception as e:
+        logger.warning("Insight index lookup failed: %s", e)
+        return []
+    if len(hits) < min(RETRIEVAL_MIN_HITS, count):
+        return []
+    taken[:] = candidate_taken
+    return hits
+
+
+def build_insights_prompt(query: str, count: int, avoid: list) -> str:
+    negative_text = ""
+    if avoid:
+        negative_text = (
+            "Avoid generating content related to these topics:\n"
+            + ", ".join(avoid[-60:])
+        )
 
-        prompt = f"""
-        Generate {request.count} NEW and DISTINCT insights about:
-        "{request.query}"
+    return f"""
+        Generate {count} NEW and DISTINCT insights about:
+        "{query}"
 
         {negative_text}
 
@@ -367,363 +576,502 @@ def web_search(request: WebSearchRequest):
         - No explanations outside JSON
         """
 
-        # ✅ GROQ CALL (REPLACEMENT)
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4
-        )
 
-        raw_text = response.choices[0].message.content.strip()
+def is_valid_insight(item) -> bool:
+    return isinstance(item, dict) and bool(item.get("title")) and bool(item.get("snippet"))
 
-        # Extract JSON safely
-        start = raw_text.find("{")
-        end = raw_text.rfind("}") + 1
-        json_text = raw_text[start:end]
-
-        data = json.loads(json_text)
-
-        results = []
-        for i, item in enumerate(data["results"]):
-            results.append({
-                "id": i,
-                "title": item["title"],
-                "url": f"https://example.com/{item['title'].lower().replace(' ', '-')}",
-                "date": "2024-01-01",
-                "snippet": item["snippet"],
-                "llm_content": item["snippet"],
-                "images": []
-            })
 
-        return {"query": request.query, "results": results}
+def insight_to_result(i: int, item: dict) -> dict:
+    return {
+        "id": i,
+        "title": item["title"],
+        "url": f"https://example.com/{item['title'].lower().replace(' ', '-')}",
+        "date": "2024-01-01",
+        "snippet": item["snippet"],
+        "llm_content": item.get("llm_content") or item["snippet"],
+        "images": []
+    }
+
+
+async def generate_insights(query: str, count: int, avoid: list) -> list:
+    """One upstream call for `count` insights, steering away from `avoid` titles."""
+    prompt = build_insights_prompt(query, count, avoid)
+
+    # ✅ GROQ CALL (via shared async gateway)
+    raw_text = (await llm.complete(prompt, temperature=0.4)).strip()
+
+    # Extract JSON safely
+    start = raw_text.find("{")
+    end = raw_text.rfind("}") + 1
+    data = json.loads(raw_text[start:end])
+
+    return [item for item in data["results"] if is_valid_insight(item)]
+
+
+@app.post("/api/web-search")
+async def web_search(request: WebSearchRequest):
+    """
+    Returns `count` insights that are unique within the tree. Titles already
+    handed to `tree_id` (plus any negative_prompts) are excluded with fuzzy
+    matching, and the negative_prompts are remembered for the tree too;
+    `known_titles` says how many titles the server now has for it, so a
+    client can tell when it has to send them all again. Pre-generated seed pack children and matching insights
+    generated earlier (the retrieval index) are used first, and the model
+    is asked only for the shortfall.
+    """
+    try:
+        avoid = title_registry.titles(request.tree_id) + [str(t) for t in request.negative_prompts]
+        taken = [normalize_title(t) for t in avoid]
+
+        # Seed packs first, then insights generated for other trees, then the model
+        collected = pick_unique(seed_packs.children(request.query), taken, request.count)
+        from_pack = len(collected)
+        collected += await retrieve_insights(request.query, request.count - from_pack, taken)
+        from_index = len(collected) - from_pack
+        upstream_calls = 0
+        last_error = None
+        while len(collected) < request.count and upstream_calls < WEB_SEARCH_MAX_ROUNDS:
+            shortfall = request.count - len(collected)
+            upstream_calls += 1
+            try:
+                candidates = await generate_insights(
+                    request.query,
+                    shortfall + 2,
+                    avoid + [item["title"] for item in collected]
+                )
+            except Exception as e:
+                last_error = e
+                continue
+            collected.extend(pick_unique(candidates, taken, shortfall))
+
+        if not collected and last_error:
+            raise last_error
+
+        known_titles = title_registry.add(request.tree_id, avoid + [item["title"] for item in collected])
+        insight_index.record(from_index, len(collected) - from_pack - from_index)
+
+        results = [insight_to_result(i, item) for i, item in enumerate(collected)]
+
+        return {
+            "query": request.query,
+            "results": results,
+            "known_titles": known_titles,
+            "upstream_calls": upstream_calls,
+            "sources": {"pack": from_pack, "index": from_index, "model": len(collected) - from_pack - from_index}
+        }
 
     except Exception as e:
         return {"error": str(e), "query": request.query}
 
 
+@app.post("/api/web-search/stream")
+async def web_search_stream(request: WebSearchRequest, format: str = "ndjson"):
+    """Streaming /api/web-search: unique insights are pushed one event at a time."""
+    async def events():
+        avoid = title_registry.titles(request.tree_id) + [str(t) for t in request.negative_prompts]
+        taken = [normalize_title(t) for t in avoid]
+
+        # Seed packs first, then insights generated for other trees, then the model
+        collected = pick_unique(seed_packs.children(request.query), taken, request.count)
+        from_pack = len(collected)
+        collected += await retrieve_insights(request.query, request.count - from_pack, taken)
+        from_index = len(collected) - from_pack
+        for i, item in enumerate(collected):
+            yield {"type": "result", "result": insight_to_result(i, item)}
+
+        upstream_calls = 0
+        last_error = None
+        while len(collected) < request.count and upstream_calls < WEB_SEARCH_MAX_ROUNDS:
+            shortfall = request.count - len(collected)
+            prompt = build_insights_prompt(request.query, shortfall + 2, avoid + [item["title"] for item in collected])
+            upstream_calls += 1
+            parser = ArrayItemParser("results")
+            try:
+                async with aclosing(llm.stream(prompt, temperature=0.4)) as chunks:
+                    async for chunk in chunks:
+                        candidates = [item for item in parser.feed(chunk) if is_valid_insight(item)]
+                        for item in pick_unique(candidates, taken, request.count - len(collected)):
+                            collected.append(item)
+                            yield {"type": "result", "result": insight_to_result(len(collected) - 1, item)}
+                        if len(collected) >= request.count:
+                            break
+            except Exception as e:
+                last_error = e
+
+        known_titles = title_registry.add(request.tree_id, avoid + [item["title"] for item in collected])
+        insight_index.record(from_index, len(collected) - from_pack - from_index)
+
+        if not collected and last_error:
+            yield {"type": "error", "error": str(last_error)}
+        yield {
+            "type": "done",
+            "query": request.query,
+            "count": len(collected),
+            "known_titles": known_titles,
+            "upstream_calls": upstream_calls,
+            "sources": {"pack": from_pack, "index": from_index, "model": len(collected) - from_pack - from_index}
+        }
+
+    return event_stream(events(), format)
+
+
 @app.post("/api/save-game-state")
-async def save_game_state(request: SaveGameStateRequest, db: Session = Depends(get_db)):
+async def save_game_state(request: SaveGameStateRequest):
     if not DB_AVAILABLE:
         raise _db_unavailable_error()
     try:
-        # Create new game session
-        game_session = GameSession(
-            original_search_query=request.original_search_query,
-            camera_offset_x=request.camera_offset.get("x", 0.0) if request.camera_offset else 0.0,
-            camera_offset_y=request.camera_offset.get("y", 0.0) if request.camera_offset else 0.0,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc)
-        )
-        db.add(game_session)
-        db.flush()  # Get the ID
-        
-        # Save search results
-        search_result_objects = []
-        for result in request.search_results:
-            search_result = SearchResult(
-                game_session_id=game_session.id,
-                title=result.get("title", ""),
-                url=result.get("url", ""),
-                snippet=result.get("snippet", ""),
-                llm_content=result.get("llm_content", ""),
-                search_query=result.get("search_query", ""),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(search_result)
-            search_result_objects.append(search_result)
-        
-        db.flush()  # Get search result IDs
-        
-        # Save branches with hierarchy tracking
-        branch_objects = []
-        for i, branch_data in enumerate(request.branches):
-            search_result_id = None
-            
-            # Check if branch has its own search result data
-            if branch_data.get("searchResult"):
-                # Create a new search result for this branch
-                branch_search_result = SearchResult(
-                    game_session_id=game_session.id,
-                    title=branch_data["searchResult"].get("title", ""),
-                    url=branch_data["searchResult"].get("url", ""),
-                    snippet=branch_data["searchResult"].get("snippet", ""),
-                    llm_content=branch_data["searchResult"].get("llm_content", ""),
-                    search_query=branch_data["searchResult"].get("search_query", ""),
-                    created_at=datetime.now(timezone.utc)
-                )
-                db.add(branch_search_result)
-                db.flush()  # Get the ID
-                search_result_id = branch_search_result.id
-            elif i < len(search_result_objects):
-                # Fallback to index-based matching for initial branches
-                search_result_id = search_result_objects[i].id
-            else:
-                search_result_id = None
-            
-            branch = Branch(
-                game_session_id=game_session.id,
-                search_result_id=search_result_id,
-                parent_branch_id=branch_data.get("parentBranchId"),  # Track parent
-                start_x=branch_data.get("start", {}).get("x", 0),
-                start_y=branch_data.get("start", {}).get("y", 0),
-                end_x=branch_data.get("end", {}).get("x", 0),
-                end_y=branch_data.get("end", {}).get("y", 0),
-                length=branch_data.get("length", 0),
-                max_length=branch_data.get("maxLength", 0),
-                angle=branch_data.get("angle", 0),
-                thickness=branch_data.get("thickness", 1),
-                generation=branch_data.get("generation", 0),
-                is_growing=branch_data.get("isGrowing", False),
-                growth_speed=branch_data.get("growthSpeed", 1.0),
-                node_type=branch_data.get("nodeType", "branch"),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(branch)
-            branch_objects.append(branch)
-        
-        db.flush()  # Get branch IDs
-        
-        # Save leaves
-        for leaf_data in request.leaves:
-            leaf = Leaf(
-                game_session_id=game_session.id,
-                branch_id=leaf_data.get("branchId"),  # Can be None now
-                x=leaf_data.get("x", 0),
-                y=leaf_data.get("y", 0),
-                size=leaf_data.get("size", 1.0),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(leaf)
-        
-        # Save fruits
-        for fruit_data in request.fruits:
-            fruit = Fruit(
-                game_session_id=game_session.id,
-                x=fruit_data.get("x", 0),
-                y=fruit_data.get("y", 0),
-                type=fruit_data.get("type", "apple"),
-                size=fruit_data.get("size", 1.0),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(fruit)
-        
-        # Save flowers
-        for flower_data in request.flowers:
-            flower = Flower(
-                game_session_id=game_session.id,
-                x=flower_data.get("x", 0),
-                y=flower_data.get("y", 0),
-                type=flower_data.get("type", "🌸"),
-                size=flower_data.get("size", 1.0),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(flower)
-        
-        # Save flashcards
-        for flashcard_data in request.flashcards:
-            # Extract node position if available
-            node_position = flashcard_data.get("node_position", {})
-            flashcard = Flashcard(
-                game_session_id=game_session.id,
-                branch_id=flashcard_data.get("branch_id"),
-                front=flashcard_data.get("front", ""),
-                back=flashcard_data.get("back", ""),
-                difficulty=flashcard_data.get("difficulty", "medium"),
-                category=flashcard_data.get("category", ""),
-                node_position_x=node_position.get("x"),
-                node_position_y=node_position.get("y"),
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(flashcard)
-        
-        db.commit()
+        # Bulk inserts: one statement per table regardless of tree size
+        session_id = await db_writer.run(lambda db: save_full_state(db, request))
         
         return {
             "success": True,
-            "session_id": game_session.id,
+            "session_id": session_id,
+            "version": 1,
             "message": "Game state saved successfully"
         }
         
     except Exception as e:
-        db.rollback()
         return {"error": str(e), "success": False}
 
+@app.post("/api/patch-game-state")
+async def patch_game_state(request: PatchGameStateRequest):
+    """Incremental save: apply add/update/delete operations to an existing session in one transaction."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    try:
+        version = await db_writer.run(lambda db: apply_delta(
+            db,
+            request.session_id,
+            request.operations,
+            base_version=request.base_version,
+            camera_offset=request.camera_offset
+        ))
+
+        return {
+            "success": True,
+            "session_id": request.session_id,
+            "version": version,
+            "applied": len(request.operations)
+        }
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "version": e.current_version})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+@app.post("/api/save-game-state/snapshot")
+async def save_game_snapshot(http_request: Request):
+    """Save a tree sent as a binary snapshot (Content-Type: application/x-brainbonsai-snapshot)."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    try:
+        game_state = snapshot.decode(await http_request.body())
+    except snapshot.SnapshotError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid snapshot: {e}")
+
+    try:
+        state = state_from_snapshot(game_state)
+        session_id = await db_writer.run(lambda db: save_full_state(db, state))
+
+        return {
+            "success": True,
+            "session_id": session_id,
+            "version": 1,
+            "message": "Game state saved successfully"
+        }
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+
+async def load_snapshot(db: AsyncSession, game_session: GameSession, quantize: Optional[float] = None) -> bytes:
+    """
+    Snapshot blob for the session's current version. One blob is kept per
+    session; it is rebuilt when the version moves or rows changed after it
+    was taken. Quantized snapshots are built on demand and not stored.
+    """
+    if quantize:
+        return snapshot.encode(await db.run_sync(load_game_state_dict, game_session), quantize=quantize)
+
+    version = game_session.version or 1
+    stored = await db.scalar(select(GameSnapshot).where(GameSnapshot.game_session_id == game_session.id))
+    if stored and stored.version == version and (
+        game_session.updated_at is None
+        or stored.created_at.replace(tzinfo=None) >= game_session.updated_at.replace(tzinfo=None)
+    ):
+        return stored.data
+
+    blob = snapshot.encode(await db.run_sync(load_game_state_dict, game_session))
+    session_id = game_session.id
+
+    def store(write_db: Session):
+        row = write_db.query(GameSnapshot).filter(GameSnapshot.game_session_id == session_id).first()
+        if row:
+            row.version = version
+            row.data = blob
+            row.created_at = datetime.now(timezone.utc)
+        else:
+            write_db.add(GameSnapshot(game_session_id=session_id, version=version, data=blob))
+
+    # `db` may be read-only, so the refreshed blob goes through the writer
+    await db_writer.run(store)
+    return blob
+
+
 @app.post("/api/load-game-state")
-async def load_game_state(request: LoadGameStateRequest, db: Session = Depends(get_db)):
+async def load_game_state(request: LoadGameStateRequest, db: AsyncSession = Depends(get_read_db)):
     if not DB_AVAILABLE:
         raise _db_unavailable_error()
     try:
         # Get game session
-        game_session = db.query(GameSession).filter(GameSession.id == request.session_id).first()
+        game_session = await db.scalar(select(GameSession).where(GameSession.id == request.session_id))
         if not game_session:
             raise HTTPException(status_code=404, detail="Game session not found")
-        
-        # Get all related data
-        search_results = db.query(SearchResult).filter(SearchResult.game_session_id == request.session_id).all()
-        branches = db.query(Branch).filter(Branch.game_session_id == request.session_id).all()
-        leaves = db.query(Leaf).filter(Leaf.game_session_id == request.session_id).all()
-        flashcards = db.query(Flashcard).filter(Flashcard.game_session_id == request.session_id).all()
-        fruits = db.query(Fruit).filter(Fruit.game_session_id == request.session_id).all()
-        flowers = db.query(Flower).filter(Flower.game_session_id == request.session_id).all()
-        
-        # Convert to dictionaries
-        search_results_data = []
-        for result in search_results:
-            search_results_data.append({
-                "id": result.id,
-                "title": result.title,
-                "url": result.url,
-                "snippet": result.snippet,
-                "llm_content": result.llm_content,
-                "search_query": result.search_query
-            })
-        
-        branches_data = []
-        for branch in branches:
-            branches_data.append({
-                "id": branch.id,
-                "start": {"x": branch.start_x, "y": branch.start_y},
-                "end": {"x": branch.end_x, "y": branch.end_y},
-                "length": branch.length,
-                "maxLength": branch.max_length,
-                "angle": branch.angle,
-                "thickness": branch.thickness,
-                "generation": branch.generation,
-                "isGrowing": branch.is_growing,
-                "growthSpeed": branch.growth_speed,
-                "nodeType": branch.node_type,
-                "parentBranchId": branch.parent_branch_id,
-                "searchResult": {
-                    "id": branch.search_result.id if branch.search_result else None,
-                    "title": branch.search_result.title if branch.search_result else None,
-                    "url": branch.search_result.url if branch.search_result else None,
-                    "snippet": branch.search_result.snippet if branch.search_result else None,
-                    "llm_content": branch.search_result.llm_content if branch.search_result else None
-                } if branch.search_result else None
-            })
-        
-        leaves_data = []
-        for leaf in leaves:
-            leaves_data.append({
-                "id": leaf.id,
-                "x": leaf.x,
-                "y": leaf.y,
-                "size": leaf.size,
-                "branchId": leaf.branch_id
-            })
-        
-        fruits_data = []
-        for fruit in fruits:
-            fruits_data.append({
-                "id": fruit.id,
-                "x": fruit.x,
-                "y": fruit.y,
-                "type": fruit.type,
-                "size": fruit.size
-            })
-        
-        flowers_data = []
-        for flower in flowers:
-            flowers_data.append({
-                "id": flower.id,
-                "x": flower.x,
-                "y": flower.y,
-                "type": flower.type,
-                "size": flower.size
-            })
-        
-        flashcards_data = []
-        for flashcard in flashcards:
-            flashcards_data.append({
-                "id": flashcard.id,
-                "branch_id": flashcard.branch_id,
-                "front": flashcard.front,
-                "back": flashcard.back,
-                "difficulty": flashcard.difficulty,
-                "category": flashcard.category,
-                "node_position": {
-                    "x": flashcard.node_position_x,
-                    "y": flashcard.node_position_y
-                } if flashcard.node_position_x is not None and flashcard.node_position_y is not None else None,
-                "created_at": flashcard.created_at.isoformat(),
-                "last_reviewed": flashcard.last_reviewed.isoformat() if flashcard.last_reviewed else None,
-                "review_count": flashcard.review_count
-            })
-        
-        return {
-            "success": True,
-            "game_state": {
-                "original_search_query": game_session.original_search_query,
-                "search_results": search_results_data,
-                "branches": branches_data,
-                "leaves": leaves_data,
-                "flashcards": flashcards_data,
-                "fruits": fruits_data,
-                "flowers": flowers_data,
-                "camera_offset": {"x": game_session.camera_offset_x, "y": game_session.camera_offset_y},
-                "created_at": game_session.created_at.isoformat(),
-                "updated_at": game_session.updated_at.isoformat()
-            }
-        }
-        
+        if request.format == "snapshot":
+            return Response(
+                content=await load_snapshot(db, game_session, request.quantize),
+                media_type=snapshot.MEDIA_TYPE
+            )
+        db.expunge(game_session)
+
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+    def body():
+        # Own session: the response body is produced after this handler returns.
+        # One query per table, streamed out in batches (sync generator, so it
+        # runs in the threadpool rather than on the event loop).
+        stream_db = ReadSessionLocal()
+        try:
+            yield from stream_game_state(stream_db, game_session)
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(body(), media_type="application/json")
+
+@app.post("/api/load-game-state/viewport")
+async def load_game_state_viewport(request: LoadViewportRequest, db: AsyncSession = Depends(get_read_db)):
+    """
+    Only the branches, leaves, fruits and flowers that intersect `viewport`
+    and none of the `loaded` rectangles (spatial.py). Search results come
+    embedded in their branches; flashcards load per branch. `totals` on the
+    first page says how much the whole garden holds.
+    """
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    if not spatial.SPATIAL_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Viewport loading needs the SQLite R-tree index")
+    rects = [request.viewport] + request.loaded
+    if any(rect.min_x > rect.max_x or rect.min_y > rect.max_y for rect in rects):
+        raise HTTPException(status_code=400, detail="Rectangles need min_x <= max_x and min_y <= max_y")
+    if len(request.loaded) > 32:
+        raise HTTPException(status_code=400, detail="At most 32 loaded rectangles; merge them or reload")
+    limit = max(1, min(request.limit, 5000))
+    try:
+        game_session = await db.scalar(select(GameSession).where(GameSession.id == request.session_id))
+        if not game_session:
+            raise HTTPException(status_code=404, detail="Game session not found")
+
+        viewport = spatial.Rect(**request.viewport.model_dump())
+        loaded = [spatial.Rect(**rect.model_dump()) for rect in request.loaded]
+        page = await db.run_sync(
+            lambda sync_db: spatial.viewport_state(sync_db, game_session, viewport, loaded, request.after, limit)
+        )
+        return {"success": True, **page}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+@app.get("/api/branches/{branch_id}/subtree")
+async def get_subtree(branch_id: int, db: AsyncSession = Depends(get_read_db)):
+    """A branch and everything below it: branches (with search results), leaves and flashcards."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    try:
+        state = await db.run_sync(lambda sync_db: subtree.load_subtree(sync_db, branch_id))
+        return {"success": True, **state}
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+@app.post("/api/branches/{branch_id}/prune")
+async def prune_branch(branch_id: int, request: Optional[PruneSubtreeRequest] = None):
+    """Delete a branch with its whole subtree in one transaction; returns the deleted ids per table."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    base_version = request.base_version if request else None
+    try:
+        result = await db_writer.run(lambda db: subtree.prune_subtree(db, branch_id, base_version))
+        return {"success": True, "branch_id": branch_id, **result}
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "version": e.current_version})
+    except Exception as e:
+        return {"error": str(e), "success": False}
+
+@app.post("/api/branches/{branch_id}/move")
+async def move_branch(branch_id: int, request: MoveSubtreeRequest):
+    """Translate a subtree and/or re-attach it to another parent; returns the moved ids per table."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    options = {"base_version": request.base_version}
+    if "parent_branch_id" in request.model_fields_set:
+        options["parent_branch_id"] = request.parent_branch_id
+    try:
+        result = await db_writer.run(
+            lambda db: subtree.move_subtree(db, branch_id, request.dx, request.dy, **options)
+        )
+        return {"success": True, "branch_id": branch_id, **result}
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail={"error": str(e), "version": e.current_version})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         return {"error": str(e), "success": False}
 
+def encode_session_cursor(updated_at: datetime, session_id: int) -> str:
+    raw = f"{updated_at.isoformat()}|{session_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_session_cursor(cursor: str):
+    try:
+        updated_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), int(session_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/api/game-sessions")
-async def get_game_sessions(db: Session = Depends(get_db)):
+async def get_game_sessions(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    user_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Newest-first session list, paged with a keyset cursor on
+    (updated_at, id) so every page is an index range scan.
+    Pass `next_cursor` back as `cursor` to get the following page.
+    """
     if not DB_AVAILABLE:
         raise _db_unavailable_error()
+    limit = max(1, min(limit, 100))
+    after = decode_session_cursor(cursor) if cursor else None
     try:
-        sessions = db.query(GameSession).order_by(GameSession.updated_at.desc()).all()
+        query = select(
+            GameSession.id,
+            GameSession.original_search_query,
+            GameSession.seed_type,
+            GameSession.maturity,
+            GameSession.created_at,
+            GameSession.updated_at
+        )
+        if user_id is not None:
+            query = query.where(GameSession.user_id == user_id)
+        if after:
+            after_updated_at, after_id = after
+            query = query.where(or_(
+                GameSession.updated_at < after_updated_at,
+                and_(GameSession.updated_at == after_updated_at, GameSession.id < after_id)
+            ))
+        sessions = (await db.execute(
+            query.order_by(GameSession.updated_at.desc(), GameSession.id.desc()).limit(limit + 1)
+        )).all()
+
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+
+        # Summary counts for this page only: one grouped query per table
+        ids = [session.id for session in sessions]
+        counts = {}
+        for key, model in (("branches", Branch), ("flashcards", Flashcard)):
+            counts[key] = dict((await db.execute(
+                select(model.game_session_id, func.count())
+                .where(model.game_session_id.in_(ids))
+                .group_by(model.game_session_id)
+            )).all()) if ids else {}
+
         sessions_data = []
         for session in sessions:
             sessions_data.append({
                 "id": session.id,
                 "original_search_query": session.original_search_query,
+                "seed": session.seed_type,
+                "maturity": session.maturity,
+                "branch_count": counts["branches"].get(session.id, 0),
+                "flashcard_count": counts["flashcards"].get(session.id, 0),
                 "created_at": session.created_at.isoformat(),
                 "updated_at": session.updated_at.isoformat()
             })
-        return {"success": True, "sessions": sessions_data}
+
+        next_cursor = encode_session_cursor(sessions[-1].updated_at, sessions[-1].id) if has_more else None
+        return {"success": True, "sessions": sessions_data, "next_cursor": next_cursor}
     except Exception as e:
         return {"error": str(e), "success": False}
 
-@app.post("/api/create-flashcards")
-async def create_flashcards(request: CreateFlashcardsRequest):
-    db_session: Optional[Session] = None
-    branch = None
+@app.get("/api/garden-search")
+async def garden_search(
+    q: str,
+    user_id: int,
+    kind: str = "all",
+    limit: int = 20,
+    offset: int = 0,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Full-text search over the saved insights and flashcards in user_id's
+    gardens, best matches first. `kind` is "all", "insight" or "flashcard".
+    Pass `next_offset` back as `offset` for the following page.
 
+    Only the newest FULLTEXT_RANK_WINDOW matches per kind are ranked, so a
+    word that appears in more rows than that can miss its best older hit;
+    add words to narrow it down.
+    """
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    if not fulltext.FTS_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Full-text search needs the SQLite FTS5 tables")
+    if kind != "all" and kind not in fulltext.KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be all, {', '.join(fulltext.KINDS)}")
+    limit = max(1, min(limit, 50))
+    offset = max(0, min(offset, 1000))
+    match = fulltext.match_query(q)
+    if not match:
+        return {"success": True, "results": [], "next_offset": None}
     try:
-        # Handle both database branches and frontend data
-        if request.branch_id:
-            if not DB_AVAILABLE or SessionLocal is None:
-                raise _db_unavailable_error()
-
-            db_session = SessionLocal()
-            branch = db_session.query(Branch).filter(Branch.id == request.branch_id).first()
-            if not branch:
-                raise HTTPException(status_code=404, detail="Branch not found")
-
-            if not branch.search_result:
-                raise HTTPException(status_code=400, detail="Branch has no search result data")
-
-            search_result_data = {
-                "title": branch.search_result.title,
-                "llm_content": branch.search_result.llm_content,
-                "snippet": branch.search_result.snippet
-            }
+        kinds = list(fulltext.KINDS) if kind == "all" else [kind]
+        results = await db.run_sync(
+            lambda sync_db: fulltext.search(sync_db, match, kinds, user_id, limit + 1, offset)
+        )
 
-        elif request.search_result:
-            search_result_data = request.search_result
-        else:
-            raise HTTPException(status_code=400, detail="Either branch_id or search_result must be provided")
+        has_more = len(results) > limit
+        return {
+            "success": True,
+            "results": results[:limit],
+            "next_offset": offset + limit if has_more else None
+        }
+    except Exception as e:
+        return {"error": str(e), "success": False}
 
-        # ---------- GROQ FLASHCARD GENERATION ----------
-        flashcard_prompt = f"""
+def build_flashcard_prompt(search_result_data: dict, count: int) -> str:
+    return f"""
 You are an educational AI.
 
-Based on the content below, generate EXACTLY {request.count} flashcards.
+Based on the content below, generate EXACTLY {count} flashcards.
 
 Content:
 Title: {search_result_data.get('title', '')}
@@ -745,89 +1093,166 @@ Rules:
 """
 
 
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": flashcard_prompt}],
-            temperature=0.4
-        )
+async def generate_flashcards(source: dict, count: int) -> list:
+    """One upstream call for `count` flashcards on a branch's content."""
+    raw_text = (await llm.complete(build_flashcard_prompt(source, count), temperature=0.4)).strip()
 
-        raw_text = response.choices[0].message.content.strip()
+    try:
         start = raw_text.find("[")
         end = raw_text.rfind("]") + 1
+        return json.loads(raw_text[start:end])
+    except Exception:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Flashcard JSON parse failed. Raw response: {raw_text}"
+        )
 
-        try:
-            start = raw_text.find("[")
-            end = raw_text.rfind("]") + 1
-            structured_flashcards = json.loads(raw_text[start:end])
-        except Exception as e:
-           raise HTTPException(
-                status_code=500,
-                detail=f"Flashcard JSON parse failed. Raw response: {raw_text}"
-    )
 
+@app.post("/api/create-flashcards")
+async def create_flashcards(request: CreateFlashcardsRequest):
+    """
+    Three phases so no pooled connection waits on the model: a short read
+    of the branch, the Groq call with no session open, then one short write.
+    """
+    try:
+        # ---------- 1. Short read ----------
+        if request.branch_id:
+            search_result_data = await read_branch_flashcard_source(request.branch_id)
+        elif request.search_result:
+            search_result_data = request.search_result
+        else:
+            raise HTTPException(status_code=400, detail="Either branch_id or search_result must be provided")
 
-        created_flashcards = []
+        # ---------- 2. GROQ FLASHCARD GENERATION (no connection held) ----------
+        # 🌱 Seed pack nodes already have their cards
+        structured_flashcards = (
+            seed_packs.flashcards(search_result_data.get("title", ""), request.count)
+            or await generate_flashcards(search_result_data, request.count)
+        )
 
-        for card in structured_flashcards:
-            if request.branch_id:
-                flashcard = Flashcard(
-                    game_session_id=branch.game_session_id,
-                    branch_id=branch.id,
-                    front=card["front"],
-                    back=card["back"],
-                    difficulty=card["difficulty"],
-                    category=branch.search_result.title,
-                    created_at=datetime.now(timezone.utc)
-                )
-                db_session.add(flashcard)
-                created_flashcards.append({
-                    "front": flashcard.front,
-                    "back": flashcard.back,
-                    "difficulty": flashcard.difficulty
-                })
-            else:
-                created_flashcards.append(card)
-
-        # 🌱 Growth logic — MUST be inside try
-        if request.branch_id and branch:
-            garden = db_session.query(GameSession).filter(
-                GameSession.id == branch.game_session_id
-            ).first()
-
-            if garden:
-                garden.maturity = apply_growth(garden.maturity, 15)
-                garden.last_growth_at = datetime.now(timezone.utc)
-                if garden.maturity == 100:
-                    garden.credential_earned = True
-                    auto_mint_if_eligible(db_session, garden)
-
-        if db_session:
-            db_session.commit()
-
-        return {"success": True, "flashcards": created_flashcards}
+        # ---------- 3. Short write ----------
+        if request.branch_id:
+            created_flashcards = [
+                {"front": card["front"], "back": card["back"], "difficulty": card.get("difficulty", "medium")}
+                for card in structured_flashcards
+            ]
+            mint_request_id = await store_branch_flashcards(search_result_data, structured_flashcards)
+        else:
+            created_flashcards = structured_flashcards
+            mint_request_id = None
+
+        return {"success": True, "flashcards": created_flashcards, "mint_request_id": mint_request_id}
 
     except HTTPException:
-        if db_session:
-            db_session.rollback()
         raise
 
     except Exception as e:
-        if db_session:
-            db_session.rollback()
         return {"success": False, "error": str(e)}
 
-    finally:
-        if db_session:
-            db_session.close()
 
+async def read_branch_flashcard_source(branch_id: int) -> dict:
+    """Short read of everything flashcard generation needs from a saved branch."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+
+    async with AsyncReadSessionLocal() as db_session:
+        branch = await db_session.scalar(
+            select(Branch).options(selectinload(Branch.search_result)).where(Branch.id == branch_id)
+        )
+        if not branch:
+            raise HTTPException(status_code=404, detail="Branch not found")
+
+        if not branch.search_result:
+            raise HTTPException(status_code=400, detail="Branch has no search result data")
 
+        return {
+            "branch_id": branch.id,
+            "game_session_id": branch.game_session_id,
+            "title": branch.search_result.title,
+            "llm_content": branch.search_result.llm_content,
+            "snippet": branch.search_result.snippet
+        }
+
+
+def queued_mint_id(outcome) -> Optional[int]:
+    """The mint request queued when this growth took the garden to 100, if any."""
+    return outcome.hook_results.get("queue_credential_mint") if outcome else None
+
+
+async def store_branch_flashcards(source: dict, cards: list, growth_amount: int = 15) -> Optional[int]:
+    """
+    One short write: persist generated cards for a branch and grow its garden,
+    so a failed growth update can't leave cards without it. Returns any queued
+    mint id.
+    """
+    garden_id = source["game_session_id"]
+
+    def write(db: Session):
+        for card in cards:
+            db.add(Flashcard(
+                game_session_id=garden_id,
+                branch_id=source["branch_id"],
+                front=card["front"],
+                back=card["back"],
+                difficulty=card.get("difficulty", "medium"),
+                category=source["title"],
+                created_at=datetime.now(timezone.utc)
+            ))
+        return apply_growth_batch(db, {garden_id: growth_amount}, hooks=growth.hooks).get(garden_id)
 
+    return queued_mint_id(await db_writer.run(write))
+
+
+def is_valid_flashcard(card) -> bool:
+    return isinstance(card, dict) and bool(card.get("front")) and bool(card.get("back"))
+
+
+@app.post("/api/create-flashcards/stream")
+async def create_flashcards_stream(request: CreateFlashcardsRequest, format: str = "ndjson"):
+    """Streaming /api/create-flashcards: each card is pushed as soon as the model finishes it."""
+    if request.branch_id:
+        source = await read_branch_flashcard_source(request.branch_id)
+    elif request.search_result:
+        source = request.search_result
+    else:
+        raise HTTPException(status_code=400, detail="Either branch_id or search_result must be provided")
+
+    async def events():
+        pack_cards = seed_packs.flashcards(source.get("title", ""), request.count)
+        if pack_cards:
+            for card in pack_cards:
+                yield {"type": "flashcard", "flashcard": card}
+            if request.branch_id:
+                await store_branch_flashcards(source, pack_cards)
+            yield {"type": "done", "count": len(pack_cards)}
+            return
+
+        cards = []
+        parser = ArrayItemParser()
+        try:
+            async with aclosing(llm.stream(build_flashcard_prompt(source, request.count), temperature=0.4)) as chunks:
+                async for chunk in chunks:
+                    for card in parser.feed(chunk):
+                        if not is_valid_flashcard(card):
+                            continue
+                        cards.append(card)
+                        yield {"type": "flashcard", "flashcard": card}
+
+            if request.branch_id and cards:
+                await store_branch_flashcards(source, cards)
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+            return
+
+        yield {"type": "done", "count": len(cards)}
+
+    return event_stream(events(), format)
 
 
 @app.get("/api/flashcards/{branch_id}")
-async def get_flashcards(branch_id: int, db: Session = Depends(get_db)):
+async def get_flashcards(branch_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
-        flashcards = db.query(Flashcard).filter(Flashcard.branch_id == branch_id).all()
+        flashcards = (await db.scalars(select(Flashcard).where(Flashcard.branch_id == branch_id))).all()
         
         flashcards_data = []
         for flashcard in flashcards:
@@ -851,42 +1276,36 @@ async def get_flashcards(branch_id: int, db: Session = Depends(get_db)):
         return {"error": str(e), "success": False}
 
 @app.post("/api/delete-game-state")
-async def delete_game_state(request: DeleteGameStateRequest, db: Session = Depends(get_db)):
+async def delete_game_state(request: DeleteGameStateRequest):
     if not DB_AVAILABLE:
         raise _db_unavailable_error()
     try:
-        # Get the game session
-        game_session = db.query(GameSession).filter(GameSession.id == request.session_id).first()
-        if not game_session:
+        # One DELETE per child table, without loading the tree (retention.py)
+        deleted = await db_writer.run(lambda db: delete_sessions(db, [request.session_id]))
+        if not deleted.get(GameSession.__tablename__):
             raise HTTPException(status_code=404, detail="Game session not found")
         
-        # Delete the game session (cascade will handle related records)
-        db.delete(game_session)
-        db.commit()
-        
         return {
             "success": True,
-            "message": f"Game session {request.session_id} deleted successfully"
+            "message": f"Game session {request.session_id} deleted successfully",
+            "deleted": deleted
         }
         
     except Exception as e:
-        db.rollback()
         return {"error": str(e), "success": False}
-@app.post("/api/generate-quiz")
-async def generate_quiz(request: GenerateQuizRequest):
-    db_session: Optional[Session] = None
+QUIZ_QUESTIONS = 5
 
-    try:
-        # ---------------- Prepare flashcard content ----------------
-        flashcard_data = "\n".join([
-            f"Q: {card.get('front', '')}\nA: {card.get('back', '')}"
-            for card in request.flashcards
-        ])
 
-        quiz_prompt = f"""
+def build_quiz_prompt(flashcards: list) -> str:
+    flashcard_data = "\n".join([
+        f"Q: {card.get('front', '')}\nA: {card.get('back', '')}"
+        for card in flashcards
+    ])
+
+    return f"""
         You are an educational AI.
 
-        Based on the flashcards below, generate EXACTLY 5 challenging
+        Based on the flashcards below, generate EXACTLY {QUIZ_QUESTIONS} challenging
         multiple-choice questions that test understanding (not memorization).
 
         Flashcards:
@@ -914,24 +1333,40 @@ async def generate_quiz(request: GenerateQuizRequest):
         ]
         """
 
-        # ---------------- GROQ CALL ----------------
-        response = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": quiz_prompt}],
-            temperature=0.4
-        )
 
-        raw_text = response.choices[0].message.content.strip()
+def is_valid_question(question) -> bool:
+    return (
+        isinstance(question, dict)
+        and bool(question.get("question"))
+        and bool(question.get("correctAnswer"))
+        and isinstance(question.get("options"), list)
+    )
 
-        start = raw_text.find("[")
-        end = raw_text.rfind("]") + 1
-        questions_data = json.loads(raw_text[start:end])
+
+async def generate_quiz_questions(flashcards: list) -> list:
+    """One upstream call for a quiz on `flashcards` (options not yet shuffled)."""
+    raw_text = (await llm.complete(build_quiz_prompt(flashcards), temperature=0.4)).strip()
+
+    start = raw_text.find("[")
+    end = raw_text.rfind("]") + 1
+    return [q for q in json.loads(raw_text[start:end]) if is_valid_question(q)]
+
+
+@app.post("/api/generate-quiz")
+async def generate_quiz(request: GenerateQuizRequest):
+    try:
+        # ---------------- GROQ CALL ----------------
+        # 🌱 Cards from a seed pack node come with a pool of questions to sample from
+        pool = seed_packs.quiz(request.flashcards)
+        if pool:
+            questions_data = random.sample(pool, min(QUIZ_QUESTIONS, len(pool)))
+        else:
+            questions_data = await generate_quiz_questions(request.flashcards)
 
         # ---------------- Shuffle options ----------------
-        import random
         questions = []
         for q in questions_data:
-            options = q["options"]
+            options = list(q["options"])
             random.shuffle(options)
             questions.append({
                 "question": q["question"],
@@ -940,37 +1375,26 @@ async def generate_quiz(request: GenerateQuizRequest):
             })
 
         # ---------------- 🌱 Growth Logic ----------------
+        # One short write after generation; nothing was held during the LLM call
+        mint_request_id = None
         if (
             DB_AVAILABLE
-            and SessionLocal
             and request.flashcards
             and isinstance(request.flashcards[0], dict)
             and "branch_id" in request.flashcards[0]
         ):
             branch_id = request.flashcards[0]["branch_id"]
 
-            db_session = SessionLocal()
-            branch = db_session.query(Branch).filter(Branch.id == branch_id).first()
-
-            if branch:
-                garden = db_session.query(GameSession).filter(
-                    GameSession.id == branch.game_session_id
-                ).first()
-
-                if garden:
-                    garden.maturity = apply_growth(garden.maturity, 25)
-                    garden.last_growth_at = datetime.now(timezone.utc)
-
-                    if garden.maturity == 100:
-                        garden.credential_earned = True
-                        auto_mint_if_eligible(db_session, garden)
-
-                    db_session.commit()
+            async with AsyncReadSessionLocal() as db_session:
+                game_session_id = await db_session.scalar(select(Branch.game_session_id).where(Branch.id == branch_id))
+            if game_session_id:
+                mint_request_id = queued_mint_id(await growth.record(game_session_id, 25))
 
         # ---------------- Return response ----------------
         return {
             "success": True,
-            "questions": questions
+            "questions": questions,
+            "mint_request_id": mint_request_id
         }
 
     except json.JSONDecodeError:
@@ -985,14 +1409,10 @@ async def generate_quiz(request: GenerateQuizRequest):
             "error": str(e)
         }
 
-    finally:
-        if db_session:
-            db_session.close()
-
 
 @app.get("/api/garden/{garden_id}")
-async def get_garden(garden_id: int, db: Session = Depends(get_db)):
-    garden = db.query(GameSession).filter(GameSession.id == garden_id).first()
+async def get_garden(garden_id: int, db: AsyncSession = Depends(get_read_db)):
+    garden = await db.scalar(select(GameSession).where(GameSession.id == garden_id))
 
     if not garden:
         raise HTTPException(status_code=404, detail="Garden not found")
@@ -1007,46 +1427,81 @@ async def get_garden(garden_id: int, db: Session = Depends(get_db)):
 
 
 
+# Packs are built by warm_seeds.py or POST /api/admin/seed-packs/warm. The background
+# rebuild is opt-in: every worker would run its own and race the others' saves.
+SEED_PACK_WARM_ON_STARTUP = os.getenv("SEED_PACK_WARM_ON_STARTUP", "false").lower() == "true"
+SEED_PACK_CHECK_SECONDS = float(os.getenv("SEED_PACK_CHECK_SECONDS", str(6 * 3600)))
+seed_pack_task: Optional[asyncio.Task] = None
+seed_pack_jobs: set = set()  # on-demand rebuilds, referenced until they finish
+
+
+async def warm_seed_packs(seeds: Optional[list] = None, force: bool = False) -> list:
+    """Build packs for `seeds` (default: every pack topic) that are missing or stale. Returns the seeds built."""
+    if not seed_packs.loaded:
+        await run_in_threadpool(seed_packs.load)
+    seeds = seeds or PACK_TOPICS
+    if not force:
+        seeds = seed_packs.stale(seeds)
+
+    built = []
+    # One seed at a time: a pack is already dozens of concurrent calls
+    for seed in seeds:
+        try:
+            pack = await build_seed_pack(
+                seed, generate_search_areas, generate_insights, generate_flashcards, generate_quiz_questions
+            )
+            await run_in_threadpool(seed_packs.save, pack)
+        except Exception as e:
+            logger.error("Seed pack %r failed: %s", seed, e)
+            continue
+        logger.info("Seed pack %r built: %d LLM calls in %.1fs", seed, pack["llm_calls"], pack["build_seconds"])
+        built.append(seed)
+    return built
+
+
+async def refresh_seed_packs():
+    while True:
+        try:
+            await warm_seed_packs()
+        except Exception as e:
+            logger.error("Seed pack refresh failed: %s", e)
+        await asyncio.sleep(SEED_PACK_CHECK_SECONDS)
+
+
 @app.post("/api/plant-seed")
-async def plant_seed(
-    request: PlantSeedRequest,
-    db: Session = Depends(get_db)
-):
-    try:
+async def plant_seed(request: PlantSeedRequest):
+    def plant(db: Session) -> dict:
         garden = GameSession(
             original_search_query=request.seed.value,
             seed_type=request.seed.value,
+            user_id=request.user_id,
             maturity=0,
             credential_earned=False,
             created_at=datetime.now(timezone.utc),
             updated_at=datetime.now(timezone.utc)
         )
-
         db.add(garden)
-        db.commit()
-        db.refresh(garden)
-
+        db.flush()
         return {
-            "success": True,
-            "garden": {
-                "id": garden.id,
-                "seed": garden.seed_type,
-                "maturity": garden.maturity,
-                "credential_earned": garden.credential_earned
-            }
+            "id": garden.id,
+            "seed": garden.seed_type,
+            "maturity": garden.maturity,
+            "credential_earned": garden.credential_earned
         }
 
+    try:
+        return {"success": True, "garden": await db_writer.run(plant)}
+
     except Exception as e:
-        db.rollback()
         return {"success": False, "error": str(e)}
 
 @app.post("/api/mint-credential/{garden_id}")
 async def mint_credential(
     garden_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     # 1. Fetch garden
-    garden = db.query(GameSession).filter(GameSession.id == garden_id).first()
+    garden = await db.scalar(select(GameSession).where(GameSession.id == garden_id))
 
     if not garden:
         raise HTTPException(status_code=404, detail="Garden not found")
@@ -1058,19 +1513,7 @@ async def mint_credential(
             detail="Garden not mature enough to mint credential"
         )
 
-    # 3. Prevent double mint
-    existing = db.query(Credential).filter(
-        Credential.game_session_id == garden.id
-    ).first()
-
-    if existing:
-        return {
-            "success": True,
-            "credential": json.loads(existing.credential_metadata),
-            "message": "Credential already minted"
-        }
-
-    # 4. NFT-like metadata
+    # 3. NFT-like metadata
     metadata = {
         "name": f"BrainBonsai Credential — {garden.seed_type}",
         "description": f"Proof of mastery in {garden.seed_type}",
@@ -1087,79 +1530,149 @@ async def mint_credential(
         ]
     }
 
-    # 5. Create credential record
-    credential = Credential(
-        game_session_id=garden.id,
-        topic=garden.seed_type,
-        credential_metadata=json.dumps(metadata)
-    )
+    # 4. Create the credential record, unless one exists (checked in the write so two calls can't both mint)
+    def issue(write_db: Session):
+        existing = write_db.scalar(select(Credential).where(Credential.game_session_id == garden.id))
+        if existing:
+            return json.loads(existing.credential_metadata), False
+        write_db.add(Credential(
+            game_session_id=garden.id,
+            topic=garden.seed_type,
+            credential_metadata=json.dumps(metadata)
+        ))
+        return metadata, True
 
-    db.add(credential)
-    db.commit()
-    db.refresh(credential)
+    credential, created = await db_writer.run(issue)
 
-    # 6. Return minted credential
+    # 5. Return minted credential
+    if not created:
+        return {
+            "success": True,
+            "credential": credential,
+            "message": "Credential already minted"
+        }
     return {
         "success": True,
-        "credential": metadata
+        "credential": credential
     }
 
 
 @app.post("/api/mint-now")
-async def mint_now(payload: dict, db: Session = Depends(get_db)):
+async def mint_now(payload: dict):
     """Mint directly to a wallet without a garden. Payload: { wallet_address, topic }
     Useful for simplified automatic minting from the frontend when you don't want to create a garden.
+    The mint is queued; poll /api/mint-requests/{mint_request_id} for the tx hash.
     """
+    wallet = payload.get("wallet_address")
+    topic = payload.get("topic", "BrainBonsai Credential")
+
+    if not wallet:
+        raise HTTPException(status_code=400, detail="wallet_address is required")
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    # Imported here like in minting.py; checking an address needs no chain connection
+    from web3 import Web3
+    if not Web3.is_address(wallet):
+        raise HTTPException(status_code=400, detail="wallet_address is not a valid address")
+    services.get("chain")  # nothing is queued when minting isn't configured
+
     try:
-        wallet = payload.get("wallet_address")
-        topic = payload.get("topic", "BrainBonsai Credential")
+        mint_request_id = await db_writer.run(
+            lambda db: enqueue_mint(db, wallet_address=Web3.to_checksum_address(wallet), topic=topic).id
+        )
+        return {"success": True, "mint_request_id": mint_request_id, "status": "pending"}
 
-        if not wallet:
-            raise HTTPException(status_code=400, detail="wallet_address is required")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        checksum = Web3.to_checksum_address(wallet)
 
-        nonce = w3.eth.get_transaction_count(OWNER_ACCOUNT.address)
-        tx = nft_contract.functions.mint(checksum).build_transaction({
-            "from": OWNER_ACCOUNT.address,
-            "nonce": nonce,
-            "gas": 250_000,
-            "gasPrice": w3.to_wei("10", "gwei"),
-            "chainId": 11155111
-        })
+@app.get("/api/mint-requests/{request_id}")
+async def get_mint_request(request_id: int, db: AsyncSession = Depends(get_read_db)):
+    """
+    Poll a queued mint: pending -> submitting -> submitted (with tx_hash), or failed/skipped.
+    Once submitted, tx_status goes from pending to confirmed/reverted when the receipt lands.
+    """
+    mint = await db.scalar(
+        select(MintRequest).options(selectinload(MintRequest.credential)).where(MintRequest.id == request_id)
+    )
+    if not mint:
+        raise HTTPException(status_code=404, detail="Mint request not found")
+    return {"success": True, "mint": mint_request_json(mint)}
 
-        signed_tx = OWNER_ACCOUNT.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+@app.get("/api/llm/stats")
+async def llm_stats():
+    """Queue depth, in-flight count and latency of upstream LLM calls on this worker."""
+    return {"success": True, "llm": llm.stats()}
 
 
-        metadata = {
-            "name": f"BrainBonsai Credential — {topic}",
-            "tx_hash": tx_hash.hex(),
-            "issued_at": datetime.now(timezone.utc).isoformat(),
-            "topic": topic,
-            "issuer": "BrainBonsai"
-        }
+@app.get("/api/db/stats")
+async def db_stats():
+    """Storage profile, write-queue batching, connection-pool waits, growth coalescing, the mint worker and retention on this worker."""
+    return {
+        "success": True,
+        "storage_profile": STORAGE_PROFILE,
+        "writer": db_writer.stats(),
+        "pools": {name: metrics.stats() for name, metrics in POOL_METRICS.items()},
+        "growth": growth.stats(),
+        "mint_worker": mint_worker.stats(),
+        "retention": retention.stats()
+    }
 
-        credential = Credential(
-            game_session_id=None,
-            topic=topic,
-            credential_metadata=json.dumps(metadata),
-            minted_at=datetime.now(timezone.utc)
-        )
-        db.add(credential)
-        db.commit()
+@app.get("/api/services")
+async def service_stats():
+    """Which lazily created clients are configured and loaded on this worker, and what they cost to start."""
+    return {"success": True, "services": services.stats()}
+
+@app.get("/api/admin/search-cache")
+async def search_cache_stats():
+    try:
+        return {"success": True, "cache": await run_in_threadpool(search_cache.stats)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
-        return {"success": True, "tx_hash": tx_hash.hex(), "credential": metadata}
+@app.get("/api/admin/retrieval-index")
+async def retrieval_index_stats():
+    """Size of the insight index and how much of /api/web-search it answers (hit_rate)."""
+    return {"success": True, "enabled": RETRIEVAL_ENABLED, "index": insight_index.stats()}
 
-    except HTTPException:
-        raise
+@app.post("/api/admin/search-cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_search_cache(request: InvalidateCacheRequest):
+    """Drop cached web-search answers (all of them without a query; needs ADMIN_TOKEN)."""
+    try:
+        removed = await run_in_threadpool(search_cache.invalidate, request.query)
+        return {"success": True, "removed": removed}
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+        return {"success": False, "error": str(e)}
+
+@app.get("/api/admin/seed-packs")
+async def seed_pack_stats():
+    return {"success": True, "seed_packs": seed_packs.stats()}
+
+@app.post("/api/admin/seed-packs/warm", dependencies=[Depends(require_admin)])
+async def warm_seed_packs_now(request: WarmSeedPacksRequest):
+    """Rebuild seed packs in the background (all stale ones by default; needs ADMIN_TOKEN); progress shows in /api/admin/seed-packs."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    unknown = [seed for seed in request.seeds or [] if seed not in PACK_TOPICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"No pack topic {unknown[0]!r}; expected one of {PACK_TOPICS}")
+    seeds = request.seeds or None
+    job = asyncio.create_task(warm_seed_packs(seeds, force=request.force))
+    seed_pack_jobs.add(job)
+    job.add_done_callback(seed_pack_jobs.discard)
+    return {"success": True, "requested": seeds or PACK_TOPICS, "force": request.force}
+
+@app.post("/api/admin/retention/run", dependencies=[Depends(require_admin)])
+async def run_retention_now():
+    """Run one retention pass now, whether or not the background job is enabled (needs ADMIN_TOKEN)."""
+    if not DB_AVAILABLE:
+        raise _db_unavailable_error()
+    deleted = await retention.purge()
+    return {"success": True, "sessions_deleted": deleted, "retention": retention.stats()}
 
 @app.get("/api/debug/gardens")
-async def debug_gardens(db: Session = Depends(get_db)):
-    gardens = db.query(GameSession).all()
+async def debug_gardens(db: AsyncSession = Depends(get_read_db)):
+    gardens = (await db.scalars(select(GameSession))).all()
 
     return [
         {
@@ -1174,19 +1687,24 @@ async def debug_gardens(db: Session = Depends(get_db)):
 @app.post("/api/demo/grow/{garden_id}")
 async def demo_grow_garden(
     garden_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    garden = db.query(GameSession).filter(GameSession.id == garden_id).first()
+    # Straight to full maturity with the growth UPDATE but no on_mature hooks,
+    # so a demo never queues a real mint; the flag is set directly instead
+    def grow(write_db):
+        outcome = apply_growth_batch(write_db, {garden_id: MAX_MATURITY}).get(garden_id)
+        if outcome is not None:
+            write_db.execute(
+                update(GameSession)
+                .where(GameSession.id == garden_id)
+                .values(credential_earned=True, updated_at=datetime.now(timezone.utc))
+            )
+        return outcome
 
-    if not garden:
+    if await db_writer.run(grow) is None:
         raise HTTPException(status_code=404, detail="Garden not found")
 
-    garden.maturity = 100
-    garden.credential_earned = True
-    garden.updated_at = datetime.now(timezone.utc)
-
-    db.commit()
-    db.refresh(garden)
+    garden = await db.scalar(select(GameSession).where(GameSession.id == garden_id))
 
     return {
         "success": True,
@@ -1202,11 +1720,7 @@ async def demo_grow_garden(
 
 def verify_google_id_token(token: str) -> dict:
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            google_requests.Request(),
-            os.getenv("GOOGLE_CLIENT_ID")
-        )
+        idinfo = services.get("google_auth").verify(token)
 
         return {
             "google_sub": idinfo["sub"],
@@ -1227,37 +1741,44 @@ class GoogleTokenRequest(BaseModel):
 
 
 @app.post("/api/auth/google/verify")
-def google_verify(
+async def google_verify(
     request: GoogleTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    user_info = verify_google_id_token(request.token)
+    # May have to (re)fetch Google's signing certs over the network, so keep it off the loop
+    user_info = await run_in_threadpool(verify_google_id_token, request.token)
 
-    user = db.query(User).filter(
+    user = await db.scalar(select(User).where(
         User.google_sub == user_info["google_sub"]
-    ).first()
+    ))
+
+    if user:
+        user = {"id": user.id, "email": user.email, "wallet_address": user.wallet_address}
+    else:
+        from eth_account import Account
 
-    if not user:
         acct = Account.create()
         encrypted_pk = encrypt_private_key(acct.key.hex())
 
-        user = User(
-            google_sub=user_info["google_sub"],
-            email=user_info["email"],
-            wallet_address=acct.address,
-            encrypted_private_key=encrypted_pk
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        def sign_up(write_db: Session) -> dict:
+            # A parallel first sign-in may have created the user since the read
+            created = write_db.scalar(select(User).where(User.google_sub == user_info["google_sub"]))
+            if not created:
+                created = User(
+                    google_sub=user_info["google_sub"],
+                    email=user_info["email"],
+                    wallet_address=acct.address,
+                    encrypted_private_key=encrypted_pk
+                )
+                write_db.add(created)
+                write_db.flush()
+            return {"id": created.id, "email": created.email, "wallet_address": created.wallet_address}
+
+        user = await db_writer.run(sign_up)
 
     return {
         "success": True,
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "wallet_address": user.wallet_address
-        }
+        "user": user
     }
 
 
@@ -1273,111 +1794,34 @@ def logout():
 # main.py
 
 def auto_mint_if_eligible(db: Session, garden: GameSession, wallet_address: Optional[str] = None):
-    # 1. Check if maturity is 100 and it hasn't been earned yet
-    if garden.maturity < 100 or garden.credential_earned:
-        return
-
-    # 2. Check for existing credential in the database to prevent double-minting
-    existing = db.query(Credential).filter(
-        Credential.game_session_id == garden.id
-    ).first()
-    if existing:
-        return 
-
-    # 3. Get the user's wallet address. Try garden.user_id first, otherwise use provided wallet_address
-    user = None
-    try:
-        if getattr(garden, 'user_id', None):
-            user = db.query(User).filter(User.id == garden.user_id).first()
-    except Exception:
-        user = None
-
-    if (not user or not user.wallet_address) and wallet_address:
-        user = db.query(User).filter(User.wallet_address == wallet_address).first()
-
-    if not user or not user.wallet_address:
-        return
-
-    try:
-        # 4. Prepare the Minting Transaction
-        nonce = w3.eth.get_transaction_count(OWNER_ACCOUNT.address)
-        
-        tx = nft_contract.functions.mint(
-            Web3.to_checksum_address(user.wallet_address)
-        ).build_transaction({
-            "from": OWNER_ACCOUNT.address,
-            "nonce": nonce,
-            "gas": 250_000,
-            "gasPrice": w3.to_wei("10", "gwei"),
-            "chainId": 11155111  # Sepolia Testnet [cite: 1]
-        })
-
-        # 5. Sign and Send
-        signed_tx = OWNER_ACCOUNT.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-
-
-        # 6. Record the success in the database
-        metadata = {
-            "name": f"BrainBonsai Credential — {garden.seed_type}",
-            "tx_hash": tx_hash.hex(),
-            "issued_at": datetime.now(timezone.utc).isoformat(),
-            "topic": garden.seed_type,
-            "issuer": "BrainBonsai"
-        }
-
-        credential = Credential(
-            game_session_id=garden.id,
-            topic=garden.seed_type or "",
-            credential_metadata=json.dumps(metadata),
-            minted_at=datetime.now(timezone.utc)
-        )
-        garden.credential_earned = True
-        db.add(credential)
-        db.commit()
+    """
+    Queue an NFT mint for a mature garden in the caller's transaction.
+    The chain is only contacted by the background worker (see minting.py).
+    """
+    return enqueue_mint(db, garden, wallet_address)
 
-        print(f"Successfully minted NFT for session {garden.id}. Tx: {tx_hash.hex()}")
 
-    except Exception as e:
-        db.rollback()
-        print(f"Minting failed: {e}")
+@growth.on_mature
+def queue_credential_mint(db: Session, garden: GameSession, wallet_address: Optional[str] = None) -> Optional[int]:
+    """🌱 Runs once per garden, in the growth write that reaches 100."""
+    mint = auto_mint_if_eligible(db, garden, wallet_address)
+    return mint.id if mint else None
 
 
 @app.post("/api/apply-growth")
-async def handle_growth(session_id: int, growth_amount: int, wallet_address: Optional[str] = None, db: Session = Depends(get_db)):
-    garden = db.query(GameSession).filter(GameSession.id == session_id).first()
-    if not garden:
+async def handle_growth(session_id: int, growth_amount: int, wallet_address: Optional[str] = None):
+    # wallet_address is used for the mint if this growth makes the garden mature
+    if growth_amount < 0:
+        raise HTTPException(status_code=400, detail="growth_amount can't be negative")
+    outcome = await growth.record(session_id, growth_amount, wallet_address)
+    if outcome is None:
         raise HTTPException(status_code=404, detail="Garden not found")
 
-    # Use your utility to apply growth safely
-    garden.maturity = apply_growth(garden.maturity, growth_amount)
-    db.commit()
-
-    # Check for NFT eligibility after every growth update; forward optional wallet_address
-    auto_mint_if_eligible(db, garden, wallet_address)
-
-    return {"new_maturity": garden.maturity, "minted": garden.credential_earned}
-def apply_growth_and_check_mint(db: Session, session_id: int, increment: int):
-    garden = db.query(GameSession).filter(GameSession.id == session_id).first()
-    
-    # 1. Update Maturity
-    garden.maturity = min(100, garden.maturity + increment)
-    
-    # 2. Check if we just hit 100 and haven't minted yet
-    should_mint = False
-    if garden.maturity >= 100 and not garden.credential_earned:
-        should_mint = True
-        # Mark as earned immediately to prevent race conditions
-        garden.credential_earned = True 
-    
-    db.commit()
-
-    if should_mint:
-        # Call your existing auto_mint_if_eligible function
-        # This function should handle the Web3 transaction
-        auto_mint_if_eligible(db, garden)
-    
-    return garden
+    return {
+        "new_maturity": outcome.maturity,
+        "minted": outcome.credential_earned,
+        "mint_request_id": queued_mint_id(outcome)
+    }
 
 if __name__ == "__main__":
     import uvicorn
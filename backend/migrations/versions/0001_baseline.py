@@ -0,0 +1,159 @@
+"""baseline schema
+
+The tables as they existed before migrations were introduced. Databases
+created by the old create_all() already have them, so each table is only
+created when it is missing and this revision is a no-op for them.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create(name, *columns, indexes=()):
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    for column, unique in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column], unique=unique)
+
+
+def upgrade():
+    _create(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("google_sub", sa.String()),
+        sa.Column("email", sa.String()),
+        sa.Column("wallet_address", sa.String()),
+        sa.Column("encrypted_private_key", sa.Text(), nullable=False),
+        indexes=[("id", False), ("google_sub", True), ("email", False), ("wallet_address", True)],
+    )
+    _create(
+        "game_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("original_search_query", sa.String(), nullable=False),
+        sa.Column("camera_offset_x", sa.Float()),
+        sa.Column("camera_offset_y", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("seed_type", sa.String()),
+        sa.Column("maturity", sa.Integer()),
+        sa.Column("credential_earned", sa.Boolean()),
+        sa.Column("last_growth_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "nft_credentials",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String()),
+        sa.Column("nft_type", sa.String()),
+        sa.Column("image_url", sa.String()),
+        sa.Column("owner_wallet", sa.String()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False), ("owner_wallet", False)],
+    )
+    _create(
+        "search_results",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("url", sa.String()),
+        sa.Column("snippet", sa.Text()),
+        sa.Column("llm_content", sa.Text()),
+        sa.Column("search_query", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "branches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+        sa.Column("search_result_id", sa.Integer(), sa.ForeignKey("search_results.id")),
+        sa.Column("parent_branch_id", sa.Integer(), sa.ForeignKey("branches.id")),
+        sa.Column("start_x", sa.Float(), nullable=False),
+        sa.Column("start_y", sa.Float(), nullable=False),
+        sa.Column("end_x", sa.Float(), nullable=False),
+        sa.Column("end_y", sa.Float(), nullable=False),
+        sa.Column("length", sa.Float(), nullable=False),
+        sa.Column("max_length", sa.Float(), nullable=False),
+        sa.Column("angle", sa.Float(), nullable=False),
+        sa.Column("thickness", sa.Float(), nullable=False),
+        sa.Column("generation", sa.Integer()),
+        sa.Column("is_growing", sa.Boolean()),
+        sa.Column("growth_speed", sa.Float()),
+        sa.Column("node_type", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "leaves",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id")),
+        sa.Column("x", sa.Float(), nullable=False),
+        sa.Column("y", sa.Float(), nullable=False),
+        sa.Column("size", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "flashcards",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+        sa.Column("branch_id", sa.Integer(), sa.ForeignKey("branches.id")),
+        sa.Column("front", sa.Text(), nullable=False),
+        sa.Column("back", sa.Text(), nullable=False),
+        sa.Column("difficulty", sa.String()),
+        sa.Column("category", sa.String()),
+        sa.Column("node_position_x", sa.Float()),
+        sa.Column("node_position_y", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("last_reviewed", sa.DateTime()),
+        sa.Column("review_count", sa.Integer()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "fruits",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id")),
+        sa.Column("x", sa.Float(), nullable=False),
+        sa.Column("y", sa.Float(), nullable=False),
+        sa.Column("type", sa.String()),
+        sa.Column("size", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "credentials",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id")),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("credential_metadata", sa.Text(), nullable=False),
+        sa.Column("minted_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+    _create(
+        "flowers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+        sa.Column("x", sa.Float(), nullable=False),
+        sa.Column("y", sa.Float(), nullable=False),
+        sa.Column("type", sa.String()),
+        sa.Column("size", sa.Float()),
+        sa.Column("created_at", sa.DateTime()),
+        indexes=[("id", False)],
+    )
+
+
+def downgrade():
+    for name in ("flowers", "credentials", "fruits", "flashcards", "leaves",
+                 "branches", "search_results", "nft_credentials", "game_sessions", "users"):
+        op.drop_table(name)
@@ -0,0 +1,99 @@
+"""response cache, snapshots, client ids, session version/owner
+
+Everything the models gained before migrations existed. The old
+create_tables() already applied some of it to live databases, so every
+step checks the current schema first.
+
+Revision ID: 0002_cache_snapshots_client_ids
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_cache_snapshots_client_ids"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+CLIENT_ID_TABLES = ("search_results", "branches", "leaves", "flashcards", "fruits", "flowers")
+
+
+def _columns(table):
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _create_index(name, table, columns):
+    if name not in _indexes(table):
+        op.create_index(name, table, columns)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("response_cache"):
+        op.create_table(
+            "response_cache",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("namespace", sa.String(), nullable=False),
+            sa.Column("query", sa.String(), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("expires_at", sa.Float(), nullable=False),
+            sa.Column("hits", sa.Integer()),
+        )
+    for column in ("namespace", "query", "expires_at"):
+        _create_index(f"ix_response_cache_{column}", "response_cache", [column])
+
+    if not inspector.has_table("game_snapshots"):
+        op.create_table(
+            "game_snapshots",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    for column in ("id", "game_session_id"):
+        _create_index(f"ix_game_snapshots_{column}", "game_snapshots", [column])
+
+    for table in CLIENT_ID_TABLES:
+        if "client_id" not in _columns(table):
+            op.add_column(table, sa.Column("client_id", sa.String(), nullable=True))
+        _create_index(f"ix_{table}_client_id", table, ["client_id"])
+
+    existing = _columns("game_sessions")
+    # create_tables() used to add user_id with a plain ALTER, which can't carry the FK
+    has_owner_fk = any(
+        fk["constrained_columns"] == ["user_id"]
+        for fk in sa.inspect(op.get_bind()).get_foreign_keys("game_sessions")
+    )
+    with op.batch_alter_table("game_sessions") as batch:
+        if "version" not in existing:
+            batch.add_column(sa.Column("version", sa.Integer(), server_default="1"))
+        if "user_id" not in existing:
+            batch.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+        if not has_owner_fk:
+            batch.create_foreign_key("fk_game_sessions_user_id_users", "users", ["user_id"], ["id"])
+    _create_index("ix_game_sessions_updated_at_id", "game_sessions", ["updated_at", "id"])
+    _create_index("ix_game_sessions_user_updated_at_id", "game_sessions", ["user_id", "updated_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_game_sessions_user_updated_at_id", "game_sessions")
+    op.drop_index("ix_game_sessions_updated_at_id", "game_sessions")
+    with op.batch_alter_table("game_sessions") as batch:
+        batch.drop_column("user_id")
+        batch.drop_column("version")
+
+    for table in CLIENT_ID_TABLES:
+        op.drop_index(f"ix_{table}_client_id", table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("client_id")
+
+    op.drop_table("game_snapshots")
+    op.drop_table("response_cache")
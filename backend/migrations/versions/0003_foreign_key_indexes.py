@@ -0,0 +1,45 @@
+"""index the foreign keys every load and delete filters on
+
+Loading or deleting a tree filters the child tables by game_session_id,
+branch_id and parent_branch_id. Without these indexes each of those
+queries scans the whole table, so they got slower as every other
+player's trees piled up.
+
+Revision ID: 0003_foreign_key_indexes
+Revises: 0002_cache_snapshots_client_ids
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_foreign_key_indexes"
+down_revision = "0002_cache_snapshots_client_ids"
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = [
+    ("search_results", "game_session_id"),
+    ("branches", "game_session_id"),
+    ("branches", "search_result_id"),
+    ("branches", "parent_branch_id"),
+    ("leaves", "game_session_id"),
+    ("leaves", "branch_id"),
+    ("flashcards", "game_session_id"),
+    ("flashcards", "branch_id"),
+    ("fruits", "game_session_id"),
+    ("flowers", "game_session_id"),
+    ("credentials", "game_session_id"),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in FOREIGN_KEYS:
+        name = f"ix_{table}_{column}"
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column])
+
+
+def downgrade():
+    for table, column in reversed(FOREIGN_KEYS):
+        op.drop_index(f"ix_{table}_{column}", table)
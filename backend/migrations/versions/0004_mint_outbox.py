@@ -0,0 +1,41 @@
+"""mint outbox
+
+NFT mints are queued here in the same transaction as the maturity change
+and submitted by the background worker in minting.py.
+
+Revision ID: 0004_mint_outbox
+Revises: 0003_foreign_key_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_mint_outbox"
+down_revision = "0003_foreign_key_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mint_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("game_session_id", sa.Integer(), sa.ForeignKey("game_sessions.id"), nullable=True),
+        sa.Column("wallet_address", sa.String(), nullable=True),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("tx_hash", sa.String(), nullable=True),
+        sa.Column("credential_id", sa.Integer(), sa.ForeignKey("credentials.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_mint_outbox_id", "mint_outbox", ["id"])
+    op.create_index("ix_mint_outbox_game_session_id", "mint_outbox", ["game_session_id"])
+    op.create_index("ix_mint_outbox_status_next_attempt_at", "mint_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_table("mint_outbox")
@@ -0,0 +1,34 @@
+"""credential receipts
+
+Credentials minted on chain record their transaction and, once the
+receipt tracker in minting.py has seen it, its confirmation.
+
+Revision ID: 0005_credential_receipts
+Revises: 0004_mint_outbox
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_credential_receipts"
+down_revision = "0004_mint_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("credentials") as batch:
+        batch.add_column(sa.Column("tx_hash", sa.String(), nullable=True))
+        batch.add_column(sa.Column("tx_status", sa.String(), nullable=True))
+        batch.add_column(sa.Column("block_number", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("confirmed_at", sa.DateTime(), nullable=True))
+        batch.create_index("ix_credentials_tx_status", ["tx_status"])
+
+
+def downgrade():
+    with op.batch_alter_table("credentials") as batch:
+        batch.drop_index("ix_credentials_tx_status")
+        batch.drop_column("confirmed_at")
+        batch.drop_column("block_number")
+        batch.drop_column("tx_status")
+        batch.drop_column("tx_hash")
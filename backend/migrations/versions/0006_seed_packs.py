@@ -0,0 +1,35 @@
+"""seed packs
+
+Pre-generated content for the fixed Web3Seed topics, served by
+/api/search, /api/web-search, flashcards and quizzes without an LLM call.
+
+Revision ID: 0006_seed_packs
+Revises: 0005_credential_receipts
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_seed_packs"
+down_revision = "0005_credential_receipts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "seed_packs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("seed", sa.String(), nullable=False),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("llm_calls", sa.Integer(), nullable=True),
+        sa.Column("build_seconds", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_seed_packs_id", "seed_packs", ["id"])
+    op.create_index("ix_seed_packs_seed_version", "seed_packs", ["seed", "version"], unique=True)
+
+
+def downgrade():
+    op.drop_table("seed_packs")
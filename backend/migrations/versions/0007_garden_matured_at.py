@@ -0,0 +1,31 @@
+"""garden matured_at
+
+The growth write that takes a garden to maturity 100 claims `matured_at`,
+so the maturity transition (and the mint hooked to it) fires once.
+
+Revision ID: 0007_garden_matured_at
+Revises: 0006_seed_packs
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_garden_matured_at"
+down_revision = "0006_seed_packs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("game_sessions") as batch:
+        batch.add_column(sa.Column("matured_at", sa.DateTime(), nullable=True))
+    # Gardens that are already mature have had their transition
+    op.execute(
+        "UPDATE game_sessions SET matured_at = COALESCE(last_growth_at, updated_at, created_at) "
+        "WHERE maturity >= 100"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("game_sessions") as batch:
+        batch.drop_column("matured_at")
@@ -0,0 +1,68 @@
+"""full-text search
+
+FTS5 indexes over search_results (title, snippet, llm_content) and
+flashcards (front, back) for /api/garden-search. They are external-content
+tables: the text stays in the source tables, and triggers keep the index
+in step with every insert, update and delete, including the bulk core
+inserts and set-based deletes. SQLite only; other databases skip this.
+
+Note for later migrations: a batch_alter_table on search_results or
+flashcards copies the table and drops these triggers, so recreate them
+(and run 'rebuild') afterwards.
+
+Revision ID: 0008_fulltext_search
+Revises: 0007_garden_matured_at
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008_fulltext_search"
+down_revision = "0007_garden_matured_at"
+branch_labels = None
+depends_on = None
+
+# index table -> (source table, indexed columns, bm25 column weights)
+FTS_TABLES = {
+    "search_results_fts": ("search_results", ("title", "snippet", "llm_content"), "4.0, 1.0, 1.0"),
+    "flashcards_fts": ("flashcards", ("front", "back"), "2.0, 1.0"),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts, (source, columns, weights) in FTS_TABLES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{source}', content_rowid='id', "
+            # Prefix indexes keep 2-3 letter search-as-you-type prefixes cheap
+            f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # ORDER BY rank uses these weights (titles and card fronts count more)
+        op.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({weights})')")
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {source} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+        )
+        # Index what is already there
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts in FTS_TABLES:
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
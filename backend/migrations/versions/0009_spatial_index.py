@@ -0,0 +1,76 @@
+"""spatial index
+
+R-trees over the world-space bounds of branches (the segment's bounding
+box) and leaves, fruits and flowers (points), for viewport loading in
+/api/load-game-state/viewport. Each entry also spans the row's
+game_session_id as a zero-width third dimension, so a lookup stays inside
+one garden instead of matching every garden drawn at the same
+coordinates. Triggers keep them in step with the source tables. SQLite
+only; other databases skip this.
+
+Like the FTS triggers of 0008, these are dropped if a batch_alter_table
+copies one of the source tables; recreate them afterwards.
+
+Revision ID: 0009_spatial_index
+Revises: 0008_fulltext_search
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0009_spatial_index"
+down_revision = "0008_fulltext_search"
+branch_labels = None
+depends_on = None
+
+# source table -> (columns that move it, min_x, max_x, min_y, max_y as SQL over `row`)
+SPATIAL_TABLES = {
+    "branches": (
+        ("start_x", "start_y", "end_x", "end_y"),
+        "min(row.start_x, row.end_x)", "max(row.start_x, row.end_x)",
+        "min(row.start_y, row.end_y)", "max(row.start_y, row.end_y)",
+    ),
+    "leaves": (("x", "y"), "row.x", "row.x", "row.y", "row.y"),
+    "fruits": (("x", "y"), "row.x", "row.x", "row.y", "row.y"),
+    "flowers": (("x", "y"), "row.x", "row.x", "row.y", "row.y"),
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for source, (moved, *bounds) in SPATIAL_TABLES.items():
+        rtree = f"{source}_rtree"
+        op.execute(
+            f"CREATE VIRTUAL TABLE {rtree} USING rtree("
+            f"id, min_session, max_session, min_x, max_x, min_y, max_y)"
+        )
+
+        def entry(row):
+            values = ", ".join(bound.replace("row.", f"{row}.") for bound in bounds)
+            return (
+                f"INSERT INTO {rtree} SELECT {row}.id, {row}.game_session_id, {row}.game_session_id, {values} "
+                f"WHERE {row}.game_session_id IS NOT NULL;"
+            )
+
+        op.execute(f"CREATE TRIGGER {rtree}_ai AFTER INSERT ON {source} BEGIN {entry('new')} END")
+        op.execute(f"CREATE TRIGGER {rtree}_ad AFTER DELETE ON {source} BEGIN DELETE FROM {rtree} WHERE id = old.id; END")
+        op.execute(
+            f"CREATE TRIGGER {rtree}_au AFTER UPDATE OF {', '.join(moved)}, game_session_id ON {source} BEGIN "
+            f"DELETE FROM {rtree} WHERE id = old.id; {entry('new')} END"
+        )
+        # Index what is already there
+        values = ", ".join(bound.replace("row.", "") for bound in bounds)
+        op.execute(
+            f"INSERT INTO {rtree} SELECT id, game_session_id, game_session_id, {values} "
+            f"FROM {source} WHERE game_session_id IS NOT NULL"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for source in SPATIAL_TABLES:
+        rtree = f"{source}_rtree"
+        for suffix in ("ai", "ad", "au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {rtree}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {rtree}")
@@ -0,0 +1,74 @@
+"""full-text session column
+
+Adds game_session_id as an indexed (bm25 weight 0) column of both FTS5
+tables from 0008, so /api/garden-search can scope a query to one
+player's gardens inside the MATCH ("game_session_id : (4 OR 9) AND
+...") instead of joining every match to its source row. The tables are
+recreated with the same tokenizer and rebuilt from the source tables;
+the update triggers also fire when a row moves to another session.
+SQLite only; other databases skip this.
+
+Revision ID: 0010_fulltext_session
+Revises: 0009_spatial_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0010_fulltext_session"
+down_revision = "0009_spatial_index"
+branch_labels = None
+depends_on = None
+
+# index table -> (source table, text columns, their bm25 weights)
+FTS_TABLES = {
+    "search_results_fts": ("search_results", ("title", "snippet", "llm_content"), "4.0, 1.0, 1.0"),
+    "flashcards_fts": ("flashcards", ("front", "back"), "2.0, 1.0"),
+}
+
+
+def _drop(fts: str):
+    for suffix in ("ai", "ad", "au"):
+        op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+    op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def _create(fts: str, source: str, columns: tuple, weights: str):
+    names = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{source}', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', 'bm25({weights})')")
+    op.execute(
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new}); END"
+    )
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts, (source, columns, weights) in FTS_TABLES.items():
+        _drop(fts)
+        # The session column only filters; weight 0 keeps it out of the score
+        _create(fts, source, columns + ("game_session_id",), f"{weights}, 0.0")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for fts, (source, columns, weights) in FTS_TABLES.items():
+        _drop(fts)
+        _create(fts, source, columns, weights)
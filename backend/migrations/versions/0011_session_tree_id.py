@@ -0,0 +1,29 @@
+"""session tree_id
+
+Full saves send a client-generated tree id that stays the same across
+every save of one tree, so retention can tell a re-save of the same tree
+from a second garden planted with the same seed.
+
+Revision ID: 0011_session_tree_id
+Revises: 0010_fulltext_session
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011_session_tree_id"
+down_revision = "0010_fulltext_session"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("game_sessions") as batch:
+        batch.add_column(sa.Column("tree_id", sa.String(), nullable=True))
+        batch.create_index("ix_game_sessions_user_tree_id", ["user_id", "tree_id", "id"])
+
+
+def downgrade():
+    with op.batch_alter_table("game_sessions") as batch:
+        batch.drop_index("ix_game_sessions_user_tree_id")
+        batch.drop_column("tree_id")
@@ -0,0 +1,467 @@
+"""
+NFT credential minting through a durable outbox.
+
+Request handlers never talk to the chain: enqueue_mint() adds a
+mint_outbox row in the same transaction as the maturity change, and
+MintWorker submits due rows in the background with retries and
+exponential backoff. Clients poll GET /api/mint-requests/{id}.
+
+Nonces are counted locally (NonceAllocator), so each pass signs all
+due mints and broadcasts them in one JSON-RPC batch, and a second loop
+checks every unconfirmed transaction's receipt in one batch and records
+the outcome on its Credential row.
+
+Point SEPOLIA_RPC_URL at `python rpc_stub.py` to run all of this
+against a local stand-in node.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from db_writer import writer as db_writer
+from models import Credential, GameSession, MintRequest, ReadSessionLocal, User
+from services import services
+
+logger = logging.getLogger(__name__)
+
+NFT_ABI = [
+    {
+        "inputs": [{"internalType":"address","name":"to","type":"address"}],
+        "name":"mint",
+        "outputs":[{"internalType":"uint256","name":"","type":"uint256"}],
+        "stateMutability":"nonpayable",
+        "type":"function"
+    }
+]
+
+
+class Chain(NamedTuple):
+    w3: object
+    nft_contract: object
+    owner_account: object
+
+
+def _connect_chain() -> Chain:
+    # web3 and eth_account take about a second to import; only pay for it when minting
+    from web3 import Web3
+
+    w3 = Web3(Web3.HTTPProvider(os.getenv("SEPOLIA_RPC_URL")))
+    nft_contract = w3.eth.contract(
+        address=Web3.to_checksum_address(os.getenv("NFT_CONTRACT_ADDRESS")),
+        abi=NFT_ABI
+    )
+    owner_account = w3.eth.account.from_key(os.getenv("NFT_OWNER_PRIVATE_KEY"))
+    return Chain(w3, nft_contract, owner_account)
+
+
+services.register(
+    "chain", _connect_chain, required_env=("SEPOLIA_RPC_URL", "NFT_CONTRACT_ADDRESS", "NFT_OWNER_PRIVATE_KEY")
+)
+
+MINT_CHAIN_ID = int(os.getenv("MINT_CHAIN_ID", "11155111"))  # Sepolia Testnet
+MINT_MAX_ATTEMPTS = int(os.getenv("MINT_MAX_ATTEMPTS", "6"))
+MINT_BACKOFF_SECONDS = float(os.getenv("MINT_BACKOFF_SECONDS", "2"))
+MINT_BACKOFF_MAX_SECONDS = float(os.getenv("MINT_BACKOFF_MAX_SECONDS", "300"))
+MINT_POLL_SECONDS = float(os.getenv("MINT_POLL_SECONDS", "2"))
+MINT_BATCH_SIZE = int(os.getenv("MINT_BATCH_SIZE", "10"))
+# A row left in "submitting" this long (worker crashed mid-send) is retried
+MINT_LEASE_SECONDS = float(os.getenv("MINT_LEASE_SECONDS", "120"))
+MINT_RECEIPT_POLL_SECONDS = float(os.getenv("MINT_RECEIPT_POLL_SECONDS", "5"))
+MINT_RECEIPT_BATCH_SIZE = int(os.getenv("MINT_RECEIPT_BATCH_SIZE", "100"))
+# No receipt after this long: the transaction was dropped or replaced
+MINT_RECEIPT_TIMEOUT_SECONDS = float(os.getenv("MINT_RECEIPT_TIMEOUT_SECONDS", "1800"))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_mint(db: Session, garden: Optional[GameSession] = None, wallet_address: Optional[str] = None,
+                 topic: Optional[str] = None) -> Optional[MintRequest]:
+    """
+    Queue a credential mint in the caller's transaction.
+
+    For a garden, only once it has reached maturity 100 and only once per
+    garden (an existing request is returned). Without a garden the mint
+    goes straight to `wallet_address`.
+    """
+    if garden is not None:
+        if (garden.maturity or 0) < 100:
+            return None
+        existing = db.query(MintRequest).filter(MintRequest.game_session_id == garden.id).first()
+        if existing:
+            return existing
+        if db.query(Credential).filter(Credential.game_session_id == garden.id).first():
+            return None
+        # Mark as earned now; the worker fills in the credential when the tx is sent
+        garden.credential_earned = True
+
+    request = MintRequest(
+        game_session_id=garden.id if garden is not None else None,
+        wallet_address=wallet_address,
+        topic=topic if topic is not None else (garden.seed_type or "" if garden is not None else ""),
+        status="pending",
+        attempts=0,
+        next_attempt_at=_now(),
+    )
+    db.add(request)
+    db.flush()
+    mint_worker.wake()
+    return request
+
+
+def mint_request_json(request: MintRequest) -> dict:
+    """Needs `request.credential` loaded (selectinload) when the request has one."""
+    credential = request.credential if request.credential_id is not None else None
+    return {
+        "id": request.id,
+        "game_session_id": request.game_session_id,
+        "status": request.status,
+        "attempts": request.attempts,
+        "tx_hash": request.tx_hash,
+        "last_error": request.last_error,
+        "tx_status": credential.tx_status if credential else None,
+        "block_number": credential.block_number if credential else None,
+        "created_at": request.created_at.isoformat() if request.created_at else None,
+        "updated_at": request.updated_at.isoformat() if request.updated_at else None,
+    }
+
+
+class NonceAllocator:
+    """
+    Nonces for the owner account, read from the node once and then counted
+    locally, so back-to-back mints never share one and don't each cost an
+    eth_getTransactionCount round trip. After any rejected send, resync()
+    makes the next allocation re-read the pending count, which fills gaps
+    and catches up with transactions sent by other processes.
+    """
+
+    def __init__(self):
+        self._next: Optional[int] = None
+        self._lock = threading.Lock()
+        self.resyncs = 0
+
+    def allocate(self, count: int = 1) -> list:
+        with self._lock:
+            if self._next is None:
+                chain = services.get("chain")
+                self._next = chain.w3.eth.get_transaction_count(chain.owner_account.address, "pending")
+            first = self._next
+            self._next += count
+            return list(range(first, first + count))
+
+    def resync(self):
+        with self._lock:
+            self._next = None
+            self.resyncs += 1
+
+
+nonce_allocator = NonceAllocator()
+
+
+def rpc_batch(calls: list) -> list:
+    """
+    Send [(method, params), ...] to the node as one JSON-RPC batch.
+    Returns each call's raw result, or an exception for calls that failed.
+    """
+    responses = services.get("chain").w3.provider.make_batch_request(calls)
+    if not isinstance(responses, list):
+        # The node rejected the batch as a whole
+        return [RuntimeError(str(responses.get("error", responses)))] * len(calls)
+    return [RuntimeError(str(r["error"])) if "error" in r else r.get("result") for r in responses]
+
+
+def send_mint_batch(wallet_addresses: list) -> list:
+    """
+    Sign one mint per wallet on consecutive nonces and broadcast them all
+    in a single batch. Blocking; returns a tx hash or an exception per wallet.
+    """
+    try:
+        w3, nft_contract, owner_account = services.get("chain")
+        nonces = nonce_allocator.allocate(len(wallet_addresses))
+        raw_transactions = []
+        for wallet_address, nonce in zip(wallet_addresses, nonces):
+            tx = nft_contract.functions.mint(w3.to_checksum_address(wallet_address)).build_transaction({
+                "from": owner_account.address,
+                "nonce": nonce,
+                "gas": 250_000,
+                "gasPrice": w3.to_wei("10", "gwei"),
+                "chainId": MINT_CHAIN_ID
+            })
+            raw_transactions.append(w3.to_hex(owner_account.sign_transaction(tx).raw_transaction))
+        results = rpc_batch([("eth_sendRawTransaction", [raw]) for raw in raw_transactions])
+    except Exception as e:
+        results = [e] * len(wallet_addresses)
+
+    if any(isinstance(result, Exception) for result in results):
+        nonce_allocator.resync()
+    return results
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(MINT_BACKOFF_MAX_SECONDS, MINT_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.8, 1.2)
+
+
+class MintWorker:
+    """Background tasks that drain the mint outbox and track receipts on this worker process."""
+
+    def __init__(self):
+        self._tasks: list = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.submitted = 0
+        self.retried = 0
+        self.failed = 0
+        self.confirmed = 0
+        self.reverted = 0
+        self.dropped = 0
+
+    def start(self):
+        if not self._tasks:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._track())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def wake(self):
+        """Skip the rest of the poll interval. Safe to call from any thread."""
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error("Mint worker pass failed: %s", e)
+                processed = 0
+            if processed:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), MINT_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _track(self):
+        while True:
+            await asyncio.sleep(MINT_RECEIPT_POLL_SECONDS)
+            try:
+                await asyncio.to_thread(self.track_receipts)
+            except Exception as e:
+                logger.error("Receipt tracking pass failed: %s", e)
+
+    def run_once(self) -> int:
+        """Claim due rows and broadcast them as one batch. Returns how many were processed."""
+        if not services.configured("chain"):
+            # Leave the queue alone (no attempts burned) until minting is configured
+            return 0
+        jobs = db_writer.submit(_claim_due).result()
+        if not jobs:
+            return 0
+
+        sendable = [job for job in jobs if job["wallet_address"]]
+        results = send_mint_batch([job["wallet_address"] for job in sendable]) if sendable else []
+        outcomes = [(job, None) for job in jobs if not job["wallet_address"]]
+        for job, result in zip(sendable, results):
+            if isinstance(result, Exception):
+                retry = job["attempts"] < MINT_MAX_ATTEMPTS
+                self.retried += retry
+                self.failed += not retry
+                logger.warning("Mint %s attempt %s failed: %s", job["id"], job["attempts"], result)
+            else:
+                self.submitted += 1
+            outcomes.append((job, result))
+
+        db_writer.submit(lambda db: _record_outcomes(db, outcomes)).result()
+        return len(jobs)
+
+    def track_receipts(self) -> int:
+        """Fetch receipts for unconfirmed mints in one batch. Returns how many were settled."""
+        if not services.configured("chain"):
+            return 0
+        db = ReadSessionLocal()
+        try:
+            pending = (
+                db.query(Credential.id, Credential.tx_hash, Credential.minted_at)
+                .filter(Credential.tx_status == "pending")
+                .order_by(Credential.id)
+                .limit(MINT_RECEIPT_BATCH_SIZE)
+                .all()
+            )
+        finally:
+            db.close()
+        if not pending:
+            return 0
+
+        receipts = rpc_batch([("eth_getTransactionReceipt", [row.tx_hash]) for row in pending])
+        cutoff = _now() - timedelta(seconds=MINT_RECEIPT_TIMEOUT_SECONDS)
+        settled = []
+        for row, receipt in zip(pending, receipts):
+            if isinstance(receipt, Exception):
+                continue
+            if receipt is None:
+                if row.minted_at is not None and row.minted_at.replace(tzinfo=None) < cutoff:
+                    settled.append((row.id, "dropped", None))
+                continue
+            status = "confirmed" if int(receipt["status"], 16) == 1 else "reverted"
+            settled.append((row.id, status, int(receipt["blockNumber"], 16)))
+
+        if settled:
+            db_writer.submit(lambda db: _record_receipts(db, settled)).result()
+            for _, status, _ in settled:
+                setattr(self, status, getattr(self, status) + 1)
+        return len(settled)
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self._tasks),
+            "chain_configured": services.configured("chain"),
+            "submitted": self.submitted,
+            "retried": self.retried,
+            "failed": self.failed,
+            "confirmed": self.confirmed,
+            "reverted": self.reverted,
+            "dropped": self.dropped,
+            "nonce_resyncs": nonce_allocator.resyncs,
+        }
+
+
+def _claim_due(db: Session) -> list:
+    now = _now()
+    # Rows abandoned mid-send by a crashed worker go back in the queue
+    db.execute(
+        update(MintRequest)
+        .where(MintRequest.status == "submitting",
+               MintRequest.updated_at < now - timedelta(seconds=MINT_LEASE_SECONDS))
+        .values(status="pending", updated_at=now)
+    )
+    due = (
+        db.query(MintRequest)
+        .filter(MintRequest.status == "pending", MintRequest.next_attempt_at <= now)
+        .order_by(MintRequest.next_attempt_at)
+        .limit(MINT_BATCH_SIZE)
+        .all()
+    )
+
+    jobs = []
+    for request in due:
+        # Compare-and-swap so two processes never claim the same row
+        claimed = db.execute(
+            update(MintRequest)
+            .where(MintRequest.id == request.id, MintRequest.status == "pending")
+            .values(status="submitting", attempts=MintRequest.attempts + 1, updated_at=now)
+        ).rowcount
+        if claimed:
+            jobs.append({
+                "id": request.id,
+                "game_session_id": request.game_session_id,
+                "topic": request.topic,
+                "attempts": (request.attempts or 0) + 1,
+                "wallet_address": _resolve_wallet(db, request),
+            })
+    return jobs
+
+
+def _resolve_wallet(db: Session, request: MintRequest) -> Optional[str]:
+    if request.game_session_id is None:
+        return request.wallet_address
+
+    # Garden mints go to the owner's wallet, or to a known user's wallet passed by the client
+    garden = db.query(GameSession).filter(GameSession.id == request.game_session_id).first()
+    user = None
+    if garden is not None and garden.user_id:
+        user = db.query(User).filter(User.id == garden.user_id).first()
+    if (not user or not user.wallet_address) and request.wallet_address:
+        user = db.query(User).filter(User.wallet_address == request.wallet_address).first()
+    return user.wallet_address if user and user.wallet_address else None
+
+
+def _finish(db: Session, request_id: int, status: str, error: Optional[str] = None, next_attempt_at=None):
+    values = {"status": status, "last_error": error, "updated_at": _now()}
+    if next_attempt_at is not None:
+        values["next_attempt_at"] = next_attempt_at
+    db.execute(update(MintRequest).where(MintRequest.id == request_id).values(**values))
+
+
+def _record_outcomes(db: Session, outcomes: list):
+    for job, result in outcomes:
+        if result is None:
+            _finish(db, job["id"], status="skipped", error="No wallet to mint to")
+        elif isinstance(result, Exception):
+            retry = job["attempts"] < MINT_MAX_ATTEMPTS
+            _finish(
+                db, job["id"], status="pending" if retry else "failed", error=str(result),
+                next_attempt_at=_now() + timedelta(seconds=backoff_seconds(job["attempts"])) if retry else None
+            )
+        else:
+            _record_submitted(db, job, result)
+
+
+def _record_receipts(db: Session, settled: list):
+    now = _now()
+    for credential_id, status, block_number in settled:
+        db.execute(
+            update(Credential)
+            .where(Credential.id == credential_id)
+            .values(tx_status=status, block_number=block_number, confirmed_at=now if status == "confirmed" else None)
+        )
+
+
+def _record_submitted(db: Session, job: dict, tx_hash: str):
+    metadata = {
+        "name": f"BrainBonsai Credential — {job['topic']}",
+        "tx_hash": tx_hash,
+        "issued_at": datetime.now(timezone.utc).isoformat(),
+        "topic": job["topic"],
+        "issuer": "BrainBonsai"
+    }
+    credential = None
+    if job["game_session_id"] is not None:
+        # /api/mint-credential may already have issued the off-chain credential
+        credential = db.query(Credential).filter(Credential.game_session_id == job["game_session_id"]).first()
+    if credential is not None:
+        metadata = {**json.loads(credential.credential_metadata or "{}"), "tx_hash": tx_hash}
+        credential.credential_metadata = json.dumps(metadata)
+        credential.tx_hash = tx_hash
+        credential.tx_status = "pending"
+    else:
+        credential = Credential(
+            game_session_id=job["game_session_id"],
+            topic=job["topic"] or "",
+            credential_metadata=json.dumps(metadata),
+            minted_at=datetime.now(timezone.utc),
+            tx_hash=tx_hash,
+            tx_status="pending"
+        )
+        db.add(credential)
+    db.flush()
+    db.execute(
+        update(MintRequest)
+        .where(MintRequest.id == job["id"])
+        .values(status="submitted", tx_hash=tx_hash, credential_id=credential.id, last_error=None, updated_at=_now())
+    )
+    if job["game_session_id"] is not None:
+        db.execute(
+            update(GameSession).where(GameSession.id == job["game_session_id"]).values(credential_earned=True)
+        )
+
+
+mint_worker = MintWorker()
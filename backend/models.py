@@ -1,10 +1,14 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import create_engine, event, make_url, Column, Index, Integer, String, Text, DateTime, ForeignKey, Float, Boolean, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from datetime import datetime, timezone
 import json
 import os
 
+from pool_metrics import PoolMetrics, timed_pool_class
+
 Base = declarative_base()
 
 class NFTCredential(Base):
@@ -48,6 +52,18 @@ class GameSession(Base):
     maturity = Column(Integer, default=0)      # 0–100 growth %
     credential_earned = Column(Boolean, default=False)
     last_growth_at = Column(DateTime, nullable=True)
+    matured_at = Column(DateTime, nullable=True)  # set once, by the growth write that reached 100 (growth.py)
+    version = Column(Integer, default=1)  # bumped by every delta save
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # owning player, if signed in
+    tree_id = Column(String, nullable=True)  # client id of the tree, the same on each of its full saves
+
+    __table_args__ = (
+        # Keyset pagination of the session list, globally and per owner
+        Index("ix_game_sessions_updated_at_id", "updated_at", "id"),
+        Index("ix_game_sessions_user_updated_at_id", "user_id", "updated_at", "id"),
+        # Earlier saves of the same tree (retention.py)
+        Index("ix_game_sessions_user_tree_id", "user_id", "tree_id", "id"),
+    )
 
     # Relationships
     search_results = relationship("SearchResult", back_populates="game_session", cascade="all, delete-orphan")
@@ -56,12 +72,14 @@ class GameSession(Base):
     flashcards = relationship("Flashcard", back_populates="game_session", cascade="all, delete-orphan")
     fruits = relationship("Fruit", back_populates="game_session", cascade="all, delete-orphan")
     flowers = relationship("Flower", back_populates="game_session", cascade="all, delete-orphan")
+    snapshots = relationship("GameSnapshot", cascade="all, delete-orphan")
 
 class SearchResult(Base):
     __tablename__ = "search_results"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
     title = Column(String, nullable=False)
     url = Column(String)
     snippet = Column(Text)
@@ -77,9 +95,10 @@ class Branch(Base):
     __tablename__ = "branches"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False)
-    search_result_id = Column(Integer, ForeignKey("search_results.id"), nullable=True)
-    parent_branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)  # For hierarchy
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
+    search_result_id = Column(Integer, ForeignKey("search_results.id"), nullable=True, index=True)
+    parent_branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True, index=True)  # For hierarchy
     
     # Branch properties
     start_x = Column(Float, nullable=False)
@@ -110,8 +129,9 @@ class Leaf(Base):
     __tablename__ = "leaves"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False)
-    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True, index=True)
     
     x = Column(Float, nullable=False)
     y = Column(Float, nullable=False)
@@ -126,8 +146,9 @@ class Flashcard(Base):
     __tablename__ = "flashcards"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False)
-    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True, index=True)
     
     # Flashcard content
     front = Column(Text, nullable=False)  # Question or term
@@ -148,7 +169,8 @@ class Fruit(Base):
     __tablename__ = "fruits"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=True, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
     
     x = Column(Float, nullable=False)
     y = Column(Float, nullable=False)
@@ -163,12 +185,18 @@ class Credential(Base):
     __tablename__ = "credentials"
 
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=True, index=True)
 
     topic = Column(String, nullable=False)
     credential_metadata = Column(Text, nullable=False)  # ✅ renamed
     minted_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # On-chain mint, filled in by minting.py; tx_status is None for off-chain credentials
+    tx_hash = Column(String, nullable=True)
+    tx_status = Column(String, nullable=True, index=True)  # pending, confirmed, reverted, dropped
+    block_number = Column(Integer, nullable=True)
+    confirmed_at = Column(DateTime, nullable=True)
+
     game_session = relationship("GameSession")
 
 
@@ -177,7 +205,8 @@ class Flower(Base):
     __tablename__ = "flowers"
     
     id = Column(Integer, primary_key=True, index=True)
-    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    client_id = Column(String, nullable=True, index=True)  # stable id assigned by the frontend
     
     x = Column(Float, nullable=False)
     y = Column(Float, nullable=False)
@@ -188,6 +217,66 @@ class Flower(Base):
     # Relationships
     game_session = relationship("GameSession", back_populates="flowers")
 
+class GameSnapshot(Base):
+    __tablename__ = "game_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)  # GameSession.version this blob was taken at
+    data = Column(LargeBinary, nullable=False)  # see snapshot.py for the format
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class MintRequest(Base):
+    __tablename__ = "mint_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_session_id = Column(Integer, ForeignKey("game_sessions.id"), nullable=True, index=True)  # None for /api/mint-now
+    wallet_address = Column(String, nullable=True)   # explicit target; otherwise the garden owner's wallet
+    topic = Column(String, nullable=False, default="")
+    status = Column(String, nullable=False, default="pending")  # pending, submitting, submitted, failed, skipped
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_error = Column(Text, nullable=True)
+    tx_hash = Column(String, nullable=True)
+    credential_id = Column(Integer, ForeignKey("credentials.id"), nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    credential = relationship("Credential")
+
+    __table_args__ = (
+        # The worker's poll: due rows in one status, oldest first
+        Index("ix_mint_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+class CachedResponse(Base):
+    __tablename__ = "response_cache"
+
+    # sha256 of namespace + prompt template version + normalized query
+    key = Column(String, primary_key=True)
+    namespace = Column(String, nullable=False, index=True)   # e.g. "search"
+    query = Column(String, nullable=False, index=True)       # normalized query
+    payload = Column(Text, nullable=False)                   # JSON
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(Float, nullable=False, index=True)   # unix timestamp
+    hits = Column(Integer, default=0)
+
+class SeedPack(Base):
+    __tablename__ = "seed_packs"
+
+    # One pre-generated content pack per Web3Seed and pack version (see seed_packs.py)
+    id = Column(Integer, primary_key=True, index=True)
+    seed = Column(String, nullable=False)                    # Web3Seed value
+    version = Column(String, nullable=False)                 # SEED_PACK_VERSION it was built with
+    payload = Column(Text, nullable=False)                   # JSON: areas, children, flashcards, quizzes
+    llm_calls = Column(Integer, default=0)
+    build_seconds = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_seed_packs_seed_version", "seed", "version", unique=True),
+    )
+
 # Database setup
 def _resolve_database_url() -> str:
     env_database_url = os.getenv("DATABASE_URL")
@@ -210,16 +299,138 @@ def _resolve_database_url() -> str:
 
 DATABASE_URL = _resolve_database_url()
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+
+# Checkout-wait metrics per engine pool, reported by /api/db/stats
+POOL_METRICS = {}
+
+
+def _pool_options(name: str, base: type = QueuePool) -> dict:
+    """Queue pool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT that times checkouts."""
+    if make_url(DATABASE_URL).database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite keeps its single shared connection
+    metrics = POOL_METRICS[name] = PoolMetrics(name)
+    return {
+        "poolclass": timed_pool_class(base, metrics),
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    }
+
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **_pool_options("sync"))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Storage profile: "default" keeps SQLite's stock settings; "concurrent"
+# switches to WAL, routes writes through the single writer in db_writer.py
+# and serves loads/lists from read-only connections.
+STORAGE_PROFILE = os.getenv("DB_STORAGE_PROFILE", "default").lower()
+CONCURRENT_STORAGE = STORAGE_PROFILE == "concurrent" and DATABASE_URL.startswith("sqlite")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # WAL stays consistent; only the last commits can be lost on power failure
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),  # negative = KiB
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def _apply_pragmas(target_engine, extra=None):
+    pragmas = dict(SQLITE_PRAGMAS, **(extra or {}))
+
+    @event.listens_for(target_engine, "connect")
+    def set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+if CONCURRENT_STORAGE:
+    _apply_pragmas(engine)
+
+    # The writer thread owns this engine. pysqlite's implicit transactions
+    # break SAVEPOINT, so BEGIN is issued explicitly (IMMEDIATE takes the
+    # write lock up front instead of failing on upgrade).
+    write_engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_size=1, max_overflow=0)
+    _apply_pragmas(write_engine)
+
+    @event.listens_for(write_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, _record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(write_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    read_engine = create_engine(DATABASE_URL, connect_args=connect_args, **_pool_options("sync_read"))
+    _apply_pragmas(read_engine, {"query_only": "ON"})
+else:
+    write_engine = engine
+    read_engine = engine
+
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async driver for each backend a DATABASE_URL may name
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+    "mariadb": "aiomysql",
+}
+ASYNC_CAPABLE_DRIVERS = set(ASYNC_DRIVERS.values()) | {"psycopg", "asyncmy"}
+
+
+def _async_database_url(url: str):
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() in ASYNC_CAPABLE_DRIVERS:
+        return url
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS.get(backend, url.get_driver_name())}")
+
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options("async", AsyncAdaptedQueuePool))
+if CONCURRENT_STORAGE:
+    _apply_pragmas(async_engine.sync_engine)
+    async_read_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options("async_read", AsyncAdaptedQueuePool))
+    _apply_pragmas(async_read_engine.sync_engine, {"query_only": "ON"})
+else:
+    async_read_engine = async_engine
+
+# expire_on_commit=False: attributes can't be lazily refreshed outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+async def dispose_async_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
 def create_tables():
-    # Only create tables if they don't exist (don't drop existing data)
-    Base.metadata.create_all(bind=engine)
+    """
+    Bring the database schema up to date by running the Alembic migrations
+    in migrations/versions. Existing databases (including ones created by
+    the old create_all() bootstrap) are upgraded in place; no data is dropped.
+    """
+    from alembic import command
+    from alembic.config import Config
 
-def get_db():
-    db = SessionLocal()
-    try:
+    config = Config(ALEMBIC_INI)
+    config.attributes["embedded"] = True
+    command.upgrade(config, "head")
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db():
+    """Like get_db(), but on a read-only connection under the concurrent profile."""
+    async with AsyncReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import exc
+
+
+class PoolMetrics:
+    """
+    How long callers waited to get a connection out of an engine's pool.
+    A healthy pool hands connections out in microseconds; waits in the
+    tens of milliseconds mean requests are queueing behind held connections.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.acquisitions = 0
+            self.timeouts = 0
+            self.max_wait = 0.0
+            self._waits = deque(maxlen=2000)
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.acquisitions += 1
+            self.timeouts += timed_out
+            self.max_wait = max(self.max_wait, seconds)
+            self._waits.append(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+        count = len(waits)
+        stats = {
+            "acquisitions": self.acquisitions,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "avg": round(sum(waits) / count * 1000, 3) if count else None,
+                "p95": round(waits[min(count - 1, int(count * 0.95))] * 1000, 3) if count else None,
+                "max": round(self.max_wait * 1000, 3),
+            },
+            "waits_over_10ms": sum(1 for w in waits if w > 0.01),
+        }
+        if self.pool is not None and hasattr(self.pool, "checkedout"):
+            stats["checked_out"] = self.pool.checkedout()
+            stats["size"] = self.pool.size()
+        return stats
+
+
+def timed_pool_class(base: type, metrics: PoolMetrics) -> type:
+    """Subclass of a queue pool `base` that reports checkout waits to `metrics`."""
+
+    class TimedPool(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            metrics.pool = self
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record(time.perf_counter() - started, timed_out=True)
+                raise
+            metrics.record(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
@@ -0,0 +1,266 @@
+"""
+Deleting game sessions, and the background job that purges old ones.
+
+delete_sessions() removes sessions with one DELETE per child table
+(WHERE game_session_id IN ...) instead of db.delete(), which loads every
+branch, leaf and flashcard through the ORM cascades and deletes them row
+by row. Credentials and mint requests outlive the garden; they only lose
+the link to it.
+
+RetentionWorker purges, in small batches with one short write each:
+  - superseded sessions: a signed-in player saved the same tree again
+    (every full save creates a new session with the client's tree_id),
+    the old session was not changed after that, and the newer save is
+    older than RETENTION_SUPERSEDED_DAYS. Two gardens grown from the same
+    seed have different tree ids and are both kept;
+  - abandoned sessions: anonymous gardens untouched for
+    RETENTION_ABANDONED_DAYS. Only saves that carry a tree_id count;
+    older rows can't be told apart from gardens saved before tree ids
+    existed.
+Gardens that matured or have a credential or mint request are never
+purged. The job is off unless RETENTION_ENABLED is set, and only the
+worker process holding RETENTION_LOCK_FILE runs it; the others leave it
+alone. The lock is per host, so with several hosts enable it on one.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import IO, List, Optional
+
+from sqlalchemy import and_, delete, exists, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from db_writer import writer as db_writer
+from models import (
+    Branch, Credential, Flashcard, Flower, Fruit, GameSession, GameSnapshot, Leaf, MintRequest, SearchResult,
+)
+
+logger = logging.getLogger(__name__)
+
+RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() in {"1", "true", "yes"}
+RETENTION_SUPERSEDED_DAYS = float(os.getenv("RETENTION_SUPERSEDED_DAYS", "7"))
+RETENTION_ABANDONED_DAYS = float(os.getenv("RETENTION_ABANDONED_DAYS", "90"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "50"))          # sessions per write
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.5"))  # lets queued writes in
+RETENTION_MAX_BATCHES = int(os.getenv("RETENTION_MAX_BATCHES", "200"))      # per pass
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_LOCK_FILE = os.getenv(
+    "RETENTION_LOCK_FILE", os.path.join(tempfile.gettempdir(), "brainbonsai-retention.lock")
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Children first; branches go after everything that points at them
+CHILD_TABLES = (Flashcard, Leaf, Fruit, Flower, GameSnapshot, Branch, SearchResult)
+
+
+def delete_sessions(db: Session, session_ids: List[int]) -> dict:
+    """
+    Delete the sessions and everything they own in the caller's transaction.
+    Returns rows deleted per table; "game_sessions" counts the sessions found.
+    """
+    ids = list(session_ids)
+    if not ids:
+        return {}
+
+    # Rows of other sessions that point into these ones (a full save can keep
+    # a parentBranchId from another tree) are unlinked, not deleted
+    doomed_branches = select(Branch.id).where(Branch.game_session_id.in_(ids))
+    doomed_results = select(SearchResult.id).where(SearchResult.game_session_id.in_(ids))
+    for column, targets in (
+        (Branch.parent_branch_id, doomed_branches),
+        (Branch.search_result_id, doomed_results),
+        (Leaf.branch_id, doomed_branches),
+        (Flashcard.branch_id, doomed_branches),
+    ):
+        model = column.class_
+        db.execute(
+            update(model)
+            .where(column.in_(targets), model.game_session_id.not_in(ids))
+            .values({column.key: None})
+            .execution_options(synchronize_session=False)
+        )
+    # Within the doomed sessions, branch -> branch links would otherwise depend on delete order
+    db.execute(
+        update(Branch)
+        .where(Branch.game_session_id.in_(ids), Branch.parent_branch_id.is_not(None))
+        .values(parent_branch_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+    for model in (Credential, MintRequest):
+        db.execute(
+            update(model)
+            .where(model.game_session_id.in_(ids))
+            .values(game_session_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    deleted = {}
+    for model in CHILD_TABLES + (GameSession,):
+        key = GameSession.id if model is GameSession else model.game_session_id
+        result = db.execute(delete(model).where(key.in_(ids)).execution_options(synchronize_session=False))
+        deleted[model.__tablename__] = result.rowcount
+    return deleted
+
+
+def purgeable(now: datetime, superseded_days: float, abandoned_days: float):
+    """WHERE clause for sessions the retention job may delete."""
+    newer = aliased(GameSession)
+    superseded = exists().where(
+        newer.user_id == GameSession.user_id,
+        newer.tree_id == GameSession.tree_id,
+        newer.id > GameSession.id,
+        newer.created_at < now - timedelta(days=superseded_days),
+        # A patch to the old save after the re-save means both are in use
+        GameSession.updated_at < newer.created_at,
+    )
+    abandoned = and_(
+        GameSession.user_id.is_(None),
+        GameSession.tree_id.is_not(None),
+        GameSession.updated_at < now - timedelta(days=abandoned_days),
+    )
+    return and_(
+        or_(and_(GameSession.user_id.is_not(None), GameSession.tree_id.is_not(None), superseded), abandoned),
+        GameSession.matured_at.is_(None),
+        or_(GameSession.credential_earned.is_(None), GameSession.credential_earned.is_(False)),
+        ~exists().where(Credential.game_session_id == GameSession.id),
+        ~exists().where(MintRequest.game_session_id == GameSession.id),
+    )
+
+
+def purge_batch(db: Session, limit: int, superseded_days: float, abandoned_days: float) -> dict:
+    """Pick and delete up to `limit` purgeable sessions in one transaction, oldest first."""
+    now = datetime.now(timezone.utc)
+    ids = db.scalars(
+        select(GameSession.id)
+        .where(purgeable(now, superseded_days, abandoned_days))
+        .order_by(GameSession.id)
+        .limit(limit)
+    ).all()
+    return delete_sessions(db, ids)
+
+
+def try_lock(path: str) -> Optional[IO]:
+    """Open and exclusively lock `path` without waiting; None when another process holds it."""
+    handle = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+class RetentionWorker:
+    """Background task that purges superseded and abandoned sessions on this worker process."""
+
+    def __init__(
+        self,
+        writer,
+        batch_size: int = RETENTION_BATCH_SIZE,
+        superseded_days: float = RETENTION_SUPERSEDED_DAYS,
+        abandoned_days: float = RETENTION_ABANDONED_DAYS,
+        lock_file: str = RETENTION_LOCK_FILE,
+    ):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.superseded_days = superseded_days
+        self.abandoned_days = abandoned_days
+        self.lock_file = lock_file
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[IO] = None
+
+        self.passes = 0
+        self.batches = 0
+        self.sessions_deleted = 0
+        self.rows_deleted = 0
+        self.longest_batch_ms = 0.0
+        self.last_pass_at: Optional[str] = None
+
+    def start(self):
+        """Start the background job, unless another worker process already runs it."""
+        if self._task is not None:
+            return
+        self._lock = try_lock(self.lock_file)
+        if self._lock is None:
+            logger.info("Retention already runs in another worker process")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.purge()
+            except Exception as e:
+                logger.error("Retention pass failed: %s", e)
+            await asyncio.sleep(RETENTION_INTERVAL_SECONDS)
+
+    async def purge(self, max_batches: int = RETENTION_MAX_BATCHES, pause: float = RETENTION_BATCH_PAUSE_SECONDS) -> int:
+        """
+        One pass: delete batches until nothing is left or max_batches is hit.
+        Each batch is its own write, so other writes queue behind at most one
+        batch. Returns how many sessions were deleted.
+        """
+        total = 0
+        for _ in range(max_batches):
+            started = time.perf_counter()
+            deleted = await self.writer.run(
+                lambda db: purge_batch(db, self.batch_size, self.superseded_days, self.abandoned_days)
+            )
+            sessions = deleted.get(GameSession.__tablename__, 0)
+            if not sessions:
+                break
+            self.batches += 1
+            self.sessions_deleted += sessions
+            self.rows_deleted += sum(deleted.values())
+            self.longest_batch_ms = max(self.longest_batch_ms, (time.perf_counter() - started) * 1000)
+            total += sessions
+            if sessions < self.batch_size:
+                break
+            await asyncio.sleep(pause)
+        self.passes += 1
+        self.last_pass_at = datetime.now(timezone.utc).isoformat()
+        if total:
+            logger.info("Retention purged %d game sessions", total)
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "superseded_days": self.superseded_days,
+            "abandoned_days": self.abandoned_days,
+            "batch_size": self.batch_size,
+            "passes": self.passes,
+            "batches": self.batches,
+            "sessions_deleted": self.sessions_deleted,
+            "rows_deleted": self.rows_deleted,
+            "longest_batch_ms": round(self.longest_batch_ms, 1),
+            "last_pass_at": self.last_pass_at,
+        }
+
+
+retention = RetentionWorker(db_writer)
@@ -0,0 +1,268 @@
+import logging
+import math
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from uniqueness import normalize_title, pick_unique
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+    a an and are as at be by for from has how in into is it its of on or that the their this to
+    was what when where which who why will with your you about over under vs
+""".split())
+# Titles say what an insight is about; count their terms more than the body's
+TITLE_WEIGHT = 2
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class InsightIndex:
+    """
+    BM25 index over every insight saved in `search_results`, so
+    /api/web-search can hand out previously generated insights instead of
+    asking the model again.
+
+    Postings are per-term NumPy arrays (doc ids, term frequencies); a query
+    scores all matching documents in a few vectorized operations. The index
+    follows the table by id: each search first pulls rows newer than the
+    last one it saw (at most every RETRIEVAL_REFRESH_SECONDS), and rebuilds
+    from scratch every RETRIEVAL_REBUILD_SECONDS to drop edited or deleted rows.
+    The rebuild (including the first one after start-up) runs on a
+    background thread; searches keep using the current index, empty at
+    first, until the new one is swapped in. Insights are deduplicated by
+    normalized title.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(
+        self,
+        session_factory=None,
+        min_score: Optional[float] = None,
+        max_age_days: Optional[float] = None,
+        refresh_seconds: Optional[float] = None,
+        rebuild_seconds: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        # Share of the query's (idf-weighted) terms a match must cover
+        self.min_score = min_score if min_score is not None else float(os.getenv("RETRIEVAL_MIN_SCORE", "0.6"))
+        self.max_age_days = max_age_days if max_age_days is not None else float(os.getenv("RETRIEVAL_MAX_AGE_DAYS", "90"))
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else float(os.getenv("RETRIEVAL_REFRESH_SECONDS", "5"))
+        self.rebuild_seconds = rebuild_seconds if rebuild_seconds is not None else float(os.getenv("RETRIEVAL_REBUILD_SECONDS", "3600"))
+
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+        self._last_refresh = 0.0
+        self._built_at = 0.0
+
+        self.requests = 0
+        self.index_results = 0
+        self.model_results = 0
+        self.full_hits = 0
+
+    def _reset(self):
+        self._docs: List[dict] = []
+        self._by_title: dict = {}
+        self._terms: dict = {}
+        self._postings: List[tuple] = []  # term id -> (doc id list, tf list)
+        self._arrays: dict = {}           # term id -> (doc ids, tfs) as arrays, rebuilt when postings grow
+        self._doc_len: List[int] = []
+        self._created: List[float] = []
+        self._doc_len_array = None
+        self._created_array = None
+        self._total_len = 0
+        self.max_row_id = 0
+
+    def _swap(self, other: "InsightIndex"):
+        """Take over another index's documents and postings (caller holds the lock)."""
+        for name in ("_docs", "_by_title", "_terms", "_postings", "_arrays", "_doc_len", "_created",
+                     "_doc_len_array", "_created_array", "_total_len", "max_row_id"):
+            setattr(self, name, getattr(other, name))
+
+    def add(self, rows: list):
+        """Index `search_results`-shaped dicts: id, title, snippet, llm_content, search_query, created_at."""
+        with self._lock:
+            for row in rows:
+                self.max_row_id = max(self.max_row_id, row.get("id") or 0)
+                title = normalize_title(row.get("title"))
+                if not title:
+                    continue
+                created = _timestamp(row.get("created_at"))
+                existing = self._by_title.get(title)
+                if existing is not None:
+                    # Seen again: keep the first copy, but it counts as fresh
+                    self._created[existing] = max(self._created[existing], created)
+                    self._created_array = None
+                    continue
+                self._add_doc(title, row, created)
+
+    def _add_doc(self, title: str, row: dict, created: float):
+        doc_id = len(self._docs)
+        snippet = row.get("snippet") or ""
+        llm_content = row.get("llm_content") or ""
+        tokens = tokenize(row["title"]) * TITLE_WEIGHT + tokenize(snippet) + tokenize(row.get("search_query"))
+        if llm_content and llm_content != snippet:
+            tokens += tokenize(llm_content)
+
+        counts: dict = {}
+        for token in tokens:
+            term_id = self._terms.get(token)
+            if term_id is None:
+                term_id = self._terms[token] = len(self._postings)
+                self._postings.append(([], []))
+            counts[term_id] = counts.get(term_id, 0) + 1
+        for term_id, tf in counts.items():
+            ids, tfs = self._postings[term_id]
+            ids.append(doc_id)
+            tfs.append(tf)
+            self._arrays.pop(term_id, None)
+
+        self._docs.append({"title": row["title"], "snippet": snippet, "llm_content": llm_content or snippet})
+        self._by_title[title] = doc_id
+        self._doc_len.append(len(tokens))
+        self._created.append(created)
+        self._total_len += len(tokens)
+        self._doc_len_array = None
+        self._created_array = None
+
+    def _postings_arrays(self, term_id: int) -> tuple:
+        arrays = self._arrays.get(term_id)
+        if arrays is None:
+            ids, tfs = self._postings[term_id]
+            arrays = self._arrays[term_id] = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float64))
+        return arrays
+
+    def search(self, query: str, taken: List[str], limit: int) -> list:
+        """
+        Up to `limit` indexed insights relevant to `query`, best first, that
+        are fresh enough and not fuzzy duplicates of `taken` (normalized
+        titles, extended in place like pick_unique()).
+        """
+        self.refresh()
+        if limit <= 0:
+            return []
+        with self._lock:
+            term_ids = {self._terms[t] for t in tokenize(query) if t in self._terms}
+            n_docs = len(self._docs)
+            if not term_ids or not n_docs:
+                return []
+
+            if self._doc_len_array is None:
+                self._doc_len_array = np.asarray(self._doc_len, dtype=np.float64)
+            if self._created_array is None:
+                self._created_array = np.asarray(self._created, dtype=np.float64)
+            avg_len = self._total_len / n_docs
+            length_norm = self.k1 * (1 - self.b + self.b * self._doc_len_array / avg_len)
+
+            scores = np.zeros(n_docs)
+            # A document with each query term once, at average length, scores sum(idf)
+            reference = 0.0
+            for term_id in term_ids:
+                ids, tfs = self._postings_arrays(term_id)
+                idf = math.log(1 + (n_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[ids])
+                reference += idf
+            scores /= reference
+
+            eligible = scores >= self.min_score
+            if self.max_age_days:
+                eligible &= self._created_array >= time.time() - self.max_age_days * 86400
+            candidates = np.flatnonzero(eligible)
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            # Over-fetch: some of the best matches may already be taken
+            docs = [dict(self._docs[i], score=round(float(scores[i]), 3)) for i in ranked[:limit * 4 + 20]]
+        return pick_unique(docs, taken, limit)
+
+    def refresh(self, force: bool = False):
+        """
+        Pull rows added since the last refresh; rebuild everything when the
+        index is old. A rebuild runs in the background unless `force` is set.
+        """
+        if self.session_factory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_seconds:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # Another request is refreshing, or a rebuild is running; search what we have
+        if now - self._built_at > self.rebuild_seconds:
+            if force:
+                self._rebuild(now)
+            else:
+                threading.Thread(target=self._rebuild, args=(now,), name="insight-index-rebuild", daemon=True).start()
+            return
+        try:
+            self.add(self._load_rows(self.max_row_id))
+            self._last_refresh = now
+        finally:
+            self._refresh_lock.release()
+
+    def _rebuild(self, started: float):
+        """Index every row into a new index, then swap it in. Releases the refresh lock."""
+        try:
+            fresh = InsightIndex(min_score=self.min_score, max_age_days=self.max_age_days)
+            fresh.add(self._load_rows(0))
+            with self._lock:
+                self._swap(fresh)
+            self._built_at = started
+        except Exception as e:
+            logger.warning("Insight index rebuild failed: %s", e)
+        finally:
+            # Also after a failure, so a broken database isn't retried on every search
+            self._last_refresh = time.monotonic()
+            self._refresh_lock.release()
+
+    def _load_rows(self, after_id: int) -> list:
+        from models import SearchResult
+
+        columns = (SearchResult.id, SearchResult.title, SearchResult.snippet, SearchResult.llm_content,
+                   SearchResult.search_query, SearchResult.created_at)
+        db = self.session_factory()
+        try:
+            rows = db.query(*columns).filter(SearchResult.id > after_id).order_by(SearchResult.id).all()
+            return [row._asdict() for row in rows]
+        finally:
+            db.close()
+
+    def record(self, from_index: int, from_model: int):
+        """Count where one /api/web-search answer came from."""
+        with self._lock:
+            self.requests += 1
+            self.index_results += from_index
+            self.model_results += from_model
+            self.full_hits += from_index > 0 and from_model == 0
+
+    def stats(self) -> dict:
+        served = self.index_results + self.model_results
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._terms),
+            "max_row_id": self.max_row_id,
+            "requests": self.requests,
+            "index_results": self.index_results,
+            "model_results": self.model_results,
+            "hit_rate": round(self.index_results / served, 4) if served else None,
+            "full_hit_rate": round(self.full_hits / self.requests, 4) if self.requests else None,
+        }
+
+
+def _timestamp(value) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
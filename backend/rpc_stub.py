@@ -0,0 +1,171 @@
+"""
+Local stand-in for the Sepolia JSON-RPC node, enough for the mint worker.
+
+Accepts signed raw transactions, hands out nonces, and reports every
+accepted transaction as mined `--confirm-seconds` later. Batch requests
+(a JSON array) are answered in one response, one result per call.
+
+    python rpc_stub.py --port 8545 --latency 0.2 --fail-rate 0.3 --confirm-seconds 1
+    SEPOLIA_RPC_URL=http://127.0.0.1:8545 MINT_CHAIN_ID=31337 uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_account import Account
+from web3 import Web3
+
+
+class ChainState:
+    def __init__(self, chain_id: int, confirm_seconds: float = 1.0):
+        self.chain_id = chain_id
+        self.confirm_seconds = confirm_seconds
+        self.block = 1
+        self.http_requests = 0
+        self.nonces = {}
+        self.transactions = {}
+        self._lock = threading.Lock()
+
+    def send_raw_transaction(self, raw_hex: str) -> str:
+        try:
+            raw = bytes.fromhex(raw_hex[2:] if raw_hex.startswith("0x") else raw_hex)
+            sender = Account.recover_transaction(raw)
+            nonce = _decode_nonce(raw)
+        except Exception:
+            raise RpcError(-32602, "invalid raw transaction")
+        tx_hash = Web3.to_hex(Web3.keccak(raw))
+        with self._lock:
+            if tx_hash in self.transactions:
+                raise RpcError(-32000, "already known")
+            expected = self.nonces.get(sender, 0)
+            if nonce < expected:
+                raise RpcError(-32000, "nonce too low")
+            if nonce > expected:
+                raise RpcError(-32000, "nonce too high")
+            self.nonces[sender] = expected + 1
+            self.block += 1
+            self.transactions[tx_hash] = {"block": self.block, "from": sender, "nonce": nonce, "sent": time.monotonic()}
+        return tx_hash
+
+    def receipt(self, tx_hash: str):
+        with self._lock:
+            tx = self.transactions.get(tx_hash)
+            if tx is None or time.monotonic() - tx["sent"] < self.confirm_seconds:
+                return None
+            return {
+                "transactionHash": tx_hash,
+                "blockNumber": hex(tx["block"]),
+                "blockHash": "0x" + "00" * 31 + f"{tx['block'] % 256:02x}",
+                "transactionIndex": "0x0",
+                "from": tx["from"],
+                "to": None,
+                "status": "0x1",
+                "gasUsed": hex(60_000),
+                "cumulativeGasUsed": hex(60_000),
+                "effectiveGasPrice": hex(Web3.to_wei(10, "gwei")),
+                "contractAddress": None,
+                "logs": [],
+                "logsBloom": "0x" + "00" * 256,
+                "type": "0x0",
+            }
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _decode_nonce(raw: bytes) -> int:
+    # Typed transactions (EIP-2718) are `type || rlp([chainId, nonce, ...])`, legacy ones `rlp([nonce, ...])`
+    if raw[0] < 0x7f:
+        nonce = rlp.decode(raw[1:])[1]
+    else:
+        nonce = rlp.decode(raw)[0]
+    return int.from_bytes(nonce, "big")
+
+
+def handle_call(state: ChainState, call: dict, fail_rate: float) -> dict:
+    method = call.get("method")
+    params = call.get("params") or []
+    response = {"jsonrpc": "2.0", "id": call.get("id")}
+    try:
+        if method in ("eth_sendRawTransaction", "eth_getTransactionCount") and random.random() < fail_rate:
+            raise RpcError(-32005, "stub: simulated upstream failure")
+
+        if method == "eth_chainId":
+            result = hex(state.chain_id)
+        elif method == "net_version":
+            result = str(state.chain_id)
+        elif method == "eth_blockNumber":
+            result = hex(state.block)
+        elif method == "eth_gasPrice":
+            result = hex(Web3.to_wei(10, "gwei"))
+        elif method == "eth_getTransactionCount":
+            result = hex(state.nonces.get(Web3.to_checksum_address(params[0]), 0))
+        elif method == "eth_sendRawTransaction":
+            result = state.send_raw_transaction(params[0])
+        elif method == "eth_getTransactionReceipt":
+            result = state.receipt(params[0])
+        else:
+            raise RpcError(-32601, f"stub: method {method} not supported")
+        response["result"] = result
+    except RpcError as e:
+        response["error"] = {"code": e.code, "message": e.message}
+    return response
+
+
+def make_handler(state: ChainState, latency: float, fail_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            state.http_requests += 1
+            if latency:
+                time.sleep(latency)
+            if isinstance(body, list):
+                payload = [handle_call(state, call, fail_rate) for call in body]
+            else:
+                payload = handle_call(state, body, fail_rate)
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8545, chain_id: int = 31337, latency: float = 0.0, fail_rate: float = 0.0,
+          confirm_seconds: float = 1.0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread and return the server (call .shutdown() to stop)."""
+    state = ChainState(chain_id, confirm_seconds)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state, latency, fail_rate))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--chain-id", type=int, default=31337)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every HTTP request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of sends that error")
+    parser.add_argument("--confirm-seconds", type=float, default=1.0, help="delay before a receipt is available")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.chain_id, args.latency, args.fail_rate, args.confirm_seconds)
+    print(f"JSON-RPC stub on http://127.0.0.1:{args.port} (chain id {args.chain_id})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,266 @@
+"""
+Pre-generated content packs for the fixed Web3Seed curricula and the
+labels the seed picker offers for them.
+
+A pack holds what a garden on one seed would otherwise ask the model for:
+the first-level knowledge areas (/api/search), a few levels of child
+insights keyed by the research query the frontend sends (/api/web-search),
+and flashcards plus a quiz pool for every node. Packs are stored in the
+`seed_packs` table under SEED_PACK_VERSION and kept in memory, so serving
+from one costs a dict lookup. `python warm_seeds.py` builds them on
+demand; main.py loads them at startup (and, with SEED_PACK_WARM_ON_STARTUP
+on one process, rebuilds missing or stale ones in the background).
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from cache import normalize_query
+from db_writer import writer as db_writer
+from models import ReadSessionLocal, SeedPack
+from seeds import Web3Seed
+from uniqueness import normalize_title, pick_unique
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the search, insight, flashcard or quiz prompts change
+SEED_PACK_VERSION = "pack-v1"
+SEED_PACK_DEPTH = int(os.getenv("SEED_PACK_DEPTH", "2"))          # levels of children below the areas
+SEED_PACK_CHILDREN = int(os.getenv("SEED_PACK_CHILDREN", "3"))    # insights per node
+SEED_PACK_FLASHCARDS = int(os.getenv("SEED_PACK_FLASHCARDS", "5"))
+SEED_PACK_QUIZ_ROUNDS = int(os.getenv("SEED_PACK_QUIZ_ROUNDS", "2"))  # quiz generations pooled per node
+SEED_PACK_MAX_AGE_DAYS = float(os.getenv("SEED_PACK_MAX_AGE_DAYS", "30"))
+# Calls a build keeps in flight; the rest of LLM_MAX_IN_FLIGHT stays free for user requests
+SEED_PACK_CONCURRENCY = int(os.getenv("SEED_PACK_CONCURRENCY", "2"))
+
+# The seed picker (welcomeManager.js) searches with its own labels, and a
+# garden's text follows the label, so these get packs of their own
+PICKER_TOPICS = ["Smart Contracts (Solidity)", "DeFi Protocols", "Ethereum & EVM", "NFTs & Token Standards"]
+PACK_TOPICS = [seed.value for seed in Web3Seed] + PICKER_TOPICS
+
+
+def research_query(topic: str, context: str) -> str:
+    """The /api/web-search query searchManager.js sends when a node grows children."""
+    return f"deep research on {topic} in the context of {context}"
+
+
+def root_content(seed: str) -> str:
+    """The text treeManager.js gives the root node, which flashcards are generated from."""
+    return f"This is your main topic: {seed}. The branches below represent the 5 primary areas within this field."
+
+
+async def build_seed_pack(
+    seed: str,
+    generate_areas: Callable[[str], Awaitable[Optional[dict]]],
+    generate_insights: Callable[[str, int, list], Awaitable[list]],
+    generate_flashcards: Callable[[dict, int], Awaitable[list]],
+    generate_quiz: Callable[[list], Awaitable[list]],
+    depth: int = SEED_PACK_DEPTH,
+    children: int = SEED_PACK_CHILDREN,
+    flashcards: int = SEED_PACK_FLASHCARDS,
+    quiz_rounds: int = SEED_PACK_QUIZ_ROUNDS,
+    concurrency: int = SEED_PACK_CONCURRENCY,
+) -> dict:
+    """
+    Generate one pack with the same helpers the endpoints use. Each level
+    is generated concurrently, at most `concurrency` calls at a time; a
+    failed call only leaves its node without children or cards.
+    """
+    started = time.perf_counter()
+    calls = 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def call(fn, *args):
+        nonlocal calls
+        async with slots:
+            calls += 1
+            return await fn(*args)
+
+    structured = await call(generate_areas, seed)
+    if not structured or not structured.get("areas"):
+        raise RuntimeError(f"No knowledge areas generated for {seed!r}")
+    areas = structured["areas"]
+
+    nodes = [{"title": seed, "llm_content": root_content(seed)}]
+    nodes += [{"title": area["name"], "llm_content": f"{area['name']}\n\n{area['description']}"} for area in areas]
+    avoid = [seed] + [area["name"] for area in areas]
+    taken = [normalize_title(title) for title in avoid]
+
+    children_by_query = {}
+    level = [area["name"] for area in areas]
+    for _ in range(depth):
+        queries = [research_query(title, seed) for title in level]
+        results = await asyncio.gather(
+            *(call(generate_insights, query, children + 2, avoid) for query in queries), return_exceptions=True
+        )
+        level = []
+        for query, candidates in zip(queries, results):
+            if isinstance(candidates, Exception):
+                logger.warning("Seed pack %r: no children for %r: %s", seed, query, candidates)
+                continue
+            # Unique across the whole pack, like titles within one tree
+            picked = pick_unique(candidates, taken, children)
+            children_by_query[normalize_query(query)] = picked
+            nodes += [{"title": item["title"], "llm_content": item["snippet"]} for item in picked]
+            avoid += [item["title"] for item in picked]
+            level += [item["title"] for item in picked]
+
+    cards = await asyncio.gather(*(call(generate_flashcards, node, flashcards) for node in nodes), return_exceptions=True)
+    carded = [(node, node_cards) for node, node_cards in zip(nodes, cards) if node_cards and not isinstance(node_cards, Exception)]
+    rounds = await asyncio.gather(
+        *(call(generate_quiz, node_cards) for _, node_cards in carded for _ in range(quiz_rounds)), return_exceptions=True
+    )
+    quizzes = {}
+    for i, (node, _) in enumerate(carded):
+        pool = {}
+        for questions in rounds[i * quiz_rounds:(i + 1) * quiz_rounds]:
+            if not isinstance(questions, Exception):
+                pool.update((normalize_query(q["question"]), q) for q in questions)
+        if pool:
+            quizzes[normalize_title(node["title"])] = list(pool.values())
+
+    return {
+        "seed": seed,
+        "version": SEED_PACK_VERSION,
+        "areas": areas,
+        "children": children_by_query,
+        "flashcards": {normalize_title(node["title"]): node_cards for node, node_cards in carded},
+        "quizzes": quizzes,
+        "llm_calls": calls,
+        "build_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+class SeedPackStore:
+    """In-memory view of the current-version packs, loaded from and saved to `seed_packs`."""
+
+    def __init__(self, version: str = SEED_PACK_VERSION, max_age_days: float = SEED_PACK_MAX_AGE_DAYS):
+        self.version = version
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._packs: dict = {}      # seed -> (created_at timestamp, pack)
+        self._areas: dict = {}      # normalized seed -> areas
+        self._children: dict = {}   # normalized research query -> insights
+        self._flashcards: dict = {}  # normalized node title -> cards
+        self._quizzes: dict = {}    # normalized node title -> questions
+        self._card_owner: dict = {}  # normalized card front -> node title
+        self.loaded = False
+        self.hits = {"areas": 0, "children": 0, "flashcards": 0, "quizzes": 0}
+
+    def load(self) -> int:
+        db = ReadSessionLocal()
+        try:
+            rows = db.query(SeedPack).filter(SeedPack.version == self.version).all()
+            packs = [(row.seed, _timestamp(row.created_at), json.loads(row.payload)) for row in rows]
+        finally:
+            db.close()
+        for seed, created_at, pack in packs:
+            self._install(seed, created_at, pack)
+        self.loaded = True
+        return len(packs)
+
+    def save(self, pack: dict):
+        """Store a freshly built pack, replacing this version's previous one for the seed."""
+        created_at = datetime.now(timezone.utc)
+
+        def write(db):
+            db.query(SeedPack).filter(SeedPack.seed == pack["seed"], SeedPack.version == self.version).delete()
+            db.add(SeedPack(
+                seed=pack["seed"],
+                version=self.version,
+                payload=json.dumps(pack),
+                llm_calls=pack.get("llm_calls", 0),
+                build_seconds=pack.get("build_seconds"),
+                created_at=created_at,
+            ))
+
+        db_writer.submit(write).result()
+        self._install(pack["seed"], created_at.timestamp(), pack)
+
+    def _install(self, seed: str, created_at: float, pack: dict):
+        with self._lock:
+            self._packs[seed] = (created_at, pack)
+            # Rebuild the lookups so a regenerated pack leaves nothing of the old one behind
+            areas, children, flashcards, quizzes, card_owner = {}, {}, {}, {}, {}
+            for seed_value, (_, seed_pack) in self._packs.items():
+                areas[normalize_query(seed_value)] = seed_pack["areas"]
+                children.update(seed_pack["children"])
+                flashcards.update(seed_pack["flashcards"])
+                quizzes.update(seed_pack["quizzes"])
+                for title, cards in seed_pack["flashcards"].items():
+                    for card in cards:
+                        card_owner[normalize_query(card["front"])] = title
+            self._areas, self._children, self._flashcards = areas, children, flashcards
+            self._quizzes, self._card_owner = quizzes, card_owner
+
+    def stale(self, seeds: List[str]) -> List[str]:
+        """Seeds with no pack for this version, or one older than max_age_days."""
+        cutoff = time.time() - self.max_age_days * 86400
+        return [seed for seed in seeds if seed not in self._packs or self._packs[seed][0] < cutoff]
+
+    def areas(self, query: str) -> Optional[list]:
+        areas = self._areas.get(normalize_query(query))
+        if areas:
+            self.hits["areas"] += 1
+        return areas
+
+    def children(self, query: str) -> list:
+        insights = self._children.get(normalize_query(query), [])
+        if insights:
+            self.hits["children"] += 1
+        return insights
+
+    def flashcards(self, title: str, count: int) -> Optional[list]:
+        cards = self._flashcards.get(normalize_title(title))
+        if not cards or len(cards) < count:
+            return None
+        self.hits["flashcards"] += 1
+        return cards[:count]
+
+    def quiz(self, flashcards: list) -> Optional[list]:
+        """The quiz pool of the node these cards came from, if they all came from one pack node."""
+        owners = {
+            self._card_owner.get(normalize_query(card.get("front", "")))
+            for card in flashcards if isinstance(card, dict)
+        }
+        if len(owners) != 1 or None in owners:
+            return None
+        questions = self._quizzes.get(owners.pop())
+        if questions:
+            self.hits["quizzes"] += 1
+        return questions
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "version": self.version,
+            "loaded": self.loaded,
+            "packs": {
+                seed: {
+                    "age_hours": round((now - created_at) / 3600, 1),
+                    "areas": len(pack["areas"]),
+                    "nodes": len(pack["flashcards"]),
+                    "children_queries": len(pack["children"]),
+                    "quizzes": len(pack["quizzes"]),
+                    "llm_calls": pack.get("llm_calls"),
+                }
+                for seed, (created_at, pack) in self._packs.items()
+            },
+            "hits": dict(self.hits),
+        }
+
+
+def _timestamp(value) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+seed_packs = SeedPackStore()
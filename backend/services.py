@@ -0,0 +1,73 @@
+"""
+Process-wide clients that are slow to import or need configuration: the
+web3 chain client, Google token verification, the wallet cipher.
+
+Each is registered with a factory and built the first time something asks
+for it, so importing main.py stays cheap and endpoints that don't need a
+service keep working when it isn't configured. Asking for a service whose
+env vars are missing raises ServiceUnavailable, which main.py turns into
+a 503.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+
+class ServiceUnavailable(RuntimeError):
+    """A service isn't configured or failed to start."""
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._factories: Dict[str, Tuple[Callable[[], object], Tuple[str, ...]]] = {}
+        self._instances: Dict[str, object] = {}
+        # Reentrant: a factory may ask for another service
+        self._lock = threading.RLock()
+        self.startup_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], object], required_env: Iterable[str] = ()):
+        self._factories[name] = (factory, tuple(required_env))
+
+    def missing_env(self, name: str) -> list:
+        _, required_env = self._factories[name]
+        return [var for var in required_env if not os.getenv(var)]
+
+    def configured(self, name: str) -> bool:
+        return not self.missing_env(name)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        missing = self.missing_env(name)
+        if missing:
+            raise ServiceUnavailable(f"{name} is not configured (set {', '.join(missing)})")
+        factory, _ = self._factories[name]
+        with self._lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                try:
+                    self._instances[name] = factory()
+                except Exception as e:
+                    raise ServiceUnavailable(f"{name} failed to start: {e}") from e
+                self.startup_seconds[name] = time.perf_counter() - started
+            return self._instances[name]
+
+    def stats(self) -> dict:
+        stats = {}
+        for name in self._factories:
+            instance = self._instances.get(name)
+            stats[name] = {
+                "configured": self.configured(name),
+                "loaded": instance is not None,
+                "startup_ms": round(self.startup_seconds[name] * 1000, 1) if name in self.startup_seconds else None,
+            }
+            # Services that keep their own counters (caches, pools) report them here too
+            if hasattr(instance, "stats"):
+                stats[name]["stats"] = instance.stats()
+        return stats
+
+
+services = ServiceRegistry()
@@ -0,0 +1,288 @@
+"""
+Compact binary snapshot of a whole game tree.
+
+Layout (little-endian):
+
+    b"BBSN" | u8 format version | u8 flags | body
+
+`body` (zlib-compressed when flags & 1) is a u32 header length, a JSON
+header, then raw column arrays in the order the header lists them.
+Every table is stored column by column as typed arrays; all text goes
+through one de-duplicated string table and columns hold indexes into it.
+Coordinates are float32, or int32 multiples of `quantize` when a grid
+step is given.
+
+Snapshots use the same dict shape as the load-game-state JSON, so
+encode(load_json["game_state"]) and decode() round-trip. decode() takes
+untrusted uploads: the body may not inflate past MAX_SNAPSHOT_BYTES, and
+anything malformed raises SnapshotError.
+"""
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Optional
+
+MAGIC = b"BBSN"
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-brainbonsai-snapshot"
+
+FLAG_ZLIB = 1
+
+# Largest body decode() accepts, after decompression
+MAX_SNAPSHOT_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+NULL_ID = -(2 ** 63)
+NULL_STR = 0xFFFFFFFF
+
+# kind -> array typecode; "geo" becomes "i" when quantized
+TYPECODES = {"id": "q", "int": "i", "bool": "B", "float": "f", "geo": "f", "str": "I"}
+SECTION_TYPECODES = set(TYPECODES.values()) | {"utf8"}
+
+_POINT = [(("x",), "geo"), (("y",), "geo"), (("size",), "float")]
+
+TABLES = {
+    "search_results": [
+        (("id",), "id"),
+        (("title",), "str"),
+        (("url",), "str"),
+        (("snippet",), "str"),
+        (("llm_content",), "str"),
+        (("search_query",), "str"),
+    ],
+    "branches": [
+        (("id",), "id"),
+        (("start", "x"), "geo"),
+        (("start", "y"), "geo"),
+        (("end", "x"), "geo"),
+        (("end", "y"), "geo"),
+        (("length",), "geo"),
+        (("maxLength",), "geo"),
+        (("angle",), "float"),
+        (("thickness",), "float"),
+        (("generation",), "int"),
+        (("isGrowing",), "bool"),
+        (("growthSpeed",), "float"),
+        (("nodeType",), "str"),
+        (("parentBranchId",), "id"),
+        (("searchResult", "id"), "id"),
+        (("searchResult", "title"), "str"),
+        (("searchResult", "url"), "str"),
+        (("searchResult", "snippet"), "str"),
+        (("searchResult", "llm_content"), "str"),
+    ],
+    "leaves": [(("id",), "id")] + _POINT + [(("branchId",), "id")],
+    "flashcards": [
+        (("id",), "id"),
+        (("branch_id",), "id"),
+        (("front",), "str"),
+        (("back",), "str"),
+        (("difficulty",), "str"),
+        (("category",), "str"),
+        (("node_position", "x"), "float"),
+        (("node_position", "y"), "float"),
+        (("created_at",), "str"),
+        (("last_reviewed",), "str"),
+        (("review_count",), "int"),
+    ],
+    "fruits": [(("id",), "id")] + _POINT + [(("type",), "str")],
+    "flowers": [(("id",), "id")] + _POINT + [(("type",), "str")],
+}
+
+# Nested objects that decode to None when every field is empty
+OPTIONAL_OBJECTS = {"branches": "searchResult", "flashcards": "node_position"}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _get(item: dict, path: tuple):
+    for key in path:
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key)
+    return item
+
+
+def _set(item: dict, path: tuple, value):
+    for key in path[:-1]:
+        item = item.setdefault(key, {})
+    item[path[-1]] = value
+
+
+def _to_int(value, null):
+    try:
+        return int(value) if value is not None else null
+    except (TypeError, ValueError):
+        return null
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode(game_state: dict, quantize: Optional[float] = None, compress: bool = True) -> bytes:
+    strings = []
+    string_index = {}
+
+    def intern(value) -> int:
+        if value is None:
+            return NULL_STR
+        value = str(value)
+        index = string_index.get(value)
+        if index is None:
+            index = string_index[value] = len(strings)
+            strings.append(value)
+        return index
+
+    sections = []
+    chunks = []
+
+    def put(name: str, typecode: str, values):
+        data = array(typecode, values)
+        sections.append([name, typecode, len(data)])
+        chunks.append(_little_endian(data))
+
+    for table, columns in TABLES.items():
+        rows = game_state.get(table) or []
+        for path, kind in columns:
+            values = [_get(row, path) for row in rows]
+            if kind == "id" or kind == "int":
+                null = NULL_ID if kind == "id" else 0
+                encoded = [_to_int(v, null) for v in values]
+            elif kind == "bool":
+                encoded = [1 if v else 0 for v in values]
+            elif kind == "str":
+                encoded = [intern(v) for v in values]
+            elif kind == "geo" and quantize:
+                encoded = [round((v or 0.0) / quantize) for v in values]
+            else:
+                encoded = [float(v) if v is not None else math.nan for v in values]
+            typecode = "i" if kind == "geo" and quantize else TYPECODES[kind]
+            put(f"{table}.{'.'.join(path)}", typecode, encoded)
+
+    encoded_strings = [s.encode("utf-8") for s in strings]
+    put("strings.lengths", "I", [len(s) for s in encoded_strings])
+    sections.append(["strings.data", "utf8", sum(len(s) for s in encoded_strings)])
+    chunks.append(b"".join(encoded_strings))
+
+    header = json.dumps({
+        "original_search_query": game_state.get("original_search_query"),
+        "version": game_state.get("version"),
+        "camera_offset": game_state.get("camera_offset"),
+        "created_at": game_state.get("created_at"),
+        "updated_at": game_state.get("updated_at"),
+        "counts": {table: len(game_state.get(table) or []) for table in TABLES},
+        "quantize": quantize,
+        "sections": sections,
+    }).encode("utf-8")
+
+    body = struct.pack("<I", len(header)) + header + b"".join(chunks)
+    flags = 0
+    if compress:
+        body = zlib.compress(body, 6)
+        flags |= FLAG_ZLIB
+    return MAGIC + struct.pack("<BB", FORMAT_VERSION, flags) + body
+
+
+def decode(blob: bytes) -> dict:
+    if len(blob) < 6 or blob[:4] != MAGIC:
+        raise SnapshotError("Not a BrainBonsai snapshot")
+    version, flags = struct.unpack_from("<BB", blob, 4)
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+
+    body = blob[6:]
+    if flags & FLAG_ZLIB:
+        inflater = zlib.decompressobj()
+        try:
+            body = inflater.decompress(body, MAX_SNAPSHOT_BYTES)
+        except zlib.error as e:
+            raise SnapshotError(f"Corrupt snapshot: {e}")
+        if inflater.unconsumed_tail:
+            raise SnapshotError(f"Snapshot inflates past {MAX_SNAPSHOT_BYTES} bytes")
+    elif len(body) > MAX_SNAPSHOT_BYTES:
+        raise SnapshotError(f"Snapshot is larger than {MAX_SNAPSHOT_BYTES} bytes")
+
+    try:
+        return _decode_body(body)
+    except SnapshotError:
+        raise
+    except (struct.error, AttributeError, IndexError, KeyError, TypeError, ValueError, OverflowError, RecursionError) as e:
+        # Truncated sections, bad string indexes or typecodes, a broken header...
+        raise SnapshotError(f"Corrupt snapshot: {e!r}")
+
+
+def _decode_body(body: bytes) -> dict:
+    (header_len,) = struct.unpack_from("<I", body, 0)
+    header = json.loads(body[4:4 + header_len])
+    offset = 4 + header_len
+
+    columns = {}
+    for name, typecode, count in header["sections"]:
+        if typecode not in SECTION_TYPECODES or not isinstance(count, int) or count < 0:
+            raise SnapshotError(f"Bad section {name!r}")
+        size = count if typecode == "utf8" else array(typecode).itemsize * count
+        if offset + size > len(body):
+            raise SnapshotError(f"Section {name!r} runs past the end of the snapshot")
+        if typecode == "utf8":
+            columns[name] = body[offset:offset + count]
+            offset += count
+            continue
+        values = array(typecode)
+        values.frombytes(body[offset:offset + size])
+        if sys.byteorder == "big":
+            values.byteswap()
+        columns[name] = values
+        offset += size
+
+    strings = []
+    position = 0
+    data = columns["strings.data"]
+    for length in columns["strings.lengths"]:
+        strings.append(data[position:position + length].decode("utf-8"))
+        position += length
+
+    quantize = header.get("quantize")
+    game_state = {
+        "original_search_query": header.get("original_search_query"),
+        "version": header.get("version"),
+    }
+    for table, table_columns in TABLES.items():
+        count = header["counts"][table]
+        table_values = [columns[f"{table}.{'.'.join(path)}"] for path, _ in table_columns]
+        if any(len(values) != count for values in table_values):
+            raise SnapshotError(f"Column lengths of {table!r} don't match its row count")
+        rows = [{} for _ in range(count)]
+        for (path, kind), values in zip(table_columns, table_values):
+            for row, value in zip(rows, values):
+                if kind == "id":
+                    value = None if value == NULL_ID else value
+                elif kind == "bool":
+                    value = bool(value)
+                elif kind == "str":
+                    value = None if value == NULL_STR else strings[value]
+                elif kind == "geo" and quantize:
+                    value = value * quantize
+                elif kind in ("float", "geo"):
+                    value = None if math.isnan(value) else value
+                _set(row, path, value)
+
+        nested = OPTIONAL_OBJECTS.get(table)
+        if nested:
+            for row in rows:
+                if all(v is None for v in row[nested].values()):
+                    row[nested] = None
+        game_state[table] = rows
+
+    game_state["camera_offset"] = header.get("camera_offset")
+    game_state["created_at"] = header.get("created_at")
+    game_state["updated_at"] = header.get("updated_at")
+    return game_state
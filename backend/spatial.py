@@ -0,0 +1,87 @@
+"""
+Viewport loading: the branches, leaves, fruits and flowers of one garden
+that intersect a rectangle of world space, found through the R-trees of
+migration 0009 (SQLite only).
+
+The client asks for its screen rectangle (plus a margin), then for each
+new rectangle as the camera pans, passing the rectangles it already has
+as `loaded` so nothing is sent twice. An element is skipped when its
+indexed bounds touch a loaded rectangle, which is the same test that sent
+it the first time, so a rectangle only counts as loaded once all of its
+pages have been fetched. Each kind is paged by id with `limit` rows per
+response; `next_after` lists the kinds that have more.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from game_state import game_state_queries
+from models import DATABASE_URL, Branch, Flower, Fruit, GameSession, Leaf
+
+SPATIAL_AVAILABLE = DATABASE_URL.startswith("sqlite")
+
+# key in the game-state JSON -> model whose rows the "<table>_rtree" index covers
+KINDS = {"branches": Branch, "leaves": Leaf, "fruits": Fruit, "flowers": Flower}
+
+
+class Rect(NamedTuple):
+    min_x: float
+    min_y: float
+    max_x: float
+    max_y: float
+
+
+def _hits_sql(rtree: str, loaded: int) -> str:
+    skip = "".join(
+        f" AND NOT (max_x >= :l{i}_min_x AND min_x <= :l{i}_max_x AND max_y >= :l{i}_min_y AND min_y <= :l{i}_max_y)"
+        for i in range(loaded)
+    )
+    return (
+        f"SELECT id FROM {rtree} "
+        f"WHERE min_session <= :session AND max_session >= :session "
+        f"AND max_x >= :min_x AND min_x <= :max_x AND max_y >= :min_y AND min_y <= :max_y "
+        f"AND id > :after{skip} ORDER BY id LIMIT :limit"
+    )
+
+
+def viewport_state(
+    db: Session,
+    game_session: GameSession,
+    viewport: Rect,
+    loaded: List[Rect] = (),
+    after: Optional[Dict[str, int]] = None,
+    limit: int = 2000,
+) -> dict:
+    """Elements in `viewport` and in none of `loaded`, at most `limit` per kind after the `after` ids."""
+    session_id = game_session.id
+    params = {"session": session_id, "limit": limit, **viewport._asdict()}
+    for i, rect in enumerate(loaded):
+        params.update({f"l{i}_{name}": value for name, value in rect._asdict().items()})
+
+    queries = {key: (query, to_json) for key, query, to_json in game_state_queries(session_id)}
+    state = {
+        "original_search_query": game_session.original_search_query,
+        "version": game_session.version or 1,
+        "camera_offset": {"x": game_session.camera_offset_x, "y": game_session.camera_offset_y},
+    }
+    next_after = {}
+    for key, model in KINDS.items():
+        if after and key not in after:
+            state[key] = []  # that kind was complete on an earlier page
+            continue
+        start = (after or {}).get(key, 0)
+        ids = db.scalars(text(_hits_sql(f"{model.__tablename__}_rtree", len(loaded))), {**params, "after": start}).all()
+        if len(ids) == limit:
+            next_after[key] = ids[-1]
+        query, to_json = queries[key]
+        # The row query keeps its game_session_id filter, so the index only has to narrow things down
+        state[key] = [to_json(row) for row in db.execute(query.where(model.__table__.c.id.in_(ids)))] if ids else []
+
+    totals = None
+    if not after:
+        totals = {
+            key: db.scalar(select(func.count()).select_from(model).where(model.game_session_id == session_id))
+            for key, model in KINDS.items()
+        }
+    return {"game_state": state, "totals": totals, "next_after": next_after or None}
@@ -0,0 +1,98 @@
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+
+class ArrayItemParser:
+    """
+    Incrementally pulls complete elements out of a JSON array while the
+    model is still writing it.
+
+    With `key` set it waits for `"key": [` (e.g. {"results": [...]}),
+    otherwise it uses the first top-level `[`. Every time an element's
+    closing brace arrives, feed() returns it parsed, so callers never wait
+    for the rest of the completion.
+    """
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.done = False
+        self._buf = ""
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> list:
+        self._buf += text
+        items = []
+        if self.done or (not self._in_array and not self._find_array_start()):
+            return items
+
+        buf = self._buf
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._item_start = self._pos
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the array itself
+                    self.done = True
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    try:
+                        items.append(json.loads(buf[self._item_start:self._pos + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+            self._pos += 1
+
+        # Drop what has been consumed so the buffer stays small
+        cut = self._pos if self._item_start is None else self._item_start
+        self._buf = buf[cut:]
+        self._pos -= cut
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+    def _find_array_start(self) -> bool:
+        search_from = 0
+        if self.key:
+            search_from = self._buf.find(f'"{self.key}"')
+            if search_from == -1:
+                return False
+        bracket = self._buf.find("[", search_from)
+        if bracket == -1:
+            return False
+        self._in_array = True
+        self._pos = bracket + 1
+        return True
+
+
+def event_stream(events: AsyncIterator[dict], fmt: str = "ndjson") -> StreamingResponse:
+    """Wrap an async iterator of event dicts as NDJSON (default) or SSE."""
+    if fmt == "sse":
+        async def body():
+            async for event in events:
+                yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+        return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def body():
+        async for event in events:
+            yield json.dumps(event) + "\n"
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,158 @@
+"""
+Whole-subtree operations on a saved garden: fetch, prune or move a branch
+with everything below it, without the client re-sending the tree.
+
+The subtree is a recursive CTE over parent_branch_id that stays inside
+the root's garden. Each table is then read or changed by one statement
+that embeds the CTE, and every write reports the ids it touched through
+RETURNING. Writes bump the session version like patch-game-state does, so
+they take the same optional `base_version` check.
+
+Fruits and flowers are not linked to branches in the database, so a
+prune leaves them alone.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session, aliased
+
+from game_state import _MISSING, VersionConflict, bump_version, game_state_queries
+from models import Branch, Flashcard, GameSession, Leaf, SearchResult
+
+# key in the game-state JSON -> column that ties a row to its branch
+BRANCH_CHILDREN = {"leaves": Leaf.branch_id, "flashcards": Flashcard.branch_id}
+
+
+def subtree_ids(session_id: int, root_id: int):
+    """SELECT of the ids of root_id and every branch below it in the same garden."""
+    tree = (
+        select(Branch.id)
+        .where(Branch.id == root_id, Branch.game_session_id == session_id)
+        .cte("subtree", recursive=True)
+    )
+    child = aliased(Branch)
+    # UNION rather than UNION ALL: a parent cycle saved by a buggy client ends instead of looping
+    tree = tree.union(
+        select(child.id).where(child.parent_branch_id == tree.c.id, child.game_session_id == session_id)
+    )
+    return select(tree.c.id)
+
+
+def _root(db: Session, branch_id: int, base_version=None) -> tuple:
+    """(session id, current version) of the garden holding branch_id."""
+    row = db.execute(
+        select(GameSession.id, GameSession.version)
+        .join(Branch, Branch.game_session_id == GameSession.id)
+        .where(Branch.id == branch_id)
+    ).first()
+    if row is None:
+        raise LookupError("Branch not found")
+
+    current_version = row.version or 1
+    if base_version is not None and base_version != current_version:
+        raise VersionConflict(current_version)
+    return row.id, current_version
+
+
+def load_subtree(db: Session, branch_id: int) -> dict:
+    """The branches (with their search results), leaves and flashcards of one subtree."""
+    session_id, version = _root(db, branch_id)
+    ids = subtree_ids(session_id, branch_id)
+    queries = {key: (query, to_json) for key, query, to_json in game_state_queries(session_id)}
+
+    state = {"session_id": session_id, "root_id": branch_id, "version": version}
+    query, to_json = queries["branches"]
+    state["branches"] = [to_json(row) for row in db.execute(query.where(Branch.__table__.c.id.in_(ids)))]
+    for key, column in BRANCH_CHILDREN.items():
+        # The subtree already pins the garden; a game_session_id filter here
+        # lets SQLite walk every row of the garden instead of the branch_id index
+        table = column.class_.__table__
+        to_json = queries[key][1]
+        rows = db.execute(select(table).where(table.c.branch_id.in_(ids)).order_by(table.c.id))
+        state[key] = [to_json(row) for row in rows]
+    return state
+
+
+def prune_subtree(db: Session, branch_id: int, base_version=None) -> dict:
+    """
+    Delete a branch and everything below it, plus the search results only
+    those branches used, in the caller's transaction. Returns the new
+    version and the deleted ids per table.
+    """
+    session_id, current_version = _root(db, branch_id, base_version)
+    ids = subtree_ids(session_id, branch_id)
+    now = datetime.now(timezone.utc)
+
+    deleted = {}
+    for key, column in BRANCH_CHILDREN.items():
+        model = column.class_
+        deleted[key] = db.scalars(
+            delete(model).where(column.in_(ids)).returning(model.id),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+    rows = db.execute(
+        delete(Branch).where(Branch.id.in_(ids)).returning(Branch.id, Branch.search_result_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    deleted["branches"] = [row.id for row in rows]
+
+    results = {row.search_result_id for row in rows if row.search_result_id is not None}
+    deleted["search_results"] = db.scalars(
+        delete(SearchResult)
+        .where(SearchResult.id.in_(results), ~exists().where(Branch.search_result_id == SearchResult.id))
+        .returning(SearchResult.id),
+        execution_options={"synchronize_session": False},
+    ).all() if results else []
+
+    version = bump_version(db, session_id, current_version, now)
+    return {"version": version, "deleted": deleted}
+
+
+def move_subtree(db: Session, branch_id: int, dx: float = 0, dy: float = 0,
+                 parent_branch_id=_MISSING, base_version=None) -> dict:
+    """
+    Translate a subtree by (dx, dy): branch ends, leaves and the flashcards'
+    node positions. Passing parent_branch_id also re-attaches the root
+    there (None detaches it). Raises ValueError for a parent in another
+    garden or inside the subtree. Returns the new version and moved ids.
+    """
+    session_id, current_version = _root(db, branch_id, base_version)
+    ids = subtree_ids(session_id, branch_id)
+    now = datetime.now(timezone.utc)
+
+    if parent_branch_id is not _MISSING and parent_branch_id is not None:
+        parent = db.scalar(select(Branch.game_session_id).where(Branch.id == parent_branch_id))
+        if parent != session_id:
+            raise ValueError("The new parent must be a branch of the same garden")
+        if db.scalar(select(ids.where(ids.selected_columns.id == parent_branch_id).exists())):
+            raise ValueError("A branch can't be moved under itself or its own descendants")
+
+    def moved(model, where, **columns) -> list:
+        return db.scalars(
+            update(model).where(where).values(**columns).returning(model.id),
+            execution_options={"synchronize_session": False},
+        ).all()
+
+    moved_ids = {"branches": [], "leaves": [], "flashcards": []}
+    if dx or dy:
+        moved_ids["branches"] = moved(
+            Branch, Branch.id.in_(ids),
+            start_x=Branch.start_x + dx, start_y=Branch.start_y + dy,
+            end_x=Branch.end_x + dx, end_y=Branch.end_y + dy,
+        )
+        moved_ids["leaves"] = moved(Leaf, Leaf.branch_id.in_(ids), x=Leaf.x + dx, y=Leaf.y + dy)
+        moved_ids["flashcards"] = moved(
+            Flashcard, Flashcard.branch_id.in_(ids) & Flashcard.node_position_x.is_not(None),
+            node_position_x=Flashcard.node_position_x + dx,
+            node_position_y=Flashcard.node_position_y + dy,
+        )
+
+    if parent_branch_id is not _MISSING:
+        db.execute(
+            update(Branch).where(Branch.id == branch_id).values(parent_branch_id=parent_branch_id),
+            execution_options={"synchronize_session": False},
+        )
+
+    version = bump_version(db, session_id, current_version, now)
+    return {"version": version, "moved": moved_ids}
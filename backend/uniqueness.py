@@ -0,0 +1,89 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional
+
+
+def normalize_title(title: str) -> str:
+    title = re.sub(r"[^a-z0-9 ]+", " ", (title or "").lower())
+    return re.sub(r"\s+", " ", title).strip()
+
+
+def is_similar(a: str, b: str, threshold: float = 0.85) -> bool:
+    """Fuzzy title match on normalized text, e.g. "Layer-2 Rollups" ~ "Layer 2 rollups"."""
+    if not a or not b:
+        return False
+    if a == b:
+        return True
+    # Same words in a different order ("Rollup security" / "Security of rollups")
+    a_words, b_words = set(a.split()), set(b.split())
+    if a_words and b_words and len(a_words & b_words) / len(a_words | b_words) >= threshold:
+        return True
+    return SequenceMatcher(None, a, b).ratio() >= threshold
+
+
+class TitleRegistry:
+    """
+    Remembers which titles each tree has already been given so
+    /api/web-search can exclude them without the client resending them.
+    Trees idle for longer than the TTL are forgotten.
+    """
+
+    def __init__(self, max_trees: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        self.max_trees = max_trees or int(os.getenv("TITLE_REGISTRY_MAX_TREES", "2000"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("TITLE_REGISTRY_TTL_SECONDS", str(6 * 3600)))
+        self._trees: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def titles(self, tree_id: Optional[str]) -> List[str]:
+        if not tree_id:
+            return []
+        with self._lock:
+            entry = self._trees.get(tree_id)
+            if not entry:
+                return []
+            if entry[0] + self.ttl_seconds < time.time():
+                del self._trees[tree_id]
+                return []
+            return list(entry[1])
+
+    def add(self, tree_id: Optional[str], titles: Iterable[str]) -> int:
+        """Remember titles for the tree (ones it already has are skipped); returns how many it has."""
+        if not tree_id:
+            return 0
+        with self._lock:
+            _, existing = self._trees.pop(tree_id, (0, []))
+            seen = {normalize_title(t) for t in existing}
+            for title in titles:
+                key = normalize_title(title)
+                if key and key not in seen:
+                    seen.add(key)
+                    existing.append(title)
+            self._trees[tree_id] = (time.time(), existing)
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+            return len(existing)
+
+    def forget(self, tree_id: str):
+        with self._lock:
+            self._trees.pop(tree_id, None)
+
+
+def pick_unique(candidates: list, taken: List[str], limit: int) -> list:
+    """
+    Keep candidates whose titles are not fuzzy duplicates of `taken`
+    (or of each other). `taken` holds normalized titles and is extended in place.
+    """
+    picked = []
+    for item in candidates:
+        if len(picked) >= limit:
+            break
+        title = normalize_title(item.get("title", ""))
+        if not title or any(is_similar(title, other) for other in taken):
+            continue
+        taken.append(title)
+        picked.append(item)
+    return picked
@@ -0,0 +1,49 @@
+"""
+Pre-generate the seed content packs (see seed_packs.py) so gardens on
+those topics are served without waiting on the model.
+
+    python warm_seeds.py                       # build missing or stale packs
+    python warm_seeds.py --force               # rebuild every pack
+    python warm_seeds.py --seed "DAOs" --force # rebuild one
+    python warm_seeds.py --list                # show what is stored
+
+Running servers pick up packs built here on their next start; use
+POST /api/admin/seed-packs/warm (X-Admin-Token) to rebuild inside a running server.
+"""
+import argparse
+import asyncio
+import json
+
+from seed_packs import PACK_TOPICS
+
+
+async def run(args) -> int:
+    import main
+    from models import create_tables
+
+    create_tables()
+    try:
+        if args.list:
+            await asyncio.to_thread(main.seed_packs.load)
+            print(json.dumps(main.seed_packs.stats(), indent=2))
+            return 0
+
+        built = await main.warm_seed_packs(args.seed or None, force=args.force)
+        for seed, info in main.seed_packs.stats()["packs"].items():
+            marker = "built" if seed in built else "kept "
+            print(f"{marker} {seed:<28} {info['nodes']:>4} nodes {info['quizzes']:>4} quizzes "
+                  f"{info['llm_calls'] or 0:>5} LLM calls")
+        requested = args.seed or PACK_TOPICS
+        missing = [seed for seed in requested if seed not in main.seed_packs.stats()["packs"]]
+        return 1 if missing else 0
+    finally:
+        await main.llm.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="append", choices=PACK_TOPICS,
+                        help="only this seed (repeatable)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the stored pack is fresh")
+    parser.add_argument("--list", action="store_true", help="print the stored packs and exit")
+    raise SystemExit(asyncio.run(run(parser.parse_args())))
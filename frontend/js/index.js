@@ -31,6 +31,12 @@ async function handleCredentialResponse(response) {
 // ===============================
 // GAME STATE → BACKEND FORMAT
 // ===============================
+// Same on every save of this tree, so the server can purge the older saves
+function treeId() {
+  window.tree.treeId = window.tree.treeId || crypto.randomUUID();
+  return window.tree.treeId;
+}
+
 function buildSavePayload() {
   return {
     original_search_query: window.currentSearchQuery || "manual",
@@ -60,7 +66,10 @@ function buildSavePayload() {
     camera_offset: {
       x: camera.offsetX,
       y: camera.offsetY
-    }
+    },
+
+    user_id: getUser()?.id ?? null,
+    tree_id: treeId()
   };
 }
 
@@ -104,15 +113,82 @@ async function loadGame(sessionId) {
   }
 
   restoreGameState(data.game_state);
+  // Saving a loaded garden again replaces it rather than starting a new tree
+  window.tree.treeId = data.game_state.tree_id || null;
+}
+
+// Only the elements inside a world-space rectangle ({min_x, min_y, max_x, max_y});
+// pass the rectangles already fetched as `loaded` so a pan only brings the new strip.
+// Not called yet: the game can't open a saved garden (loading is disabled in app.js),
+// so there is no loaded tree to stream into. Call it from CameraController.endPan()
+// once that lands.
+async function loadViewport(sessionId, viewport, loaded = []) {
+  const gameState = { branches: [], leaves: [], fruits: [], flowers: [] };
+  let totals = null;
+  let after = null;
+
+  do {
+    const res = await fetch(`${API}/api/load-game-state/viewport`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ session_id: sessionId, viewport, loaded, after })
+    });
+    const data = await res.json();
+    if (!data.success) throw new Error(data.error || data.detail || "Viewport load failed");
+
+    for (const key of Object.keys(gameState)) gameState[key].push(...data.game_state[key]);
+    gameState.camera_offset = data.game_state.camera_offset;
+    totals = totals || data.totals;
+    after = data.next_after;
+  } while (after);
+
+  return { gameState, totals };
+}
+
+// ===============================
+// SUBTREES
+// ===============================
+// Cut a saved branch and everything under it on the server; returns the deleted ids per table
+async function pruneSubtree(branchId, baseVersion = null) {
+  const res = await fetch(`${API}/api/branches/${branchId}/prune`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ base_version: baseVersion })
+  });
+  const data = await res.json();
+  if (!res.ok || !data.success) throw new Error(data.error || data.detail?.error || data.detail || "Prune failed");
+  return data;
+}
+
+// Shift a saved subtree by (dx, dy); pass parentBranchId (or null) to re-attach its root too
+async function moveSubtree(branchId, { dx = 0, dy = 0, parentBranchId, baseVersion = null } = {}) {
+  const body = { dx, dy, base_version: baseVersion };
+  if (parentBranchId !== undefined) body.parent_branch_id = parentBranchId;
+
+  const res = await fetch(`${API}/api/branches/${branchId}/move`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body)
+  });
+  const data = await res.json();
+  if (!res.ok || !data.success) throw new Error(data.error || data.detail?.error || data.detail || "Move failed");
+  return data;
 }
 
 // ===============================
 // GAME SESSIONS LIST
 // ===============================
-async function fetchSessions() {
-  const res = await fetch(`${API}/api/game-sessions`);
+// Newest first, one page at a time; pass the previous nextCursor to continue
+async function fetchSessions({ limit = 20, cursor = null } = {}) {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.set("cursor", cursor);
+
+  const user = getUser();
+  if (user?.id) params.set("user_id", user.id);
+
+  const res = await fetch(`${API}/api/game-sessions?${params}`);
   const data = await res.json();
-  return data.sessions || [];
+  return { sessions: data.sessions || [], nextCursor: data.next_cursor || null };
 }
 
 // ===============================
@@ -162,7 +238,7 @@ function bindUI() {
   document.getElementById("saveBtn").onclick = saveGame;
 
   document.getElementById("loadBtn").onclick = async () => {
-    const sessions = await fetchSessions();
+    const { sessions } = await fetchSessions({ limit: 1 });
     if (sessions.length) {
       loadGame(sessions[0].id); // latest
     }
@@ -189,6 +265,19 @@ window.onload = () => {
   );
 };
 
+// Mints are queued server-side; poll until the worker has sent (or given up on) the transaction
+async function waitForMint(mintRequestId, intervalMs = 2000, timeoutMs = 120000) {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+        const res = await fetch(`http://127.0.0.1:8001/api/mint-requests/${mintRequestId}`);
+        const data = await res.json();
+        if (!res.ok) return null;
+        if (["submitted", "failed", "skipped"].includes(data.mint.status)) return data.mint;
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+    return null;
+}
+
 window.checkAndMintByBranches = async function () {
     console.log("[MINT] checkAndMintByBranches called");
 
@@ -234,13 +323,22 @@ window.checkAndMintByBranches = async function () {
 
     const data = await res.json();
 
-    if (data.success) {
-        window.tree.minted = true;
-        localStorage.setItem("bonsai_minted", "true");
-        console.log("[MINT] ✅ Minted:", data.tx_hash);
+    if (!data.success) {
+        console.error("[MINT] ❌ Mint failed:", data);
+        return;
+    }
+
+    // Queued on the server; don't ask again while the worker sends it
+    window.tree.minted = true;
+    localStorage.setItem("bonsai_minted", "true");
+    console.log("[MINT] ⏳ Queued mint request:", data.mint_request_id);
+
+    const mint = await waitForMint(data.mint_request_id);
+    if (mint && mint.status === "submitted") {
+        console.log("[MINT] ✅ Minted:", mint.tx_hash);
         document.getElementById("status").innerText =
             "NFT minted 🎉 Check your wallet!";
     } else {
-        console.error("[MINT] ❌ Mint failed:", data);
+        console.error("[MINT] ❌ Mint failed:", mint);
     }
 };
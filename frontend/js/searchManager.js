@@ -12,6 +12,12 @@ class SearchManager {
         this.searchResults = [];
         this.originalQuery = null;
         this.usedTitles = new Set();
+        // Used titles /api/web-search hasn't seen for this tree (it remembers the rest)
+        this.unsentTitles = new Set();
+        // Lets /api/web-search remember which titles this tree already has
+        this.treeId = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `tree-${Date.now()}-${Math.random().toString(36).slice(2)}`;
     }
 
     getOriginalQuery() {
@@ -74,6 +80,7 @@ class SearchManager {
             const title = sanitized.title?.toLowerCase();
             if (title) {
                 this.usedTitles.add(title);
+                this.unsentTitles.add(title);
             }
 
             console.log(`SearchManager: assigned initial result ${index} to branch:`, sanitized.title);
@@ -96,34 +103,31 @@ class SearchManager {
         console.log(`SearchManager: fetching child results with query "${researchQuery}" for ${newBranches.length} branches.`);
 
         try {
-            let collected = [];
-            let attempts = 0;
-            const maxAttempts = 10;
-
-            while (collected.length < newBranches.length && attempts < maxAttempts) {
-                const negativePrompts = collected.map(result => result.title);
-                const response = await fetch(`${this.apiBaseUrl}/api/web-search`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
-                        query: researchQuery,
-                        count: Math.max(5, newBranches.length - collected.length + 2),
-                        negative_prompts: negativePrompts
-                    })
-                });
-
-                const data = await response.json();
-                console.log(`SearchManager: attempt ${attempts + 1} results:`, data);
-
-                if (data.results && data.results.length > 0) {
-                    const unique = this.filterDuplicateResults(data.results);
-                    collected = this.filterDuplicateResults([...collected, ...unique]);
-                }
+            // The server dedupes against everything this tree has seen and
+            // re-asks the model for any shortfall, so one call is enough.
+            const response = await fetch(`${this.apiBaseUrl}/api/web-search`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    query: researchQuery,
+                    count: newBranches.length,
+                    tree_id: this.treeId,
+                    negative_prompts: Array.from(this.unsentTitles)
+                })
+            });
 
-                attempts++;
+            const data = await response.json();
+            console.log('SearchManager: web search results:', data);
+
+            if (!data.error) {
+                // Fewer known titles than we have used: the server lost this tree
+                // (restart, another worker, idle too long), so send them all next time
+                this.unsentTitles = (data.known_titles ?? 0) < this.usedTitles.size
+                    ? new Set(this.usedTitles)
+                    : new Set();
             }
 
-            console.log('SearchManager: final unique results:', collected);
+            const collected = this.filterDuplicateResults(data.results || []);
 
             newBranches.forEach((branch, index) => {
                 if (!collected[index]) {
@@ -142,8 +146,8 @@ class SearchManager {
             });
 
             const assignedCount = Math.min(collected.length, newBranches.length);
-            if (attempts > 1) {
-                this.game.updateStatus(`Found ${assignedCount} unique web search results after ${attempts} attempts with negative prompts!`);
+            if (data.upstream_calls > 1) {
+                this.game.updateStatus(`Found ${assignedCount} unique web search results after ${data.upstream_calls} model calls!`);
             } else {
                 this.game.updateStatus(`Found ${assignedCount} unique web search results for new branches!`);
             }
@@ -41,7 +41,8 @@ class WelcomeManager {
 
         if (!seed) return;
 
-        // Existing growth logic remains untouched
+        // Search with the label the player picked: it names the garden, and
+        // every picker label has its own seed pack on the server
         const results = await this.searchManager.fetchInitialResults(seed);
         if (results.length > 0) {
             this.game.triggerFirstGrowth();